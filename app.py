@@ -1,10 +1,13 @@
 # app.py (Revisi untuk template lokal, hasil ke GitHub/Download)
 import streamlit as st
+import functools
+import io
+import itertools
 import os
 import sys
+import time
 import logging
-import base64 # Tetap butuh base64 untuk encode content ke GitHub
-from github import Github, GithubException 
+from github import GithubException 
 
 # Set up basic logging for Streamlit app
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',\
@@ -17,15 +20,103 @@ GITHUB_TOKEN = os.getenv("GITHUB_TOKEN_VPN_BOT")
 REPO_OWNER = "Fatttod" # GANTI ini dengan info repo lo
 REPO_NAME = "toll"      # GANTI ini dengan info repo lo
 BRANCH_NAME = "main"                # Atau "master", tergantung branch default repo lo
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com") # Bisa diarahkan ke server fake buat testing
+
+# --- CACHE PARSE LINK ---
+# Set PARSED_LINK_CACHE_PATH (misal "parsed_links.sqlite") biar cache tetap ada walau Streamlit di-restart
+PARSED_LINK_CACHE_PATH = os.getenv("PARSED_LINK_CACHE_PATH")
+PARSED_LINK_CACHE_SIZE = int(os.getenv("PARSED_LINK_CACHE_SIZE", "200000"))
+
+@st.cache_resource
+def get_parsed_link_cache():
+    from link_cache import ParsedLinkCache
+    from singbox_converter import CONVERTER_VERSION
+    return ParsedLinkCache(max_entries=PARSED_LINK_CACHE_SIZE, disk_path=PARSED_LINK_CACHE_PATH, version=CONVERTER_VERSION)
+
+# --- CACHE HASIL KONVERSI ---
+# Link + template + opsi yang sama persis langsung dapat config lama (result_cache.py).
+# Set RESULT_CACHE_PATH (misal "conversion_results.sqlite") biar hasilnya tetap ada walau Streamlit di-restart
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH")
+RESULT_CACHE_MAX_MB = int(os.getenv("RESULT_CACHE_MAX_MB", "256"))
+
+@st.cache_resource
+def get_result_cache():
+    from result_cache import ConversionResultCache
+    return ConversionResultCache(max_bytes=RESULT_CACHE_MAX_MB * 1024 * 1024, disk_path=RESULT_CACHE_PATH)
+
+# --- FETCH SUBSCRIPTION ---
+SUBSCRIPTION_PER_HOST_LIMIT = int(os.getenv("SUBSCRIPTION_PER_HOST_LIMIT", "4"))
+SUBSCRIPTION_TIMEOUT = float(os.getenv("SUBSCRIPTION_TIMEOUT", "20"))
+
+@st.cache_resource
+def get_subscription_fetcher():
+    # Satu fetcher per proses biar ETag/Last-Modified tiap URL keinget antar klik
+    from subscription_fetcher import SubscriptionFetcher
+    return SubscriptionFetcher(per_host_limit=SUBSCRIPTION_PER_HOST_LIMIT, timeout=SUBSCRIPTION_TIMEOUT)
+
+# --- LATENCY PROBE ---
+LATENCY_PROBE_TIMEOUT = float(os.getenv("LATENCY_PROBE_TIMEOUT", "3"))
+LATENCY_PROBE_TTL = int(os.getenv("LATENCY_PROBE_TTL", "600"))
+
+@st.cache_resource
+def get_latency_prober():
+    # Hasil probe di-cache per server selama LATENCY_PROBE_TTL detik, dipakai bareng antar klik
+    from latency_probe import LatencyProber
+    return LatencyProber(timeout=LATENCY_PROBE_TIMEOUT, ttl=LATENCY_PROBE_TTL)
+
+@st.cache_resource
+def get_github_publisher():
+    # Satu client GitHub (sesi + repo) per proses, dipakai ulang tiap klik
+    from github_publisher import GithubPublisher
+    return GithubPublisher(GITHUB_TOKEN, REPO_OWNER, REPO_NAME, branch=BRANCH_NAME, base_url=GITHUB_API_URL)
+
+def load_previous_config_from_github(publisher, github_path):
+    """Ambil isi file config terakhir di GitHub buat mode incremental. None kalau belum ada/gagal."""
+    if publisher is None:
+        return None
+    try:
+        return publisher.read_file(github_path)
+    except GithubException as e:
+        logger.warning(f"Gagal ambil config lama dari GitHub ({github_path}): {e.data.get('message', str(e))}")
+        return None
+    except Exception as e:  # Koneksi putus, isi file bukan UTF-8, dll: lanjut tanpa config lama
+        logger.warning(f"Gagal ambil config lama dari GitHub ({github_path}): {e}", exc_info=True)
+        return None
+
+# --- JOB KONVERSI DI BACKGROUND ---
+# Konversi + upload jalan di thread terpisah, jadi klik widget lain nggak ngebuang kerjaan yang lagi jalan
+CONVERSION_WORKERS = int(os.getenv("CONVERSION_WORKERS", "4"))
+CONVERSION_POLL_SECONDS = float(os.getenv("CONVERSION_POLL_SECONDS", "0.5"))
+
+@st.cache_resource
+def get_conversion_jobs():
+    # Satu runner per proses, dipakai bareng semua sesi; tiap sesi cuma nyimpen job id-nya
+    from conversion_jobs import ConversionJobRunner
+    return ConversionJobRunner(max_workers=CONVERSION_WORKERS)
 
 # --- Import Fungsi dari Modul Konverter Spesifik ---
 converter_modules = {}
 
 try:
-    from singbox_converter import process_singbox_config
+    from singbox_converter import process_singbox_config, process_singbox_config_stream, update_singbox_config, load_singbox_template, DEDUPE_POLICIES
+    from latency_probe import LATENCY_MODES
+    from config_shards import SHARD_MODES
+    from output_formats import process_multi_format_config
     converter_modules["Sing-Box"] = {
         "function": process_singbox_config, 
+        "format": "sing-box", # Nama format di output_formats.py (buat generate banyak format sekaligus)
+        "multi_format_function": process_multi_format_config, # Parse sekali, emit semua format yang dipilih
+        "stream_function": process_singbox_config_stream, # Buat input file dump yang gede
+        "incremental_function": update_singbox_config, # Patch config lama, cuma node yang berubah
         "template_local_path": "singbox-template.txt", # Template diambil dari file lokal ini
+        "template_loader": load_singbox_template, # Parse template sekali, reload otomatis kalau file berubah
+        "dedupe_policies": DEDUPE_POLICIES, # Pilihan nama yang dipakai saat node duplikat digabung
+        "latency_modes": LATENCY_MODES, # Probe TCP/TLS sebelum node masuk Best Latency / Lock Region ID
+        "region_grouping": True, # Bisa group node per negara (urltest per region)
+        "rule_compaction": True, # Route rules bisa dipadatkan (route_rules.py)
+        "result_cache": True, # Hasil konversi bisa di-cache end-to-end (result_cache.py)
+        "shard_modes": SHARD_MODES, # Node list gede bisa dipecah jadi beberapa config (config_shards.py)
+        "stable_order": True, # Node bisa diurutkan per koneksi, biar output antar update stabil
         "output_mime": "application/json", 
         "output_language": "json",
         "output_options": [ # DAFTAR FILE OUTPUT SING-BOX YANG MAU BISA DIPILIH DI GITHUB
@@ -33,6 +124,35 @@ try:
             {"display_name": "tsel-sfa (jsonconfig.json)", "github_path": "jsonconfig.json"} # Contoh lain
         ]
     }
+    converter_modules["Clash/Mihomo"] = {
+        "function": functools.partial(process_multi_format_config, formats=("clash",)),
+        "stream_function": functools.partial(process_multi_format_config, formats=("clash",)),
+        "format": "clash",
+        "multi_format_function": process_multi_format_config,
+        "template_local_path": None, # Config Clash dibangun tanpa template
+        "dedupe_policies": DEDUPE_POLICIES,
+        "latency_modes": LATENCY_MODES,
+        "output_mime": "application/x-yaml",
+        "output_language": "yaml",
+        "output_extension": "yaml",
+        "output_options": [
+            {"display_name": "clash (clash.yaml)", "github_path": "clash.yaml"}
+        ]
+    }
+    converter_modules["Xray"] = {
+        "function": functools.partial(process_multi_format_config, formats=("xray",)),
+        "stream_function": functools.partial(process_multi_format_config, formats=("xray",)),
+        "format": "xray",
+        "multi_format_function": process_multi_format_config,
+        "template_local_path": None, # Config Xray dibangun tanpa template
+        "dedupe_policies": DEDUPE_POLICIES,
+        "latency_modes": LATENCY_MODES,
+        "output_mime": "application/json",
+        "output_language": "json",
+        "output_options": [
+            {"display_name": "xray (xray.json)", "github_path": "xray.json"}
+        ]
+    }
 except ImportError:
     st.error("Gagal memuat singbox_converter.py. Pastikan file ada dan tidak ada error sintaks.")
     logger.error("Failed to import singbox_converter.py", exc_info=True)
@@ -41,6 +161,294 @@ except Exception as e:
     logger.error(f"Error during converter module initialization: {e}", exc_info=True)
 
 
+def load_converter_template(converter):
+    """Template converter (sudah di-parse kalau ada template_loader), None kalau converter-nya nggak pakai template."""
+    template_local_path = converter.get("template_local_path")
+    if not template_local_path:
+        return None
+    if converter.get("template_loader"):
+        return converter["template_loader"](template_local_path)
+    with open(template_local_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def output_filename_for(converter_name, converter):
+    return converter_name.lower().replace(" ", "_").replace("/", "_") + "_config." + converter.get("output_extension", "json")
+
+
+def build_shards_zip(shards, file_name):
+    """Semua shard dalam satu zip (<file_name>-<shard>.json), biar download-nya sekali klik."""
+    import zipfile
+    from config_shards import shard_output_path
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for shard in shards:
+            archive.writestr(shard_output_path(file_name, shard["name"]), shard["config_content"])
+    return buffer.getvalue()
+
+
+def run_conversion_job(job, request):
+    """
+    Isi job background: konversi, terus upload ke GitHub kalau dipilih. Jalan di thread lain,
+    jadi di sini nggak boleh ada pemanggilan st.* (semua input sudah dikumpulin di `request`).
+    Hasilnya (outcome) ditampilkan show_conversion_outcome di rerun berikutnya.
+    """
+    converter = converter_modules[request["converter_name"]]
+    extra_converters = {name: converter_modules[name] for name in request["extra_converter_names"]}
+    template_content = request["template_content"]
+    links_input = request["links_input"]
+
+    links_stream = None
+    if request["dump_bytes"] is not None and converter.get("stream_function"):
+        # File dump dipotong per link langsung dari bytes upload-nya (plain atau format string JSON),
+        # nggak pernah di-decode jadi satu string utuh. Bisa dibaca ulang, jadi cache hasil nggak perlu nampung semua link
+        from dump_reader import DumpLinks
+        links_stream = DumpLinks(request["dump_bytes"])
+
+    subscription_reports = []
+    if request["subscription_urls"] and converter.get("stream_function"):
+        # Link dari URL subscription langsung dialirkan ke converter setelah link manual/file
+        links_stream = itertools.chain(
+            links_stream if links_stream is not None else io.StringIO(links_input),
+            request["subscription_fetcher"].iter_links(request["subscription_urls"], subscription_reports)
+        )
+
+    pipeline_options = request["pipeline_options"]
+    if request["result_cache"] is not None:
+        # Cuma dipakai jalur konversi biasa (satu format, bukan incremental)
+        pipeline_options = {**pipeline_options, "result_cache": request["result_cache"]}
+    # Split output juga cuma jalur konversi biasa
+    pipeline_options = {**pipeline_options, **request["shard_options"]}
+    if request["incremental"]:
+        # Config lama: file di GitHub kalau mau upload, kalau nggak hasil terakhir di sesi ini
+        previous_config = None
+        if request["github_paths"]:
+            job.set_phase("Ambil config lama dari GitHub")
+            previous_config = load_previous_config_from_github(request["publisher"], request["github_paths"][0])
+        if previous_config is None:
+            previous_config = request["session_previous_config"]
+        job.set_phase("Konversi")
+        result = converter["incremental_function"](
+            previous_config,
+            links_stream if links_stream is not None else links_input,
+            template_content,
+            cache=request["cache"], output_style=request["output_style"],
+            dedupe=request["dedupe_policy"], progress=job.report_progress, **request["pipeline_options"]
+        )
+    elif extra_converters:
+        # Semua format dari satu kali parse
+        result = converter["multi_format_function"](
+            links_stream if links_stream is not None else links_input,
+            template_content, converter["output_options"],
+            formats=[converter["format"]] + [extra["format"] for extra in extra_converters.values()],
+            cache=request["cache"], output_style=request["output_style"],
+            dedupe=request["dedupe_policy"], progress=job.report_progress, **request["pipeline_options"]
+        )
+    elif links_stream is not None:
+        result = converter["stream_function"](links_stream, template_content, converter["output_options"],
+                                              cache=request["cache"], output_style=request["output_style"],
+                                              dedupe=request["dedupe_policy"], progress=job.report_progress, **pipeline_options)
+    else:
+        result = converter["function"](links_input, template_content, converter["output_options"],
+                                       cache=request["cache"], output_style=request["output_style"],
+                                       dedupe=request["dedupe_policy"], progress=job.report_progress, **pipeline_options)
+
+    # --- DEBUGGING DI APP.PY SETELAH MEMANGGIL CONVERTER ---
+    logger.debug(f"app.py: Result status from converter: {result.get('status')}")
+    if "config_content" in result:
+        logger.debug(f"app.py: Result config_content received (first 200 chars): {result['config_content'][:200]}...")
+    else:
+        logger.debug("app.py: 'config_content' not found in result.")
+    # --- AKHIR DEBUGGING ---
+
+    outcome = {"request": {key: request[key] for key in ("converter_name", "extra_converter_names", "output_location",
+                                                         "github_paths", "show_stats")},
+               "result": result, "subscription_reports": subscription_reports, "extra_outputs": {}, "publish": None}
+    if result["status"] != "success":
+        return outcome
+
+    # Output format tambahan (kalau ada), dari parse yang sama
+    outcome["extra_outputs"] = {
+        name: result["outputs"][extra["format"]]
+        for name, extra in extra_converters.items() if extra["format"] in result.get("outputs", {})
+    }
+    if result.get("shards") and request["output_location"] == "Download File":
+        # Zip-nya dibikin sekali di sini, bukan tiap rerun pas tombol download di-render
+        outcome["shards_zip"] = build_shards_zip(result["shards"], output_filename_for(request["converter_name"], converter))
+    elif request["output_location"] == "Download File":
+        # Versi terkompres buat download, juga dibikin sekali di sini (streaming per potongan)
+        from artifacts import available_encodings, compress_artifact
+        job.set_phase("Kompres hasil")
+        outcome["artifacts"] = {encoding: compress_artifact(result["config_content"], encoding)
+                                for encoding in available_encodings()}
+    config_changes = result.get("changes")
+    if (request["output_location"] != "Upload ke GitHub" or request["publisher"] is None or not request["github_paths"]
+            or (config_changes and not config_changes["changed"])):
+        return outcome
+
+    job.set_phase("Upload ke GitHub")
+    publisher = request["publisher"]
+    try:
+        if result.get("shards"):
+            # Semua shard ke <path>-<shard><ext>, sekaligus dalam satu commit
+            from config_shards import shard_output_path
+            files_to_publish = {
+                shard_output_path(github_path, shard["name"]): shard["config_content"]
+                for github_path in request["github_paths"] for shard in result["shards"]
+            }
+        else:
+            files_to_publish = {github_path: result["config_content"] for github_path in request["github_paths"]}
+        # Format tambahan ikut di commit yang sama, ke file output pertamanya
+        for extra_name, extra_config in outcome["extra_outputs"].items():
+            if extra_converters[extra_name].get("output_options"):
+                files_to_publish[extra_converters[extra_name]["output_options"][0]["github_path"]] = extra_config
+        commit_message = f"Update {', '.join(files_to_publish)} via VPN Bot Streamlit"
+
+        # Semua file ditulis dalam satu commit; file yang isinya sama di-skip
+        publish_result = publisher.publish(files_to_publish, commit_message)
+        publish_result["file_urls"] = {path: publisher.file_url(path) for path in publish_result["updated"]}
+        outcome["publish"] = publish_result
+    except GithubException as e:
+        outcome["publish"] = {"error": f"❌ Gagal konek ke GitHub API. Cek GITHUB_TOKEN_VPN_BOT lo. Error: {e.data.get('message', str(e))}"}
+        logger.error(f"GitHub connection error: {e.data.get('message', str(e))}", exc_info=True)
+    except Exception as e:
+        outcome["publish"] = {"error": f"❌ Terjadi error tak terduga saat mencoba konek ke GitHub: {e}"}
+        logger.error(f"Unexpected GitHub connection error: {e}", exc_info=True)
+    return outcome
+
+
+def show_conversion_outcome(outcome):
+    """Nampilin hasil job konversi yang sudah selesai (dipanggil ulang tiap rerun, tanpa ngitung ulang)."""
+    request = outcome["request"]
+    result = outcome["result"]
+    converter_name = request["converter_name"]
+    converter = converter_modules[converter_name]
+    extra_converters = {name: converter_modules[name] for name in request["extra_converter_names"]}
+
+    subscription_reports = outcome["subscription_reports"]
+    if subscription_reports:
+        failed_reports = [report for report in subscription_reports if report["status"] == "error"]
+        with st.expander(f"🌐 Subscription: {len(subscription_reports) - len(failed_reports)}/{len(subscription_reports)} URL berhasil diambil",
+                         expanded=bool(failed_reports)):
+            st.table([
+                {"URL": report["url"], "Status": report["status"], "HTTP": report["http_status"],
+                 "Link": report["links"], "Detik": f"{report['seconds']:.2f}", "Error": report["error"] or ""}
+                for report in subscription_reports
+            ])
+
+    if request["show_stats"] and result.get("stats"):
+        pipeline_stats = result["stats"]
+        with st.expander(f"📊 Stats konversi ({pipeline_stats['total_seconds']:.2f} detik total)"):
+            st.table([
+                {"Tahap": stage["name"], "Detik": f"{stage['seconds']:.4f}", "Item": stage["items"]}
+                for stage in pipeline_stats["stages"]
+            ])
+            if pipeline_stats["failures"]:
+                st.markdown("**Link gagal:**")
+                st.table([
+                    {"Protokol": failure["protocol"], "Alasan": failure["reason"], "Jumlah": failure["count"]}
+                    for failure in pipeline_stats["failures"]
+                ])
+
+    if result["status"] == "success":
+        st.success(result["message"])
+        if result.get("cache_stats"):
+            cache_stats = result["cache_stats"]
+            st.caption(f"Cache link: {cache_stats['hits']} hit, {cache_stats['misses']} miss "
+                       f"({cache_stats['hit_rate']:.0%} hit rate, {cache_stats['size']} entri)")
+        if result.get("result_cache_stats"):
+            result_cache_stats = result["result_cache_stats"]
+            st.caption(f"Cache hasil: {result_cache_stats['hits']} hit ({result_cache_stats['disk_hits']} dari disk), "
+                       f"{result_cache_stats['misses']} miss, {result_cache_stats['size']} hasil "
+                       f"({result_cache_stats['bytes'] / (1024 * 1024):.1f}/{result_cache_stats['max_bytes'] / (1024 * 1024):.0f} MB)")
+        if result.get("latency_stats"):
+            latency_stats = result["latency_stats"]
+            st.caption(f"Latency probe: {latency_stats['alive']} node hidup, {latency_stats['dead']} mati "
+                       f"({latency_stats['probed']} di-probe, {latency_stats['cached']} dari cache)")
+        generated_config = result["config_content"] # Ini sudah string JSON
+        extra_outputs = outcome["extra_outputs"]
+        config_changes = result.get("changes")
+        if config_changes:
+            st.caption(f"Perubahan: {len(config_changes['added'])} node baru, {len(config_changes['removed'])} node dihapus, "
+                       f"{config_changes['unchanged']} node tetap, {config_changes['selectors_updated']} selector diperbarui.")
+
+        shards = result.get("shards")
+        if shards:
+            with st.expander(f"🧩 Output dipecah jadi {len(shards)} shard", expanded=False):
+                st.table([
+                    {"Shard": shard["name"], "Node": shard["nodes"], "Ukuran": f"{shard['bytes'] / 1024:.0f} KB"}
+                    for shard in shards
+                ])
+
+        if request["output_location"] == "Download File":
+            if shards:
+                file_name = output_filename_for(converter_name, converter)
+                st.download_button(
+                    label=f"⬇️ Download {converter_name} Config ({len(shards)} shard, zip)",
+                    data=outcome["shards_zip"],
+                    file_name=file_name.rsplit(".", 1)[0] + ".zip",
+                    mime="application/zip",
+                    key="download_button"
+                )
+                st.caption(f"Preview shard pertama ({shards[0]['name']}):")
+            else:
+                # Versi terkompres duluan (jauh lebih kecil buat config yang gede), yang polos tetap ada
+                from artifacts import ARTIFACT_MIME_TYPES, artifact_path
+                file_name = output_filename_for(converter_name, converter)
+                for encoding, artifact in outcome.get("artifacts", {}).items():
+                    st.download_button(
+                        label=f"⬇️ Download {converter_name} Config ({encoding}, {len(artifact) / 1024:.0f} KB)",
+                        data=artifact,
+                        file_name=artifact_path(file_name, encoding),
+                        mime=ARTIFACT_MIME_TYPES[encoding],
+                        key=f"download_button_{encoding}"
+                    )
+                st.download_button(
+                    label=f"⬇️ Download {converter_name} Config (tanpa kompresi, {len(generated_config) / 1024:.0f} KB)",
+                    data=generated_config.encode("utf-8"),
+                    file_name=file_name,
+                    mime=converter["output_mime"],
+                    key="download_button"
+                )
+
+            st.code(generated_config, language=converter["output_language"])
+
+            for extra_name, extra_config in extra_outputs.items():
+                st.download_button(
+                    label=f"⬇️ Download {extra_name} Config",
+                    data=extra_config.encode("utf-8"),
+                    file_name=output_filename_for(extra_name, extra_converters[extra_name]),
+                    mime=extra_converters[extra_name]["output_mime"],
+                    key=f"download_button_{extra_name}"
+                )
+
+        elif request["output_location"] == "Upload ke GitHub":
+            publish_result = outcome["publish"]
+            if not GITHUB_TOKEN:
+                st.error("❌ GITHUB_TOKEN_VPN_BOT belum diset di environment variables lo!")
+            elif not request["github_paths"]:
+                st.warning("Pilih dulu file output yang mau di-upload ke GitHub!")
+            elif config_changes and not config_changes["changed"]:
+                st.info("ℹ️ Nggak ada node yang berubah, file di GitHub nggak di-commit ulang.")
+            elif publish_result and publish_result.get("error"):
+                st.error(publish_result["error"])
+            elif publish_result:
+                for output_github_path in publish_result["updated"]:
+                    st.success(f"✅ File `{output_github_path}` berhasil diupdate di GitHub!")
+                    st.markdown(f"Link file di GitHub: `{publish_result['file_urls'][output_github_path]}`")
+                for output_github_path in publish_result["skipped"]:
+                    st.info(f"ℹ️ File `{output_github_path}` isinya sama persis, di-skip.")
+                if publish_result["commit_sha"]:
+                    st.caption(f"Commit: `{publish_result['commit_sha'][:7]}`")
+
+    elif result["status"] == "cancelled":
+        st.warning("⛔ Konversi dibatalkan.")
+    elif result["status"] == "warning":
+        st.warning(result["message"])
+    else: # error
+        st.error(result["message"])
+        st.error("Lihat log Termux lo buat detail errornya, Mek!")
+
+
 # --- JUDUL APLIKASI ---
 st.title("🌍 VPN Config Converter")
 st.markdown("---")
@@ -56,6 +464,15 @@ selected_converter = converter_modules.get(selected_converter_name)
 if selected_converter:
     st.info(f"Lo milih {selected_converter_name} Converter. Pastiin format link VPN lo bener ya!")
 
+    extra_converter_names = []
+    if selected_converter.get("multi_format_function"):
+        extra_converter_names = st.multiselect(
+            "Sekalian bikin format lain (link cuma di-parse sekali buat semua format):",
+            [name for name, converter in converter_modules.items() if name != selected_converter_name and converter.get("format")],
+            key="extra_converter_names"
+        )
+    extra_converters = {name: converter_modules[name] for name in extra_converter_names}
+
     # --- INPUT LINK VPN ---
     st.subheader("2. Masukin Link VPN lo")
     vmess_links_input = st.text_area(
@@ -64,6 +481,17 @@ if selected_converter:
         placeholder="Contoh:\nvmess://eyJhZGQ...",
         key="vpn_links_input"
     )
+    uploaded_links_file = st.file_uploader(
+        "Atau upload file dump link (satu link per baris, atau dump string JSON kayak todd.txt) buat subscription yang gede banget:",
+        type=["txt"],
+        key="vpn_links_file"
+    )
+    subscription_urls_input = st.text_area(
+        "Atau URL subscription (satu URL per baris, base64 atau list biasa), diambil barengan:",
+        height=100,
+        placeholder="Contoh:\nhttps://example.com/sub?token=...",
+        key="subscription_urls_input"
+    )
 
     # --- OPSI OUTPUT ---
     st.subheader("3. Pilih Output")
@@ -73,125 +501,247 @@ if selected_converter:
         key="output_location"
     )
 
-    selected_github_option = None
+    output_style = st.radio(
+        "Format JSON output:",
+        ("pretty", "compact"),
+        format_func=lambda style: "Pretty (gampang dibaca)" if style == "pretty" else "Compact (lebih kecil, cepat di-upload)",
+        horizontal=True,
+        key="output_style"
+    )
+
+    selected_github_options = []
     if output_location == "Upload ke GitHub":
         if selected_converter.get("output_options"):
             display_names = [opt["display_name"] for opt in selected_converter["output_options"]]
-            selected_display_name = st.selectbox(
-                "Pilih file output untuk GitHub:",
+            selected_display_names = st.multiselect(
+                "Pilih file output untuk GitHub (semua di-commit sekaligus dalam satu commit):",
                 display_names,
-                key="github_output_option"
+                default=display_names[:1],
+                key="github_output_options"
             )
-            selected_github_option = next((opt for opt in selected_converter["output_options"] if opt["display_name"] == selected_display_name), None)
+            selected_github_options = [opt for opt in selected_converter["output_options"] if opt["display_name"] in selected_display_names]
         else:
             st.warning("Nggak ada opsi file output yang ditentuin buat GitHub.")
     
+    dedupe_policy = None
+    if selected_converter.get("dedupe_policies"):
+        dedupe_labels = {
+            None: "Jangan digabung",
+            "first": "Gabung, pakai nama pertama",
+            "last": "Gabung, pakai nama terakhir",
+            "shortest": "Gabung, pakai nama terpendek",
+            "longest": "Gabung, pakai nama terpanjang",
+        }
+        dedupe_policy = st.selectbox(
+            "Node duplikat (server/port/uuid/transport sama, cuma beda nama):",
+            [None] + list(selected_converter["dedupe_policies"]),
+            index=0,  # Default sama kayak library (dedupe=None): node nggak digabung kecuali user milih policy
+            format_func=lambda policy: dedupe_labels.get(policy, policy),
+            key="dedupe_policy"
+        )
+
+    latency_mode = None
+    if selected_converter.get("latency_modes"):
+        latency_labels = {
+            None: "Nggak usah di-probe",
+            "drop": "Probe, buang node mati dari Best Latency / Lock Region ID",
+            "rank": "Probe, urutkan Best Latency / Lock Region ID dari RTT tercepat",
+        }
+        latency_mode = st.selectbox(
+            "Cek koneksi node dulu (TCP/TLS handshake) sebelum masuk selector latency:",
+            [None] + list(selected_converter["latency_modes"]),
+            format_func=lambda mode: latency_labels.get(mode, mode),
+            key="latency_mode"
+        )
+
+    group_by_region = False
+    if selected_converter.get("region_grouping"):
+        group_by_region = st.checkbox(
+            "Group node per negara (satu urltest per region, selector utama isinya region) buat list node yang gede",
+            key="group_by_region"
+        )
+
+    compact_rules = False
+    if selected_converter.get("rule_compaction"):
+        compact_rules = st.checkbox(
+            "Padatkan route rules (gabung rule, port jadi interval, buang rule yang ketutup), routing tetap sama",
+            value=False,  # Opt-in kayak --compact-rules di CLI: route rules template nggak diubah kalau nggak diminta
+            key="compact_rules"
+        )
+
+    stable_order = False
+    if selected_converter.get("stable_order"):
+        stable_order = st.checkbox(
+            "Urutkan node per server (urutan link di subscription nggak ngaruh, diff antar update jadi kecil)",
+            key="stable_order"
+        )
+
+    incremental_mode = False
+    if selected_converter.get("incremental_function"):
+        incremental_mode = st.checkbox(
+            "Mode incremental (cuma patch node yang berubah dari config terakhir)",
+            key="incremental_mode"
+        )
+        if incremental_mode and group_by_region:
+            st.caption("Mode region bareng incremental: config tetap dibangun ulang penuh (group region nggak bisa di-patch per node).")
+
+    shard_options = {}
+    if selected_converter.get("shard_modes") and not extra_converters and not incremental_mode:
+        shard_labels = {
+            None: "Jangan dipecah (satu file)",
+            "count": "Pecah per jumlah node",
+            "size": "Pecah per ukuran file",
+            "region": "Pecah per negara",
+        }
+        shard_by = st.selectbox(
+            "Split output (node list gede dipecah jadi beberapa config kecil, tiap file selectornya sendiri):",
+            [None] + list(selected_converter["shard_modes"]),
+            format_func=lambda mode: shard_labels.get(mode, mode),
+            key="shard_by"
+        )
+        if shard_by == "count":
+            shard_limit = int(st.number_input("Maksimal node per file:", min_value=1, value=2000, step=500, key="shard_count_limit"))
+        elif shard_by == "size":
+            shard_limit_mb = st.number_input("Maksimal ukuran per file (MB):", min_value=0.1, value=2.0, step=0.5, key="shard_size_limit")
+            shard_limit = int(shard_limit_mb * 1024 * 1024)
+        elif shard_by == "region":
+            shard_limit = int(st.number_input("Maksimal node per negara (0 = nggak dibatasi):", min_value=0, value=0, step=500,
+                                              key="shard_region_limit")) or None
+        if shard_by:
+            shard_options = {"shard_by": shard_by, "shard_limit": shard_limit}
+
+    show_stats = st.checkbox("Tampilkan stats konversi (waktu per tahap, link gagal)", key="show_stats")
+
+    if selected_converter.get("result_cache") and st.button("🧹 Kosongkan cache hasil konversi", key="clear_result_cache"):
+        get_result_cache().clear()
+        st.info("Cache hasil konversi sudah dikosongkan, konversi berikutnya dihitung ulang dari awal.")
+
     # --- TOMBOL KONVERSI ---
     st.markdown("---")
+    jobs = get_conversion_jobs()
     if st.button("🚀 Konversi Sekarang!"):
-        if not vmess_links_input:
+        if not vmess_links_input and uploaded_links_file is None and not subscription_urls_input.strip():
             st.warning("Eh, link VPN-nya belum lo masukkin, Mek!")
         elif not selected_converter:
             st.error("Tipe konverter nggak valid.")
         else:
-            converter_func = selected_converter["function"]
-            template_local_path = selected_converter["template_local_path"]
-            
             try:
-                # Baca template dari file lokal
-                with open(template_local_path, 'r', encoding='utf-8') as f:
-                    template_content = f.read()
-                
+                # Baca template dari file lokal (template yang sudah di-parse dipakai ulang antar rerun).
+                # Converter tanpa template (Clash/Xray) pinjam template format lain yang ikut dipilih, kalau ada.
+                template_content = next(
+                    (load_converter_template(converter) for converter in [selected_converter, *extra_converters.values()]
+                     if converter.get("template_local_path")),
+                    None
+                )
+
                 # --- DEBUGGING DI APP.PY SEBELUM MEMANGGIL CONVERTER ---
-                logger.debug(f"app.py: Template content loaded (first 200 chars): {template_content[:200]}...")
+                logger.debug(f"app.py: Template loaded for {selected_converter_name} (+{len(extra_converters)} format lain)")
                 logger.debug(f"app.py: VMess links input (first 200 chars): {vmess_links_input[:200]}...")
                 # --- AKHIR DEBUGGING ---
 
-                result = converter_func(vmess_links_input, template_content, selected_converter["output_options"])
-                
-                # --- DEBUGGING DI APP.PY SETELAH MEMANGGIL CONVERTER ---
-                logger.debug(f"app.py: Result status from converter: {result.get('status')}")
-                if "config_content" in result:
-                    logger.debug(f"app.py: Result config_content received (first 200 chars): {result['config_content'][:200]}...")
-                    logger.debug(f"app.py: Type of result['config_content']: {type(result['config_content'])}")
-                else:
-                    logger.debug("app.py: 'config_content' not found in result.")
-                # --- AKHIR DEBUGGING ---
+                # Semua input widget dikumpulin sekarang: job-nya jalan di thread lain dan nggak boleh nyentuh st.*
+                dump_bytes = None
+                if uploaded_links_file is not None and selected_converter.get("stream_function"):
+                    dump_bytes = uploaded_links_file.getvalue()
+                subscription_urls = []
+                if subscription_urls_input.strip():
+                    from subscription_fetcher import parse_subscription_urls
+                    subscription_urls = parse_subscription_urls(subscription_urls_input)
 
-                if result["status"] == "success":
-                    st.success(result["message"])
-                    generated_config = result["config_content"] # Ini sudah string JSON
-
-                    if output_location == "Download File":
-                        output_filename = selected_converter_name.lower().replace(" ", "_") + "_config.json"
-                        st.download_button(
-    label=f"⬇️ Download {selected_converter_name} Config",
-    data=generated_config.encode("utf-8"), # GANTI ke "utf-8"
-    file_name=output_filename,
-    mime=selected_converter["output_mime"],
-    key="download_button"
-)
+                # Total link buat progress bar (perkiraan); nggak diketahui kalau ada URL subscription
+                total_links = None
+                if not subscription_urls:
+                    if dump_bytes is not None:
+                        from dump_reader import estimate_dump_links
+                        total_links = estimate_dump_links(dump_bytes)
+                    else:
+                        total_links = sum(1 for line in vmess_links_input.splitlines() if line.strip())
+
+                pipeline_options = {}
+                if latency_mode:
+                    pipeline_options = {"prober": get_latency_prober(), "latency_mode": latency_mode}
+                if group_by_region:
+                    pipeline_options["group_by_region"] = True
+                if compact_rules:
+                    pipeline_options["compact_rules"] = True
+                if stable_order:
+                    pipeline_options["stable_order"] = True
+
+                conversion_request = {
+                    "converter_name": selected_converter_name,
+                    "extra_converter_names": list(extra_converters),
+                    "template_content": template_content,
+                    "links_input": vmess_links_input,
+                    "dump_bytes": dump_bytes,
+                    "subscription_urls": subscription_urls,
+                    "subscription_fetcher": get_subscription_fetcher() if subscription_urls else None,
+                    "cache": get_parsed_link_cache(),
+                    # Cache hasil cuma buat satu format tanpa incremental (multi-format & patch punya hasil sendiri)
+                    "result_cache": (get_result_cache() if selected_converter.get("result_cache") and not extra_converters
+                                     and not incremental_mode else None),
+                    "output_style": output_style,
+                    "dedupe_policy": dedupe_policy,
+                    "pipeline_options": pipeline_options,
+                    "shard_options": shard_options,
+                    "incremental": incremental_mode,
+                    "session_previous_config": st.session_state.get("last_generated_configs", {}).get(selected_converter_name),
+                    "output_location": output_location,
+                    "github_paths": [opt["github_path"] for opt in selected_github_options] if output_location == "Upload ke GitHub" else [],
+                    "publisher": get_github_publisher() if output_location == "Upload ke GitHub" and GITHUB_TOKEN else None,
+                    "show_stats": show_stats,
+                }
 
-                        st.code(generated_config, language=selected_converter["output_language"])
-
-                    elif output_location == "Upload ke GitHub":
-                        if not GITHUB_TOKEN:
-                            st.error("❌ GITHUB_TOKEN_VPN_BOT belum diset di environment variables lo!")
-                        elif not selected_github_option:
-                            st.warning("Pilih dulu file output yang mau di-upload ke GitHub!")
-                        else:
-                            try:
-                                # Inisialisasi GitHub
-                                g = Github(GITHUB_TOKEN)
-                                repo = g.get_user(REPO_OWNER).get_repo(REPO_NAME)
-                                
-                                output_github_path = selected_github_option["github_path"]
-                                commit_message = f"Update {output_github_path} via VPN Bot Streamlit"
-
-                                try:
-                                    # Coba dapatkan file yang sudah ada
-                                    contents = repo.get_contents(output_github_path, ref=BRANCH_NAME)
-                                    # Update file
-                                    repo.update_file(
-                                        contents.path,
-                                        commit_message,
-                                        generated_config, # Konten sudah string, tidak perlu encode lagi
-                                        contents.sha,
-                                        branch=BRANCH_NAME
-                                    )
-                                    st.success(f"✅ File `{output_github_path}` berhasil diupdate di GitHub!")
-                                except GithubException as e:
-                                    if e.status == 404:
-                                        # File tidak ditemukan, buat baru
-                                        repo.create_file(
-                                            output_github_path,
-                                            commit_message,
-                                            generated_config, # Konten sudah string, tidak perlu encode lagi
-                                            branch=BRANCH_NAME
-                                        )
-                                        st.success(f"✅ File `{output_github_path}` berhasil dibuat di GitHub!")
-                                    else:
-                                        raise # Re-raise error lain
-                                
-                                st.markdown(f"Link file di GitHub: `{repo.html_url}/blob/{BRANCH_NAME}/{output_github_path}`")
-                                    
-                            except GithubException as e:
-                                st.error(f"❌ Gagal konek ke GitHub API. Cek GITHUB_TOKEN_VPN_BOT lo. Error: {e.data.get('message', str(e))}")
-                                logger.error(f"GitHub connection error: {e.data.get('message', str(e))}", exc_info=True)
-                            except Exception as e:
-                                st.error(f"❌ Terjadi error tak terduga saat mencoba konek ke GitHub: {e}")
-                                logger.error(f"Unexpected GitHub connection error: {e}", exc_info=True)
-
-                elif result["status"] == "warning":
-                    st.warning(result["message"])
-                else: # error
-                    st.error(result["message"])
-                    st.error("Lihat log Termux lo buat detail errornya, Mek!")
+                # Job lama sesi ini (kalau masih jalan) dibatalin, diganti yang baru
+                previous_job = jobs.get(st.session_state.get("conversion_job_id"))
+                if previous_job is not None:
+                    previous_job.cancel()
+                job = jobs.submit(functools.partial(run_conversion_job, request=conversion_request),
+                                  total=total_links, label=selected_converter_name)
+                st.session_state["conversion_job_id"] = job.id
+                st.session_state.pop("conversion_outcome", None)
 
             except Exception as e:
                 st.error(f"❌ Terjadi error saat memproses: {e}")
                 logger.error(f"Overall processing error: {e}", exc_info=True)
 
+    # --- PROGRESS / HASIL KONVERSI ---
+    # Job-nya hidup di runner (bukan di script), jadi rerun karena klik widget nggak ngebuang kerjaannya
+    conversion_job = jobs.get(st.session_state.get("conversion_job_id"))
+    if conversion_job is not None and not conversion_job.finished_status:
+        if conversion_job.total:
+            progress_text = f"{conversion_job.phase}: {conversion_job.done}/{conversion_job.total} link"
+        else:
+            progress_text = f"{conversion_job.phase}: {conversion_job.done} link"
+        if conversion_job.cancel_requested:
+            progress_text += " (lagi dibatalin...)"
+        st.progress(conversion_job.fraction or 0.0, text=progress_text)
+        if st.button("⛔ Batalkan konversi", key="cancel_conversion"):
+            conversion_job.cancel()
+        time.sleep(CONVERSION_POLL_SECONDS)
+        st.rerun()
+    elif conversion_job is not None:
+        # Selesai: hasilnya dipindah ke session state (tetap tampil tiap rerun), job dilepas dari runner
+        if conversion_job.status == "error":
+            outcome = {"error": conversion_job.error}
+        elif conversion_job.outcome is None:  # Dibatalin sebelum converter sempat balikin hasil
+            outcome = {"cancelled": True}
+        else:
+            outcome = conversion_job.outcome
+        result = outcome.get("result")
+        if result and result["status"] == "success":
+            st.session_state.setdefault("last_generated_configs", {})[outcome["request"]["converter_name"]] = result["config_content"]
+        st.session_state["conversion_outcome"] = outcome
+        del st.session_state["conversion_job_id"]
+        jobs.forget(conversion_job.id)
+
+    conversion_outcome = st.session_state.get("conversion_outcome")
+    if conversion_outcome is not None:
+        if conversion_outcome.get("error"):
+            st.error(f"❌ Terjadi error saat memproses: {conversion_outcome['error']}")
+        elif conversion_outcome.get("cancelled"):
+            st.warning("⛔ Konversi dibatalkan.")
+        else:
+            show_conversion_outcome(conversion_outcome)
 
 st.markdown("---")
 st.caption("Dibuat dengan 🔥 oleh teman lo.")
@@ -0,0 +1,104 @@
+# artifacts.py
+# Versi terkompres (gzip/zstd) dari config yang dihasilkan, buat download dan file di samping output CLI.
+# Kompresinya streaming: string config di-encode dan dikompres per potongan, jadi nggak ada salinan
+# bytes utuh tambahan selain hasil kompresinya sendiri. Output gzip deterministik (mtime 0, tanpa nama
+# file), jadi config yang sama selalu jadi bytes yang sama persis.
+#
+# Contoh:
+#   data = compress_artifact(result["config_content"], "gzip")
+#   write_artifact("sfa.txt.gz", result["config_content"], "gzip")
+import gzip
+import io
+import logging
+import os
+import tempfile
+
+try:
+    import zstandard
+except ImportError:  # zstandard opsional, tanpa itu cuma gzip yang tersedia
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_ENCODINGS = ("gzip", "zstd")
+ARTIFACT_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+ARTIFACT_MIME_TYPES = {"gzip": "application/gzip", "zstd": "application/zstd"}
+DEFAULT_LEVELS = {"gzip": 9, "zstd": 10}
+
+# Ukuran potongan string yang di-encode + dikompres sekali jalan
+CHUNK_CHARS = 1024 * 1024
+
+
+def available_encodings():
+    """The encodings usable in this environment (zstd needs the optional zstandard package)."""
+    return tuple(encoding for encoding in ARTIFACT_ENCODINGS if encoding != "zstd" or zstandard is not None)
+
+
+def _iter_encoded_chunks(content, chunk_chars=CHUNK_CHARS):
+    # Potong di batas karakter (bukan byte), jadi karakter multi-byte nggak pernah kebelah
+    for start in range(0, len(content), chunk_chars):
+        yield content[start:start + chunk_chars].encode("utf-8")
+
+
+def iter_compressed(content, encoding="gzip", level=None, chunk_chars=CHUNK_CHARS):
+    """
+    Yields the compressed bytes of the string `content` chunk by chunk. `encoding` is "gzip"
+    (deterministic header: mtime 0, no file name) or "zstd" (needs the zstandard package).
+    """
+    if encoding not in ARTIFACT_ENCODINGS:
+        raise ValueError(f"Encoding artifact '{encoding}' nggak dikenal, pilih salah satu dari {ARTIFACT_ENCODINGS}")
+    if encoding not in available_encodings():
+        raise ValueError(f"Encoding '{encoding}' butuh package 'zstandard' (pip install zstandard)")
+    level = DEFAULT_LEVELS[encoding] if level is None else level
+
+    if encoding == "zstd":
+        compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        for chunk in _iter_encoded_chunks(content, chunk_chars):
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+        return
+
+    # GzipFile ke buffer yang dikosongin tiap potongan, biar header/trailer-nya tetap format gzip standar
+    sink = io.BytesIO()
+    with gzip.GzipFile(fileobj=sink, mode="wb", compresslevel=level, mtime=0, filename="") as compressor:
+        for chunk in _iter_encoded_chunks(content, chunk_chars):
+            compressor.write(chunk)
+            if sink.tell():
+                yield sink.getvalue()
+                sink.seek(0)
+                sink.truncate()
+    yield sink.getvalue()
+
+
+def compress_artifact(content, encoding="gzip", level=None):
+    """The whole compressed artifact of `content` as bytes (see iter_compressed)."""
+    return b"".join(iter_compressed(content, encoding, level))
+
+
+def artifact_path(path, encoding):
+    """Path of the compressed artifact next to `path`: "sfa.txt" -> "sfa.txt.gz"."""
+    return path + ARTIFACT_EXTENSIONS[encoding]
+
+
+def write_artifact(path, content, encoding="gzip", level=None):
+    """
+    Streams the compressed `content` into `path` atomically (temp file + rename) and returns
+    the number of bytes written.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter_compressed(content, encoding, level):
+                f.write(chunk)
+                written += len(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    logger.debug(f"Artifact {encoding} ditulis: {path} ({written} bytes)")
+    return written
@@ -0,0 +1,95 @@
+# benchmarks/bench_memory.py
+# Bandingkan peak RSS untuk N node: record __slots__ (outbound_records.py) vs dict bertingkat per node,
+# plus input string: iter_links (dipotong dari string aslinya) vs splitlines() sebagai baseline.
+# Tiap mode dijalankan di subprocess sendiri supaya angka RSS-nya bersih.
+#
+# Jalankan dari root repo:  python -m benchmarks.bench_memory -n 100000
+import argparse
+import gc
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+MODES = ("records", "dicts", "str-input", "str-splitlines")
+STR_INPUT_MODES = ("str-input", "str-splitlines")
+
+
+def _peak_rss_kb():
+    # ru_maxrss dalam KB di Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_str_mode(mode, count):
+    # Peak RSS di sini ketutup list link hasil generate, jadi pakai peak tracemalloc selama link dibaca
+    from benchmarks.synthetic import generate_links
+    from singbox_converter import iter_links
+
+    text = "\n".join(generate_links(count))
+    gc.collect()
+    tracemalloc.start()
+
+    start = time.perf_counter()
+    links = iter_links(text) if mode == "str-input" else (line.strip() for line in text.splitlines())
+    total = sum(1 for link in links if link)
+    elapsed = time.perf_counter() - start
+    peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+
+    input_mb = len(text) / (1024 * 1024)
+    print(f"{mode:<14}: {total} link ({input_mb:.1f} MB), {elapsed:6.2f}s, peak alokasi +{peak_mb:8.1f} MB")
+    return peak_mb, input_mb
+
+
+def run_mode(mode, count):
+    if mode in STR_INPUT_MODES:
+        peak_mb, input_mb = run_str_mode(mode, count)
+        # iter_links nggak boleh nyalin seluruh input (io.StringIO dulu bikin ~4x ukuran input)
+        if mode == "str-input" and peak_mb > input_mb / 4:
+            print(f"GAGAL: iter_links makan {peak_mb:.1f} MB buat input {input_mb:.1f} MB")
+            sys.exit(1)
+        return
+
+    from benchmarks.synthetic import generate_links
+    from singbox_converter import iter_singbox_outbounds
+
+    logging.disable(logging.WARNING)
+    links = generate_links(count)
+    gc.collect()
+    rss_before = _peak_rss_kb()
+
+    start = time.perf_counter()
+    if mode == "records":
+        outbounds = list(iter_singbox_outbounds(links))
+    else:
+        outbounds = [o.to_dict() for o in iter_singbox_outbounds(links)]
+    elapsed = time.perf_counter() - start
+    gc.collect()
+
+    rss_delta_mb = (_peak_rss_kb() - rss_before) / 1024
+    print(f"{mode:<8}: {len(outbounds)} node, {elapsed:6.2f}s, peak RSS +{rss_delta_mb:8.1f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark memori representasi outbound.")
+    parser.add_argument("-n", "--count", type=int, default=100000)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        run_mode(args.mode, args.count)
+        return 0
+    for mode in MODES:
+        subprocess.run([sys.executable, "-m", "benchmarks.bench_memory", "-n", str(args.count), "--mode", mode],
+                       cwd=ROOT_DIR, check=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+# benchmarks/bench_parallel.py
+# Benchmark throughput konversi link serial vs process pool dengan jumlah worker berbeda.
+#
+# Jalankan dari root repo:  python -m benchmarks.bench_parallel -n 100000 -w 1 2 4 8 16
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate_links
+from singbox_converter import iter_singbox_outbounds, iter_singbox_outbounds_parallel
+
+
+def main(argv=None):
+    cpu_count = os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, 8, 16, cpu_count} & set(range(1, cpu_count + 1)))
+    parser = argparse.ArgumentParser(description="Benchmark skala throughput konversi paralel.")
+    parser.add_argument("-n", "--count", type=int, default=100000)
+    parser.add_argument("-w", "--workers", type=int, nargs="+", default=default_workers)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    links = generate_links(args.count)
+
+    start = time.perf_counter()
+    serial_tags = [o["tag"] for o in iter_singbox_outbounds(links)]
+    serial_elapsed = time.perf_counter() - start
+    print(f"serial      : {serial_elapsed:7.2f}s  {args.count / serial_elapsed:10.0f} link/s")
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        tags = [o["tag"] for o in iter_singbox_outbounds_parallel(links, workers=workers, chunk_size=args.chunk_size)]
+        elapsed = time.perf_counter() - start
+        status = "OK" if tags == serial_tags else "MISMATCH"
+        print(f"workers={workers:<3}: {elapsed:7.2f}s  {args.count / elapsed:10.0f} link/s  "
+              f"speedup x{serial_elapsed / elapsed:.2f}  urutan tag {status}")
+        if tags != serial_tags:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
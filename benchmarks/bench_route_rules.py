@@ -0,0 +1,167 @@
+# benchmarks/bench_route_rules.py
+# Cek + benchmark compact_route_rules: keputusan routing (rule pertama yang cocok -> outbound)
+# harus sama persis sebelum dan sesudah dipadatkan. Matcher di sini ditulis terpisah dari
+# route_rules.py (semantik rule default Sing-Box), jadi bukan ngecek kode dengan dirinya sendiri.
+#   1. route.rules dari singbox-template.txt, dicek ke semua port 0-65535 x network x sampel atribut lain
+#   2. rule list acak (universe nilai kecil biar banyak overlap) x koneksi acak
+# Keputusan yang beda langsung AssertionError (lengkap dengan rule, hasil padatan & koneksinya), bukan cuma dihitung.
+#
+# Jalankan dari root repo:  python -m benchmarks.bench_route_rules -n 2000
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from route_rules import compact_route_rules
+
+# Grup field yang di-OR; antar grup (dan field lain) di-AND
+OR_GROUPS = (
+    ("domain", "domain_suffix", "domain_keyword", "domain_regex", "geosite", "geoip", "ip_cidr"),
+    ("source_geoip", "source_ip_cidr"),
+)
+TOKEN_FIELDS = OR_GROUPS[0] + OR_GROUPS[1]
+NETWORKS = ("tcp", "udp")
+
+
+def _values(value):
+    return value if isinstance(value, list) else [value]
+
+
+def _port_matches(rule, port):
+    if "port" not in rule and "port_range" not in rule:
+        return None
+    if port in {int(p) for p in _values(rule.get("port", []))}:
+        return True
+    for text in _values(rule.get("port_range", [])):
+        start, _, end = text.partition(":")
+        if (int(start) if start else 0) <= port <= (int(end) if end else 65535):
+            return True
+    return False
+
+
+def rule_matches(rule, conn):
+    """conn: {"network", "port", "inbound", "protocol", "tokens": {field: set}}."""
+    if _port_matches(rule, conn["port"]) is False:
+        return False
+    for group in OR_GROUPS:
+        fields = [field for field in group if field in rule]
+        if fields and not any(set(_values(rule[field])) & conn["tokens"].get(field, set()) for field in fields):
+            return False
+    for field in ("network", "inbound", "protocol"):
+        if field in rule and conn[field] not in _values(rule[field]):
+            return False
+    return True
+
+
+def route(rules, conn):
+    for rule in rules:
+        if rule_matches(rule, conn):
+            return rule["outbound"]
+    return "final"
+
+
+def _token_universe(rules):
+    universe = {field: set() for field in TOKEN_FIELDS}
+    for rule in rules:
+        for field in TOKEN_FIELDS:
+            universe[field].update(_values(rule.get(field, [])))
+    return {field: sorted(values) + ["other"] for field, values in universe.items()}
+
+
+def random_connection(rng, universe, inbounds=("mixed-in", "dns-in", "tun-in"), protocols=("tls", "http", "stun", "quic"),
+                      port=None):
+    return {
+        "network": rng.choice(NETWORKS),
+        "port": rng.randint(0, 65535) if port is None else port,
+        "inbound": rng.choice(inbounds),
+        "protocol": rng.choice(protocols),
+        "tokens": {field: {value for value in values if rng.random() < 0.3} for field, values in universe.items()},
+    }
+
+
+def random_rules(rng, count):
+    ports = list(range(0, 40))
+    rules = []
+    for _ in range(count):
+        rule = {}
+        if rng.random() < 0.5:
+            rule["network"] = rng.choice(["tcp", "udp", ["tcp", "udp"]])
+        if rng.random() < 0.7:
+            rule["port"] = rng.sample(ports, rng.randint(1, 8)) if rng.random() < 0.8 else rng.choice(ports)
+        if rng.random() < 0.5:
+            start = rng.randint(0, 35)
+            rule["port_range"] = [f"{start}:{start + rng.randint(0, 8)}" for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.3:
+            rule["geosite"] = rng.sample(["a", "b", "c"], rng.randint(1, 2))
+        if rng.random() < 0.2:
+            rule["domain_suffix"] = rng.sample(["x.com", "y.com"], rng.randint(1, 2))
+        if rng.random() < 0.2:
+            rule["protocol"] = rng.choice(["tls", "stun", ["tls", "quic"]])
+        rule["outbound"] = rng.choice(["A", "B", "C"])
+        rules.append(rule)
+    return rules
+
+
+def assert_same_route(rules, compacted, conn):
+    expected, actual = route(rules, conn), route(compacted, conn)
+    assert expected == actual, (f"keputusan routing berubah ({expected} -> {actual}): {json.dumps(rules)}\n"
+                                f"  -> {json.dumps(compacted)}\n  conn {conn}")
+
+
+def check_template(rules, samples, rng):
+    """Asserts that the compacted template rules route every port x `samples` random connections the same way."""
+    compacted, stats = compact_route_rules(rules)
+    universe = _token_universe(rules)
+    checked = 0
+    for port in range(0, 65536):
+        for _ in range(samples):
+            assert_same_route(rules, compacted, random_connection(rng, universe, port=port))
+            checked += 1
+    return stats, checked
+
+
+def check_random(rule_sets, connections, rng):
+    """Asserts routing equivalence for `rule_sets` random rule lists x `connections` random connections."""
+    checked = 0
+    for _ in range(rule_sets):
+        rules = random_rules(rng, rng.randint(2, 12))
+        compacted, _ = compact_route_rules(rules)
+        universe = _token_universe(rules)
+        for _ in range(connections):
+            assert_same_route(rules, compacted, random_connection(rng, universe, port=rng.randint(0, 45)))
+            checked += 1
+    return checked
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cek keputusan routing + ukuran route.rules sebelum/sesudah dipadatkan.")
+    parser.add_argument("-n", "--rule-sets", type=int, default=2000, help="Jumlah rule list acak.")
+    parser.add_argument("-c", "--connections", type=int, default=200, help="Koneksi acak per rule list.")
+    parser.add_argument("-s", "--samples", type=int, default=2, help="Sampel koneksi per port buat rule template.")
+    parser.add_argument("--seed", type=int, default=1337)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    with open(os.path.join(ROOT_DIR, "singbox-template.txt"), "r", encoding="utf-8") as f:
+        rules = json.load(f)["route"]["rules"]
+    start = time.perf_counter()
+    compact_route_rules(rules)
+    elapsed = time.perf_counter() - start
+    stats, template_checked = check_template(rules, args.samples, rng)
+    print(f"template: {stats['rules_before']} -> {stats['rules_after']} rule, {stats['entries_before']} -> "
+          f"{stats['entries_after']} entry (shadowed {stats['shadowed']}, merged {stats['merged']}), "
+          f"{elapsed * 1000:.2f} ms, {template_checked} koneksi dicek")
+
+    random_checked = check_random(args.rule_sets, args.connections, rng)
+    print(f"acak: {args.rule_sets} rule list x {args.connections} koneksi, {random_checked} koneksi dicek")
+    print("OK: keputusan routing sama persis")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+# benchmarks/bench_selector_rewrite.py
+# Benchmark regresi: konversi 50k link sintetis ke singbox-template.txt dan pastikan
+# output-nya sama persis (byte per byte) dengan output implementasi lama.
+#
+# Jalankan dari root repo:  python -m benchmarks.bench_selector_rewrite
+import argparse
+import hashlib
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate_links
+from singbox_converter import process_singbox_config
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "singbox-template.txt")
+
+# SHA-256 dari config_content yang dihasilkan implementasi lama (rewrite selector berbasis list)
+# untuk generate_links(n, seed=1337) + singbox-template.txt.
+EXPECTED_SHA256 = {
+    2000: "62d8a86790849d3ca95849e1b5abb5680f95ef72761b920f2e0e20e0bc25076d",
+    5000: "81e09f89edde18ada579947231bba282bcd5aac5f36790a2b57987cc3bc9de61",
+    50000: "9e58523c90c3a0c8061b6695ff3f2def3056264a6e6870c06dc3c619bf21e0bc",
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark regresi rewrite selector Sing-Box.")
+    parser.add_argument("-n", "--count", type=int, default=50000, choices=sorted(EXPECTED_SHA256))
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    with open(TEMPLATE_PATH, "r", encoding="utf-8") as f:
+        template_content = f.read()
+    links_str = "\n".join(generate_links(args.count))
+
+    start = time.perf_counter()
+    result = process_singbox_config(links_str, template_content)
+    elapsed = time.perf_counter() - start
+
+    if result["status"] != "success":
+        print(f"FAIL: konversi gagal: {result['message']}")
+        return 1
+
+    digest = hashlib.sha256(result["config_content"].encode("utf-8")).hexdigest()
+    print(f"{args.count} link dikonversi dalam {elapsed:.2f}s ({len(result['config_content'])} bytes)")
+    if digest != EXPECTED_SHA256[args.count]:
+        print(f"FAIL: output berbeda dari output lama (sha256 {digest})")
+        return 1
+    print("OK: output identik byte per byte dengan output lama")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
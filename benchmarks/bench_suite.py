@@ -0,0 +1,181 @@
+# benchmarks/bench_suite.py
+# Suite benchmark converter: untuk tiap ukuran subscription sintetis (generate_subscription) ukur
+# konversi per link, process_singbox_config end to end, serialisasi, dan peak memory.
+# Tiap ukuran jalan di subprocess sendiri biar peak RSS-nya bersih. Hasil ditulis sebagai
+# JSON Lines (satu baris per ukuran) supaya bisa dibandingkan antar versi.
+#
+# Jalankan dari root repo:
+#   python -m benchmarks.bench_suite -n 1000 10000 100000 -o bench_output.txt
+#   python -m benchmarks.bench_suite -n 1000 10000 --compare bench_output.txt   # bandingkan dengan run lama
+import argparse
+import datetime
+import gc
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+TEMPLATE_PATH = os.path.join(ROOT_DIR, "singbox-template.txt")
+DEFAULT_SIZES = [1000, 10000, 100000]
+MAX_SIZE = 1000000
+
+# Metrik waktu yang dibandingkan di --compare (lebih kecil = lebih baik)
+COMPARED_METRICS = ("convert_seconds", "end_to_end_seconds", "serialize_pretty_seconds",
+                    "serialize_compact_seconds", "peak_rss_mb")
+
+
+def _peak_rss_mb():
+    # ru_maxrss dalam KB di Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_size(count, seed):
+    """Benchmarks one subscription size in the current process; returns the result record."""
+    from benchmarks.synthetic import generate_subscription
+    from pipeline_stats import PipelineStats
+    from singbox_converter import (SingboxTemplate, convert_link_source, convert_link_to_singbox_outbound,
+                                   process_singbox_config, render_singbox_config)
+
+    logging.disable(logging.WARNING)
+    with open(TEMPLATE_PATH, "r", encoding="utf-8") as f:
+        template_content = f.read()
+    links = generate_subscription(count, seed)
+    links_str = "\n".join(links)
+    gc.collect()
+    rss_baseline = _peak_rss_mb()
+
+    # 1. Konversi per link (parse + tag), tanpa template
+    start = time.perf_counter()
+    converted = 0
+    for counter, link in enumerate(links, 1):
+        if convert_link_to_singbox_outbound(link, counter) is not None:
+            converted += 1
+    convert_seconds = time.perf_counter() - start
+
+    # 2. End to end: string link -> config JSON (template di-parse ulang, seperti pemanggilan biasa)
+    start = time.perf_counter()
+    result = process_singbox_config(links_str, template_content)
+    end_to_end_seconds = time.perf_counter() - start
+    if result["status"] != "success":
+        raise RuntimeError(f"Konversi gagal: {result['message']}")
+    config_bytes = len(result["config_content"].encode("utf-8"))
+    del result
+
+    # 3. Serialisasi saja (config yang sama, dua style)
+    stats = PipelineStats()
+    template = SingboxTemplate(template_content)
+    outbounds, _ = convert_link_source(links_str, stats)
+    serialize_seconds = {}
+    for style in ("pretty", "compact"):
+        style_stats = PipelineStats()
+        render_singbox_config(template, outbounds, style_stats, output_style=style)
+        serialize_seconds[style] = next(s["seconds"] for s in style_stats.to_dict()["stages"] if s["name"] == "serialization")
+
+    return {
+        "links": count,
+        "converted": converted,
+        "convert_seconds": round(convert_seconds, 6),
+        "convert_links_per_second": round(count / convert_seconds) if convert_seconds else None,
+        "end_to_end_seconds": round(end_to_end_seconds, 6),
+        "serialize_pretty_seconds": serialize_seconds["pretty"],
+        "serialize_compact_seconds": serialize_seconds["compact"],
+        "config_bytes": config_bytes,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "peak_rss_delta_mb": round(_peak_rss_mb() - rss_baseline, 1),
+    }
+
+
+def _load_results(path):
+    results = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                results[record["links"]] = record
+    return results
+
+
+def compare(previous, current, threshold):
+    """Prints per-metric changes vs a previous run; returns how many metrics regressed beyond `threshold`."""
+    regressions = 0
+    for record in current:
+        old = previous.get(record["links"])
+        if old is None:
+            print(f"{record['links']:>8} link: nggak ada di hasil lama")
+            continue
+        for metric in COMPARED_METRICS:
+            if not old.get(metric) or record.get(metric) is None:
+                continue
+            change = (record[metric] - old[metric]) / old[metric]
+            flag = "REGRESI" if change > threshold else ""
+            regressions += bool(flag)
+            print(f"{record['links']:>8} link  {metric:<26} {old[metric]:>12} -> {record[metric]:>12}  {change:+7.1%} {flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark suite converter (waktu + memori per ukuran subscription).")
+    parser.add_argument("-n", "--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help=f"Jumlah link per run (1 sampai {MAX_SIZE}).")
+    parser.add_argument("--seed", type=int, default=1337)
+    parser.add_argument("-o", "--output", default=os.path.join(ROOT_DIR, "bench_output.txt"),
+                        help="File JSON Lines hasil benchmark (ditimpa).")
+    parser.add_argument("--compare", help="File hasil run lama buat dibandingkan.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Batas regresi relatif (default 10%%).")
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)  # dipakai subprocess per ukuran
+    args = parser.parse_args(argv)
+
+    if args.size:
+        print(json.dumps(run_size(args.size, args.seed)))
+        return 0
+
+    for size in args.sizes:
+        if not 1 <= size <= MAX_SIZE:
+            parser.error(f"Ukuran harus antara 1 dan {MAX_SIZE}: {size}")
+    previous = _load_results(args.compare) if args.compare else None
+
+    meta = {
+        "revision": _git_revision(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+    }
+    results = []
+    for size in args.sizes:
+        completed = subprocess.run([sys.executable, "-m", "benchmarks.bench_suite", "--size", str(size), "--seed", str(args.seed)],
+                                   cwd=ROOT_DIR, check=True, capture_output=True, text=True)
+        record = {**json.loads(completed.stdout.strip().splitlines()[-1]), **meta}
+        results.append(record)
+        print(f"{size:>8} link: konversi {record['convert_seconds']:.2f}s ({record['convert_links_per_second']} link/s), "
+              f"end to end {record['end_to_end_seconds']:.2f}s, serialisasi {record['serialize_pretty_seconds']:.2f}s "
+              f"pretty / {record['serialize_compact_seconds']:.2f}s compact, peak RSS {record['peak_rss_mb']} MB")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        for record in results:
+            f.write(json.dumps(record) + "\n")
+    print(f"Hasil ditulis ke {args.output}")
+
+    if previous is not None:
+        return 1 if compare(previous, results, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
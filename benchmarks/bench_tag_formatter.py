@@ -0,0 +1,99 @@
+# benchmarks/bench_tag_formatter.py
+# Microbenchmark format_singbox_tag vs formatter lama (regex di-compile per node, tabel 20 negara).
+#
+# Jalankan dari root repo:  python -m benchmarks.bench_tag_formatter -n 100000
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import COUNTRY_CODES, ISP_NAMES
+from singbox_converter import format_singbox_tag
+
+# Tabel lama, cuma buat pembanding
+LEGACY_COUNTRY_EMOJIS = {
+    "US": "🇺🇸", "SG": "🇸🇬", "ID": "🇮🇩", "JP": "🇯🇵", "DE": "🇩🇪",
+    "FR": "🇫🇷", "UK": "🇬🇧", "CA": "🇨🇦", "AU": "🇦🇺", "NL": "🇳🇱",
+    "KR": "🇰🇷", "HK": "🇭🇰", "TW": "🇹🇼", "IN": "🇮🇳", "BR": "🇧🇷",
+    "RU": "🇷🇺", "SE": "🇸🇪", "FI": "🇫🇮", "CH": "🇨🇭", "AR": "🇦🇷",
+}
+
+# Kode di luar tabel lama, biar kelihatan beda coverage-nya
+EXTRA_CODES = ["AE", "AD", "MY", "VN", "TH", "PH", "TR", "ZA"]
+
+
+def legacy_format_singbox_tag(original_tag_name, node_counter):
+    display_name = original_tag_name
+    country_code = ""
+    match_country = re.match(r'^([A-Za-z]{2})\s*-\s*(.*)', display_name)
+    if match_country:
+        country_code = match_country.group(1).upper()
+        display_name = match_country.group(2).strip()
+    display_name = re.sub(r'\s*\[.*?\]\s*', '', display_name).strip()
+    if not display_name or display_name.lower().startswith(("vmess", "vless", "trojan", "node")):
+        display_name = original_tag_name.replace('_', ' ').strip()
+    emoji = LEGACY_COUNTRY_EMOJIS.get(country_code.upper(), "🌎")
+    return f"{emoji} {display_name} #{node_counter}".strip()
+
+
+def _flag(code):
+    return "".join(chr(ord(c) + 0x1F1E6 - ord("A")) for c in code)
+
+
+def generate_names(count, seed=1337):
+    """Campuran konvensi nama: "CC - ISP [PROTO]", "🇦🇪 (AE) ISP", "(CC) ISP", bendera saja, dan nama polos."""
+    rng = random.Random(seed)
+    codes = COUNTRY_CODES + EXTRA_CODES
+    styles = (
+        lambda code, isp: f"{code} - {isp} [VLESS-TLS]",
+        lambda code, isp: f"{_flag(code)} ({code}) {isp}",
+        lambda code, isp: f"({code}) {isp}",
+        lambda code, isp: f"{_flag(code)} {isp}",
+        lambda code, isp: f"{isp}_{rng.randint(1, 99)}",
+    )
+    return [styles[i % len(styles)](rng.choice(codes), rng.choice(ISP_NAMES)) for i in range(count)]
+
+
+def _time(formatter, names, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tags = [formatter(name, i) for i, name in enumerate(names, 1)]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, tags
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmark formatter tag outbound.")
+    parser.add_argument("-n", "--count", type=int, default=100000)
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Ambil waktu terbaik dari N kali jalan.")
+    args = parser.parse_args(argv)
+
+    names = generate_names(args.count)
+    legacy_elapsed, legacy_tags = _time(legacy_format_singbox_tag, names, args.repeat)
+    new_elapsed, new_tags = _time(format_singbox_tag, names, args.repeat)
+
+    print(f"lama : {legacy_elapsed:6.3f}s  {args.count / legacy_elapsed:10.0f} nama/s  "
+          f"globe {sum(t.startswith('🌎') for t in legacy_tags)}")
+    print(f"baru : {new_elapsed:6.3f}s  {args.count / new_elapsed:10.0f} nama/s  "
+          f"globe {sum(t.startswith('🌎') for t in new_tags)}  speedup x{legacy_elapsed / new_elapsed:.2f}")
+
+    # Nama "CC - ISP [PROTO]" dengan kode dari tabel lama harus tetap menghasilkan tag yang sama
+    mismatches = [
+        (name, old, new) for name, old, new in zip(names, legacy_tags, new_tags)
+        if name[:2] in LEGACY_COUNTRY_EMOJIS and name[2:5] == " - " and old != new
+    ]
+    if mismatches:
+        print(f"MISMATCH pada {len(mismatches)} nama format lama, contoh: {mismatches[0]}")
+        return 1
+    print("OK: tag untuk nama format lama tidak berubah")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# benchmarks/bench_vmess_decode.py
+# Microbenchmark decode VMess: parse_vmess_link lama (padding via string, b64decode, decode utf-8,
+# json.loads) vs parse_vmess_link sekarang vs decode_vmess_batch (satu panggilan buat semua payload).
+# Sebagian link sengaja pakai alfabet URL-safe, dan ada link rusak buat ngecek laporan error-nya.
+#
+# Jalankan dari root repo:  python -m benchmarks.bench_vmess_decode -n 100000
+import argparse
+import base64
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_vmess_link
+from singbox_converter import decode_vmess_batch, parse_vmess_link
+
+
+def legacy_parse_vmess_link(vmess_link):
+    try:
+        encoded_data = vmess_link[len("vmess://"):]
+        missing_padding = len(encoded_data) % 4
+        if missing_padding:
+            encoded_data += '=' * (4 - missing_padding)
+        return json.loads(base64.b64decode(encoded_data).decode('utf-8'))
+    except Exception:
+        return None
+
+
+def generate_vmess_links(count, seed=1337, urlsafe_ratio=0.3, broken_ratio=0.01):
+    rng = random.Random(seed)
+    links = []
+    for i in range(count):
+        link = make_vmess_link(rng, i)
+        if rng.random() < urlsafe_ratio:
+            link = "vmess://" + link[len("vmess://"):].replace("+", "-").replace("/", "_")
+        if rng.random() < broken_ratio:
+            link = link[:len(link) // 2] + "!!"
+        links.append(link)
+    return links
+
+
+def _time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmark decode VMess (per link vs batch).")
+    parser.add_argument("-n", "--count", type=int, default=100000)
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Ambil waktu terbaik dari N kali jalan.")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)  # Jalur per link nge-log tiap error, jangan ikut kehitung ke output
+    links = generate_vmess_links(args.count)
+    standard = [link for link in links if "-" not in link and "_" not in link]  # Link URL-safe nggak kebaca decoder lama
+
+    legacy_elapsed, legacy_configs = _time(lambda: [legacy_parse_vmess_link(link) for link in links], args.repeat)
+    single_elapsed, single_configs = _time(lambda: [parse_vmess_link(link) for link in links], args.repeat)
+    batch_elapsed, (batch_configs, errors) = _time(lambda: decode_vmess_batch(links), args.repeat)
+
+    def line(label, elapsed, configs):
+        ok = sum(config is not None for config in configs)
+        return (f"{label:<10}: {elapsed:6.3f}s  {args.count / elapsed:10.0f} link/s  valid {ok}/{args.count}  "
+                f"speedup x{legacy_elapsed / elapsed:.2f}")
+
+    print(line("lama", legacy_elapsed, legacy_configs))
+    print(line("per link", single_elapsed, single_configs))
+    print(line("batch", batch_elapsed, batch_configs))
+    reasons = {}
+    for error in errors:
+        reasons[error["reason"]] = reasons.get(error["reason"], 0) + 1
+    print(f"laporan error batch: {len(errors)} link {reasons}")
+
+    # Link beralfabet standar yang valid harus menghasilkan config yang sama persis dengan decoder lama
+    legacy_standard = [legacy_parse_vmess_link(link) for link in standard]
+    batch_standard, _ = decode_vmess_batch(standard)
+    mismatches = [i for i, (old, new) in enumerate(zip(legacy_standard, batch_standard)) if old is not None and old != new]
+    if mismatches or batch_configs != single_configs:
+        print(f"MISMATCH: {len(mismatches)} config beda dari decoder lama")
+        return 1
+    print("OK: config dari link standar sama dengan decoder lama, batch sama dengan per link")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
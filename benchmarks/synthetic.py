@@ -0,0 +1,134 @@
+# benchmarks/synthetic.py
+# Generator link VMess/VLESS/Trojan sintetis buat benchmark converter.
+# generate_links: campuran rata & tetap (dipakai hash regresi, JANGAN diubah).
+# generate_subscription: campuran berbobot yang mirip subscription asli (TLS/ws/grpc, nama beragam).
+import base64
+import json
+import random
+import urllib.parse
+
+# Kode negara yang dipakai di nama node (format "CC - Nama ISP [PROTO]")
+COUNTRY_CODES = ["US", "SG", "ID", "JP", "DE", "FR", "UK", "CA", "AU", "NL", "KR", "HK"]
+ISP_NAMES = ["Oracle Corporation", "Zenlayer Inc", "Hurricane Electric LLC", "G-Core Labs", "DigitalOcean LLC", "Akamai"]
+
+
+def _node_name(rng, proto):
+    return f"{rng.choice(COUNTRY_CODES)} - {rng.choice(ISP_NAMES)} [{proto}]"
+
+
+def make_vmess_link(rng, i):
+    config = {
+        "v": "2",
+        "ps": _node_name(rng, "VMESS-TLS"),
+        "add": f"vm{i}.example.com",
+        "port": str(rng.choice([443, 8443, 2053])),
+        "id": f"{i:08x}-0000-4000-8000-{rng.getrandbits(48):012x}",
+        "aid": "0",
+        "scy": "auto",
+        "net": rng.choice(["ws", "grpc", "tcp"]),
+        "path": "/vmess",
+        "host": "cdn.example.com",
+        "tls": rng.choice(["tls", ""]),
+    }
+    payload = base64.b64encode(json.dumps(config).encode("utf-8")).decode("ascii").rstrip("=")
+    return "vmess://" + payload
+
+
+def make_vless_link(rng, i):
+    transport = rng.choice(["ws", "grpc", "tcp"])
+    query = f"type={transport}&security=tls&sni=sni{i}.example.com&fp=chrome&path=%2Fvless&host=cdn.example.com&serviceName=grpc{i}"
+    uuid = f"{i:08x}-1111-4000-8000-{rng.getrandbits(48):012x}"
+    return f"vless://{uuid}@vl{i}.example.com:443?{query}#{_node_name(rng, 'VLESS-TLS').replace(' ', '%20')}"
+
+
+def make_trojan_link(rng, i):
+    transport = rng.choice(["ws", "grpc", "tcp"])
+    query = f"type={transport}&security=tls&sni=tr{i}.example.com&alpn=h2,http/1.1&path=%2Ftrojan&host=cdn.example.com"
+    return f"trojan://pass{i}@tr{i}.example.com:443?{query}#{_node_name(rng, 'TROJAN-TLS').replace(' ', '%20')}"
+
+
+LINK_FACTORIES = (make_vmess_link, make_vless_link, make_trojan_link)
+
+
+def generate_links(count, seed=1337):
+    """Menghasilkan list `count` link sintetis yang deterministik untuk seed yang sama."""
+    rng = random.Random(seed)
+    return [LINK_FACTORIES[i % len(LINK_FACTORIES)](rng, i) for i in range(count)]
+
+
+# --- Subscription "realistis" ---
+# Bobot kira-kira dari dump subscription asli: VLESS/VMess dominan, kebanyakan ws + TLS.
+PROTOCOL_WEIGHTS = {"vless": 45, "vmess": 35, "trojan": 20}
+TRANSPORT_WEIGHTS = {"ws": 60, "grpc": 20, "tcp": 20}
+TLS_RATIO = 0.8
+FINGERPRINTS = ["chrome", "firefox", "safari", "randomized", ""]
+ALPNS = ["h2,http/1.1", "http/1.1", ""]
+REALISTIC_COUNTRY_CODES = COUNTRY_CODES + ["AE", "MY", "TH", "VN", "PH", "TR", "BR", "IN", "RU", "CH"]
+
+
+def _flag(code):
+    return "".join(chr(ord(c) + 0x1F1E6 - ord("A")) for c in code)
+
+
+def _realistic_name(rng, proto, transport, tls):
+    code = rng.choice(REALISTIC_COUNTRY_CODES)
+    isp = rng.choice(ISP_NAMES)
+    style = rng.random()
+    if style < 0.4:
+        return f"{_flag(code)} ({code}) {isp}"
+    if style < 0.7:
+        return f"{code} - {isp} [{proto.upper()}-{transport.upper()}{'-TLS' if tls else ''}]"
+    if style < 0.9:
+        return f"{_flag(code)} {isp} {rng.randint(1, 99)}"
+    return f"{proto}-{rng.getrandbits(16):04x}"
+
+
+def _weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _query(params):
+    return "&".join(f"{k}={v}" for k, v in params.items() if v)
+
+
+def make_realistic_link(rng, i):
+    proto = _weighted(rng, PROTOCOL_WEIGHTS)
+    transport = _weighted(rng, TRANSPORT_WEIGHTS)
+    tls = proto == "trojan" or rng.random() < TLS_RATIO
+    host = f"{rng.choice(['cdn', 'edge', 'sg', 'id'])}{i % 97}.example.net"
+    server = f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}" \
+        if rng.random() < 0.3 else f"n{i}.example.com"
+    port = 443 if tls else rng.choice([80, 8080, 2052])
+    name = _realistic_name(rng, proto, transport, tls)
+    path = rng.choice(["/", "/ws", f"/{rng.getrandbits(32):08x}", "/vmess?ed=2048"])
+
+    if proto == "vmess":
+        config = {
+            "v": "2", "ps": name, "add": server, "port": str(port),
+            "id": f"{i:08x}-0000-4000-8000-{rng.getrandbits(48):012x}", "aid": "0", "scy": "auto",
+            "net": transport, "path": path if transport == "ws" else f"grpc{i % 13}", "host": host,
+            "tls": "tls" if tls else "", "fp": rng.choice(FINGERPRINTS) if tls else "",
+        }
+        payload = base64.b64encode(json.dumps(config).encode("utf-8")).decode("ascii").rstrip("=")
+        return "vmess://" + payload
+
+    params = {
+        "type": transport,
+        "security": "tls" if tls else "none",
+        "sni": host if tls else "",
+        "fp": rng.choice(FINGERPRINTS) if tls else "",
+        "alpn": rng.choice(ALPNS).replace(",", "%2C") if tls else "",
+        "path": path.replace("/", "%2F").replace("?", "%3F").replace("=", "%3D") if transport == "ws" else "",
+        "host": host if transport == "ws" else "",
+        "serviceName": f"grpc{i % 13}" if transport == "grpc" else "",
+    }
+    fragment = urllib.parse.quote(name)
+    if proto == "vless":
+        return f"vless://{i:08x}-1111-4000-8000-{rng.getrandbits(48):012x}@{server}:{port}?{_query(params)}#{fragment}"
+    return f"trojan://pw{rng.getrandbits(40):010x}@{server}:{port}?{_query(params)}#{fragment}"
+
+
+def generate_subscription(count, seed=1337):
+    """`count` link dengan campuran protokol/transport/TLS/nama yang mirip subscription asli, deterministik per seed."""
+    rng = random.Random(seed)
+    return [make_realistic_link(rng, i) for i in range(count)]
@@ -0,0 +1,260 @@
+# cli.py
+# Entry point command line / batch buat converter, tanpa Streamlit & PyGithub.
+# Cocok buat cron yang regenerate banyak config sekaligus.
+#
+# Contoh:
+#   python cli.py links.txt -o sfa.json
+#   cat links.txt | python cli.py --style compact > sfa.json
+#   python cli.py sub1.txt sub2.txt sub3.txt --output-dir out/ --dedupe first
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+
+# Sengaja cuma modul converter (tanpa streamlit/github), biar start-nya ringan.
+# Modul fitur opsional (probe latency, dump mmap, kompresi, shard, cache) baru di-import di cabang yang makai
+from singbox_converter import CONVERTER_VERSION, DEDUPE_POLICIES, load_singbox_template, process_singbox_config_stream, update_singbox_config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "singbox-template.txt")
+
+# Pilihan argparse, disalin dari modulnya biar --help & parsing argumen nggak perlu import modul-modul itu
+DUMP_FORMATS = ("plain", "json-string")  # dump_reader.DUMP_FORMATS
+LATENCY_MODES = ("drop", "rank")  # latency_probe.LATENCY_MODES
+ARTIFACT_ENCODINGS = ("gzip", "zstd")  # artifacts.ARTIFACT_ENCODINGS
+SHARD_MODES = ("count", "size", "region")  # config_shards.SHARD_MODES
+
+
+def _write_atomic(path, content):
+    """Writes content to path via a temp file + rename, so readers never see a half-written config."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _output_path_for(input_path, output_dir):
+    name = "stdin" if input_path == "-" else os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir, f"{name}.json")
+
+
+def convert_file(input_path, template, output_path=None, incremental=False, cache=None, **options):
+    """
+    Converts one subscription file ("-" for stdin) with the given template.
+    Writes the config to output_path (stdout when None) and returns the converter's result dict.
+    With incremental=True and an existing output file, only changed nodes are patched and the
+    file is left untouched when nothing changed (result["changes"]["changed"] is False).
+    Regular files are read through a memory map (dump_reader); `dump_format` ("plain" / "json-string")
+    overrides the format detection. Other `options` are passed on to process_singbox_config_stream
+    (workers, output_style, dedupe, prober, latency_mode, group_by_region, compact_rules, result_cache,
+    shard_by, shard_limit, stable_order). Sharded results are written next to output_path as <name>-<shard><ext>.
+    The result cache only applies to regular files; stdin is read once and converted without it.
+    `compress` lists encodings ("gzip", "zstd") whose compressed copy is written next to every output file
+    (<output>.gz / <output>.zst).
+    """
+    dump_format = options.pop("dump_format", None)
+    compress = options.pop("compress", None) or ()
+    if input_path == "-":
+        result = _convert(sys.stdin.buffer, template, output_path, incremental, cache, options)
+    elif os.path.isfile(input_path):
+        # File biasa di-mmap: link dipotong langsung dari bytes-nya, format dump JSON-string juga kebaca.
+        # DumpLinks bisa dibaca ulang, jadi cache hasil bisa hash link-nya dulu tanpa nampung semua di memori
+        from dump_reader import DumpLinks
+        result = _convert(DumpLinks(input_path, dump_format), template, output_path, incremental, cache, options)
+    else:
+        with open(input_path, "r", encoding="utf-8", errors="replace") as link_source:
+            result = _convert(link_source, template, output_path, incremental, cache, options)
+
+    if result["status"] != "success":
+        return result
+    if result.get("shards"):
+        if output_path is None:
+            return {"status": "error", "message": "Output shard nggak bisa ke stdout, pakai -o atau --output-dir."}
+        from config_shards import shard_output_path
+        for shard in result["shards"]:
+            _write_output(shard_output_path(output_path, shard["name"]), shard["config_content"], compress)
+    elif output_path is None:
+        sys.stdout.write(result["config_content"])
+        sys.stdout.flush()
+    elif result.get("changes", {}).get("changed", True):
+        _write_output(output_path, result["config_content"], compress)
+    return result
+
+
+def _write_output(path, content, compress=()):
+    _write_atomic(path, content)
+    if not compress:
+        return
+    from artifacts import artifact_path, write_artifact
+    for encoding in compress:
+        write_artifact(artifact_path(path, encoding), content, encoding)
+
+
+# Opsi yang juga dipakai update_singbox_config (mode incremental)
+INCREMENTAL_OPTIONS = ("workers", "output_style", "dedupe", "prober", "latency_mode", "group_by_region", "compact_rules",
+                       "stable_order")
+
+
+def _convert(link_source, template, output_path, incremental, cache, options):
+    if incremental and output_path and os.path.exists(output_path):
+        with open(output_path, "r", encoding="utf-8") as f:
+            previous_config = f.read()
+        incremental_options = {key: options[key] for key in INCREMENTAL_OPTIONS if key in options}
+        return update_singbox_config(previous_config, link_source, template, cache=cache, **incremental_options)
+    return process_singbox_config_stream(link_source, template, cache=cache, **options)
+
+
+def convert_files(input_paths, template_path=DEFAULT_TEMPLATE_PATH, output_dir=None, output_path=None,
+                  incremental=False, cache_path=None, result_cache_path=None, **options):
+    """
+    Converts many subscription files in one go, sharing the parsed template and the link cache.
+    Each input goes to output_dir/<input name>.json, or to output_path / stdout for a single input.
+    With result_cache_path, whole results are cached in that SQLite file (result_cache.py), so an
+    unchanged input is not converted again.
+    Returns a list of (input_path, output_path, result) tuples.
+    """
+    template = load_singbox_template(template_path)
+    cache = None
+    if cache_path:
+        from link_cache import ParsedLinkCache
+        cache = ParsedLinkCache(disk_path=cache_path, version=CONVERTER_VERSION)
+    if result_cache_path:
+        from result_cache import ConversionResultCache
+        options["result_cache"] = ConversionResultCache(disk_path=result_cache_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    results = []
+    try:
+        for input_path in input_paths:
+            target = _output_path_for(input_path, output_dir) if output_dir else output_path
+            result = convert_file(input_path, template, target, incremental=incremental, cache=cache, **options)
+            results.append((input_path, target, result))
+    finally:
+        if cache is not None:
+            cache.close()
+        if options.get("result_cache") is not None:
+            options["result_cache"].close()
+    return results
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Konversi link VMess/VLESS/Trojan ke config Sing-Box tanpa UI.")
+    parser.add_argument("inputs", nargs="*", default=["-"],
+                        help="File berisi link (satu per baris). '-' atau kosong = baca dari stdin.")
+    parser.add_argument("-t", "--template", default=DEFAULT_TEMPLATE_PATH, help="Path template Sing-Box.")
+    output_group = parser.add_mutually_exclusive_group()
+    output_group.add_argument("-o", "--output", help="File output (cuma buat satu input). Default: stdout.")
+    output_group.add_argument("--output-dir", help="Folder output buat banyak input (<nama input>.json).")
+    parser.add_argument("--style", choices=("pretty", "compact"), default="pretty", help="Format JSON output.")
+    parser.add_argument("--dump-format", choices=DUMP_FORMATS,
+                        help="Format file input: satu link per baris (plain) atau satu string JSON (json-string). Default: dideteksi otomatis.")
+    parser.add_argument("--dedupe", choices=DEDUPE_POLICIES, help="Gabung node duplikat dengan policy ini.")
+    parser.add_argument("--workers", type=int, help="Jumlah proses buat parsing paralel.")
+    parser.add_argument("--group-by-region", action="store_true",
+                        help="Satu urltest per negara; Internet/Best Latency/Lock Region ID isinya group region, bukan semua node.")
+    parser.add_argument("--compact-rules", action="store_true",
+                        help="Padatkan route.rules template (gabung rule, port jadi interval, buang rule yang ketutup).")
+    parser.add_argument("--probe", choices=LATENCY_MODES,
+                        help="Probe TCP/TLS tiap node: buang yang mati (drop) atau urutkan RTT (rank) di Best Latency/Lock Region ID.")
+    parser.add_argument("--probe-timeout", type=float, default=3.0, help="Timeout per probe (detik).")
+    parser.add_argument("--cache", help="Path SQLite buat cache link yang sudah di-parse.")
+    parser.add_argument("--shard-by", choices=SHARD_MODES,
+                        help="Pecah node jadi beberapa config (<output>-<shard>.json): per jumlah node, per ukuran file, atau per negara.")
+    parser.add_argument("--shard-limit", type=int,
+                        help="Batas per shard: jumlah node (count/region) atau bytes (size).")
+    parser.add_argument("--stable-order", action="store_true",
+                        help="Urutkan node per koneksi sebelum dinomori, biar config berikutnya cuma beda di node yang berubah.")
+    parser.add_argument("--compress", choices=ARTIFACT_ENCODINGS, action="append",
+                        help="Tulis juga versi terkompres di samping output (<output>.gz / .zst). Bisa diulang.")
+    parser.add_argument("--result-cache",
+                        help="Path SQLite buat cache hasil konversi: input, template & opsi yang sama langsung pakai hasil lama.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Patch file output yang sudah ada, dan nggak ditulis ulang kalau nggak ada perubahan.")
+    parser.add_argument("--stats", action="store_true", help="Print stats konversi (JSON) ke stderr.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log level INFO (default WARNING).")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        level=logging.INFO if args.verbose else logging.WARNING,
+                        stream=sys.stderr)
+
+    if len(args.inputs) > 1 and not args.output_dir:
+        parser.error("Banyak input butuh --output-dir.")
+    if args.inputs.count("-") > 1:
+        parser.error("stdin ('-') cuma bisa dipakai sekali.")
+    if args.shard_by and args.incremental:
+        parser.error("--shard-by nggak bisa dipakai bareng --incremental.")
+    if args.group_by_region and args.incremental:
+        parser.error("--group-by-region nggak bisa dipakai bareng --incremental (group region nggak bisa di-patch per node).")
+    if args.compress and not (args.output or args.output_dir):
+        parser.error("--compress butuh -o atau --output-dir.")
+    if args.compress:
+        from artifacts import available_encodings
+    for encoding in args.compress or ():
+        if encoding not in available_encodings():
+            parser.error(f"--compress {encoding} butuh package 'zstandard' (pip install zstandard).")
+    if args.shard_by and not (args.output or args.output_dir):
+        parser.error("--shard-by butuh -o atau --output-dir.")
+
+    latency_options = {}
+    if args.probe:
+        from latency_probe import LatencyProber
+        latency_options = {"prober": LatencyProber(timeout=args.probe_timeout), "latency_mode": args.probe}
+
+    results = convert_files(
+        args.inputs,
+        template_path=args.template,
+        output_dir=args.output_dir,
+        output_path=args.output,
+        incremental=args.incremental,
+        cache_path=args.cache,
+        result_cache_path=args.result_cache,
+        workers=args.workers,
+        output_style=args.style,
+        dedupe=args.dedupe,
+        group_by_region=args.group_by_region,
+        compact_rules=args.compact_rules,
+        shard_by=args.shard_by,
+        shard_limit=args.shard_limit,
+        stable_order=args.stable_order,
+        compress=args.compress,
+        dump_format=args.dump_format,
+        **latency_options,
+    )
+
+    exit_code = 0
+    for input_path, output_path, result in results:
+        if result["status"] != "success":
+            exit_code = 1
+            print(f"{input_path}: {result['message']}", file=sys.stderr)
+        elif output_path:
+            changes = result.get("changes")
+            note = " (nggak ada perubahan, file nggak ditulis ulang)" if changes and not changes["changed"] else ""
+            print(f"{input_path} -> {output_path}: {result['message']}{note}", file=sys.stderr)
+            if result.get("shards"):
+                from config_shards import shard_output_path
+            for shard in result.get("shards", ()):
+                print(f"  {shard_output_path(output_path, shard['name'])}: {shard['nodes']} node, {shard['bytes']} bytes",
+                      file=sys.stderr)
+        if args.stats and result.get("stats"):
+            print(json.dumps({"input": input_path, "stats": result["stats"]}), file=sys.stderr)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
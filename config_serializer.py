@@ -0,0 +1,83 @@
+# config_serializer.py
+# Serializer output config JSON: bagian statis template di-render sekali,
+# yang di-render ulang tiap konversi cuma bagian yang berubah (outbounds).
+import json
+import logging
+
+from outbound_records import json_default
+
+try:
+    import orjson
+except ImportError:  # orjson opsional, fallback ke json bawaan
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_STYLES = ("pretty", "compact")
+
+
+def dumps(value, style="pretty", indent_level=0):
+    """
+    Serializes `value` as JSON.
+    "pretty" is byte-identical to json.dumps(value, indent=2) (nested `indent_level` levels deep).
+    "compact" has no whitespace and keeps non-ASCII characters as UTF-8; it uses orjson when installed.
+    Outbound records (outbound_records.py) are turned into dicts on the fly.
+    """
+    if style == "compact":
+        if orjson is not None:
+            try:
+                return orjson.dumps(value, default=json_default).decode("utf-8")
+            except (TypeError, orjson.JSONEncodeError) as e:
+                logger.debug(f"orjson gagal serialize, fallback ke json: {e}")
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=json_default)
+    if style != "pretty":
+        raise ValueError(f"Output style nggak dikenal: {style}")
+    rendered = json.dumps(value, indent=2, default=json_default)
+    if indent_level:
+        rendered = rendered.replace("\n", "\n" + "  " * indent_level)
+    return rendered
+
+
+def dumps_array(items, style="pretty", indent_level=0):
+    """Serializes a list item by item, same output as dumps(list(items), style, indent_level)."""
+    items = list(items)
+    if not items:
+        return "[]"
+    if style == "compact":
+        return "[" + ",".join(dumps(item, "compact") for item in items) + "]"
+    inner = "  " * (indent_level + 1)
+    return "[\n" + inner + (",\n" + inner).join(dumps(item, "pretty", indent_level + 1) for item in items) + "\n" + "  " * indent_level + "]"
+
+
+class PrerenderedConfig:
+    """
+    Renders a top-level JSON object whose values are mostly static.
+    Values passed at construction are rendered once per style; at render time a section is
+    reused as long as the config still holds the very same object, otherwise it is rendered again.
+    """
+
+    def __init__(self, sections):
+        self.sections = sections
+        self._rendered = {}
+
+    def _static(self, key, style):
+        cache_key = (key, style)
+        if cache_key not in self._rendered:
+            self._rendered[cache_key] = dumps(self.sections[key], style, indent_level=1)
+        return self._rendered[cache_key]
+
+    def render(self, config_data, style="pretty"):
+        if not config_data:
+            return "{}"
+        parts = []
+        for key, value in config_data.items():
+            if key in self.sections and value is self.sections[key]:
+                rendered_value = self._static(key, style)
+            elif isinstance(value, list):
+                rendered_value = dumps_array(value, style, indent_level=1)
+            else:
+                rendered_value = dumps(value, style, indent_level=1)
+            parts.append((dumps(key, style), rendered_value))
+        if style == "compact":
+            return "{" + ",".join(f"{k}:{v}" for k, v in parts) + "}"
+        return "{\n" + ",\n".join(f"  {k}: {v}" for k, v in parts) + "\n}"
@@ -0,0 +1,72 @@
+# config_shards.py
+# Mode split output: node hasil konversi dipecah jadi beberapa config kecil (shard), biar client HP
+# nggak harus load satu config raksasa. Tiap shard itu config Sing-Box utuh (template + sebagian node)
+# dengan selector yang ditulis ulang khusus buat node di shard itu (lihat render_config_shards di
+# singbox_converter.py). Modul ini cuma bagian pembagiannya, nggak tahu apa-apa soal format Sing-Box.
+#
+# Mode:
+#   count  : maksimal `limit` node per shard
+#   size   : maksimal `limit` bytes per file config (perkiraan, dicek lagi setelah di-render)
+#   region : satu shard per negara; dengan `limit`, negara yang node-nya lebih dari itu dipecah lagi
+import os
+
+SHARD_MODES = ("count", "size", "region")
+
+
+def validate_shard_options(shard_by, shard_limit):
+    if shard_by not in SHARD_MODES:
+        raise ValueError(f"Mode shard '{shard_by}' nggak dikenal, pilih salah satu dari {SHARD_MODES}")
+    if shard_by in ("count", "size") and not shard_limit:
+        raise ValueError(f"Mode shard '{shard_by}' butuh batas (shard_limit) lebih dari 0")
+    if shard_limit is not None and shard_limit < 0:
+        raise ValueError(f"shard_limit nggak boleh negatif: {shard_limit}")
+
+
+def split_by_count(items, limit):
+    """Consecutive chunks of at most `limit` items (one empty chunk for no items)."""
+    if not items:
+        return [[]]
+    return [items[start:start + limit] for start in range(0, len(items), limit)]
+
+
+def split_by_weight(items, weights, budget):
+    """
+    Greedy consecutive chunks whose summed weights stay within `budget`. An item heavier than the
+    budget gets a chunk of its own. Item order is kept.
+    """
+    chunks = [[]]
+    used = 0
+    for item, weight in zip(items, weights):
+        if chunks[-1] and used + weight > budget:
+            chunks.append([])
+            used = 0
+        chunks[-1].append(item)
+        used += weight
+    return chunks
+
+
+def shard_names(keys):
+    """
+    File-name-safe shard names for chunk keys in order: the key itself when it has one chunk,
+    "<key>-<n>" when it has several, and just "<n>" for chunks without a key (count/size mode).
+    """
+    totals = {}
+    for key in keys:
+        totals[key] = totals.get(key, 0) + 1
+    seen = {}
+    names = []
+    for key in keys:
+        seen[key] = seen.get(key, 0) + 1
+        if key is None:
+            names.append(str(seen[key]))
+        elif totals[key] == 1:
+            names.append(key)
+        else:
+            names.append(f"{key}-{seen[key]}")
+    return names
+
+
+def shard_output_path(path, shard_name):
+    """Output path of one shard: "sfa.txt" -> "sfa-US.txt", "configs/out.json" -> "configs/out-2.json"."""
+    root, ext = os.path.splitext(path)
+    return f"{root}-{shard_name}{ext}"
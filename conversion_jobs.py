@@ -0,0 +1,142 @@
+# conversion_jobs.py
+# Job konversi di background thread, biar script Streamlit nggak ke-block selama konversi + upload GitHub.
+# Job-nya nyimpen progress (jumlah link yang sudah dibaca), bisa dibatalin, dan hasilnya tetap ada
+# walau script di-rerun. Satu runner per proses dipakai bareng semua sesi (tiap sesi cukup simpan job id).
+#
+# Contoh:
+#   runner = ConversionJobRunner(max_workers=4)
+#   job = runner.submit(lambda job: process_singbox_config(links, template, progress=job.report_progress), total=len(links))
+#   ... job.status, job.done, job.total, job.outcome
+import collections
+import concurrent.futures
+import logging
+import threading
+import time
+import uuid
+
+from singbox_converter import ConversionCancelled
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("done", "cancelled", "error")
+
+
+class ConversionJob:
+    """
+    One background conversion. `done` is the number of links read so far and `total` the expected
+    number (None if unknown, e.g. for subscription URLs). `outcome` holds whatever the job function
+    returned; a function returning a dict with status "cancelled" (or raising ConversionCancelled)
+    ends the job as cancelled.
+    """
+
+    def __init__(self, total=None, label=""):
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.phase = "Nunggu antrian"
+        self.status = "queued"
+        self.outcome = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def finished_status(self):
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def fraction(self):
+        """Progress between 0 and 1, or None while the total is unknown."""
+        if self.status == "done":
+            return 1.0
+        if not self.total:
+            return None
+        return min(self.done / self.total, 1.0)
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise ConversionCancelled()
+
+    def report_progress(self, done):
+        """Progress callback for the converters (their `progress` argument); stops the conversion once cancelled."""
+        self.done = done
+        if self._cancel_event.is_set():
+            raise ConversionCancelled()
+
+    def set_phase(self, phase):
+        """Labels the current step (e.g. "Upload ke GitHub") and stops the job here if it was cancelled."""
+        self.check_cancelled()
+        self.phase = phase
+
+
+class ConversionJobRunner:
+    """
+    Runs job functions `fn(job)` in a thread pool of `max_workers`, so several sessions can convert at
+    the same time. Finished jobs are kept until they are forgotten or, beyond `max_finished`, the oldest
+    finished ones are dropped.
+    """
+
+    def __init__(self, max_workers=4, max_finished=100):
+        self.max_finished = max_finished
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="conversion-job")
+        self._jobs = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, total=None, label=""):
+        job = ConversionJob(total=total, label=label)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        if job.cancel_requested:
+            job.status = "cancelled"
+            job.finished = time.time()
+            return
+        job.status = "running"
+        job.phase = "Konversi"
+        start = time.perf_counter()
+        try:
+            job.outcome = fn(job)
+            cancelled = isinstance(job.outcome, dict) and job.outcome.get("status") == "cancelled"
+            job.status = "cancelled" if cancelled else "done"
+        except ConversionCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            logger.error(f"Job konversi {job.id} gagal: {e}", exc_info=True)
+            job.error = str(e) or type(e).__name__
+            job.status = "error"
+        job.finished = time.time()
+        logger.info(f"Job konversi {job.id} ({job.label}) selesai: {job.status}, {job.done} link, "
+                    f"{time.perf_counter() - start:.2f} detik")
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def forget(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_status]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def shutdown(self, cancel=True):
+        if cancel:
+            with self._lock:
+                for job in self._jobs.values():
+                    job.cancel()
+        self._executor.shutdown(wait=True)
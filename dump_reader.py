@@ -0,0 +1,157 @@
+# dump_reader.py
+# Baca file dump link yang gede (ratusan MB) lewat mmap: batas baris dicari di bytes mentah,
+# yang di-decode cuma potongan per link, jadi file-nya nggak pernah jadi satu string Python raksasa.
+#
+# Dua format dump yang didukung:
+#   plain       : satu link per baris (newline biasa)
+#   json-string : seluruh isi dibungkus satu string JSON, baris dipisah escape "\n" dan
+#                 emoji ditulis sebagai surrogate escape ("🇦..."), contoh todd.txt
+#
+# Contoh:
+#   process_singbox_config_stream(iter_dump_links("dump.txt"), template)
+#   process_singbox_config_stream(DumpLinks("dump.txt"), template, result_cache=cache)  # bisa dibaca ulang
+import json
+import logging
+import mmap
+
+logger = logging.getLogger(__name__)
+
+DUMP_FORMATS = ("plain", "json-string")
+
+_WHITESPACE = b" \t\r\n\f\v"
+_UTF8_BOM = b"\xef\xbb\xbf"
+
+
+def detect_dump_format(buffer):
+    """Returns "json-string" when the first non-whitespace byte of `buffer` is a double quote, else "plain"."""
+    start = _content_start(buffer)
+    return "json-string" if buffer[start:start + 1] == b'"' else "plain"
+
+
+def _content_start(buffer):
+    start = len(_UTF8_BOM) if buffer[:len(_UTF8_BOM)] == _UTF8_BOM else 0
+    while start < len(buffer) and buffer[start] in _WHITESPACE:
+        start += 1
+    return start
+
+
+def _iter_plain_slices(buffer):
+    start, end = 0, len(buffer)
+    while start < end:
+        newline = buffer.find(b"\n", start)
+        if newline == -1:
+            newline = end
+        yield buffer[start:newline]
+        start = newline + 1
+
+
+def _iter_escaped_slices(buffer, start, end):
+    # Pisah di escape "\n" (backslash + n). "\\n" itu backslash literal + huruf n, bukan batas baris,
+    # jadi jumlah backslash di depan 'n' harus ganjil. Newline mentah juga dianggap batas.
+    line_start = position = start
+    raw = -1
+    while position < end:
+        escaped = buffer.find(b"\\n", position, end)
+        if raw < position:  # Posisi newline mentah berikutnya diingat, biar nggak scan ulang sampai akhir file tiap link
+            raw = buffer.find(b"\n", position, end)
+            if raw == -1:
+                raw = end
+        if raw < end and (escaped == -1 or raw < escaped):
+            yield buffer[line_start:raw]
+            line_start = position = raw + 1
+            continue
+        if escaped == -1:
+            break
+        backslashes = 1
+        while escaped - backslashes >= line_start and buffer[escaped - backslashes] == 0x5C:
+            backslashes += 1
+        if backslashes % 2:
+            yield buffer[line_start:escaped]
+            line_start = escaped + 2
+        position = escaped + 2
+    yield buffer[line_start:end]
+
+
+def _decode_escaped(raw):
+    # Potongan tanpa backslash cukup di-decode UTF-8; sisanya lewat parser JSON (gabung surrogate pair)
+    if b"\\" not in raw:
+        return raw.decode("utf-8", errors="replace")
+    try:
+        text = json.loads(b'"' + raw + b'"')
+    except ValueError:
+        logger.warning(f"Escape JSON nggak valid di dump, dipakai apa adanya: {raw[:100]!r}")
+        return raw.decode("utf-8", errors="replace")
+    try:
+        text.encode("utf-8")
+    except UnicodeEncodeError:  # Surrogate yang nggak berpasangan
+        text = text.encode("utf-8", errors="replace").decode("utf-8")
+    return text
+
+
+def iter_dump_buffer(buffer, dump_format=None):
+    """
+    Yields stripped, non-empty links from a bytes-like `buffer` that supports find() and slicing
+    (bytes or mmap). Only the slice of each link is copied and decoded.
+    `dump_format` is "plain" or "json-string"; by default it is detected from the first byte.
+    """
+    dump_format = dump_format or detect_dump_format(buffer)
+    if dump_format not in DUMP_FORMATS:
+        raise ValueError(f"Format dump '{dump_format}' nggak dikenal, pilih salah satu dari {DUMP_FORMATS}")
+
+    if dump_format == "plain":
+        for raw in _iter_plain_slices(buffer):
+            raw = raw.strip(_WHITESPACE)
+            if raw:
+                yield raw.decode("utf-8", errors="replace")
+        return
+
+    start = _content_start(buffer) + 1  # Lewati tanda kutip pembuka
+    end = buffer.rfind(b'"')
+    if end < start:  # Kutip penutup hilang (file terpotong): baca sampai habis
+        end = len(buffer)
+    for raw in _iter_escaped_slices(buffer, start, end):
+        link = _decode_escaped(raw.strip(_WHITESPACE)).strip()
+        if link:
+            yield link
+
+
+def estimate_dump_links(buffer, dump_format=None):
+    """Upper bound of the number of links in `buffer` (line separators + 1), e.g. for a progress bar total."""
+    dump_format = dump_format or detect_dump_format(buffer)
+    if dump_format == "json-string":
+        return buffer.count(b"\\n") + buffer.count(b"\n") + 1
+    return buffer.count(b"\n") + 1
+
+
+def iter_dump_links(path, dump_format=None):
+    """
+    Yields the links of a dump file at `path` via a read-only memory map (see iter_dump_buffer).
+    The map stays open while the generator is being consumed and is closed when it finishes or is closed.
+    """
+    with open(path, "rb") as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # File kosong nggak bisa di-mmap
+            return
+        with buffer:
+            if hasattr(buffer, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                buffer.madvise(mmap.MADV_SEQUENTIAL)
+            yield from iter_dump_buffer(buffer, dump_format)
+
+
+class DumpLinks:
+    """
+    Re-iterable link source over a dump: a file path (read through iter_dump_links) or a bytes-like
+    buffer (iter_dump_buffer). Every iteration starts from the beginning, so the converter can hash the
+    links for the result cache in one streaming pass and convert them in a second one, without keeping
+    them in a list.
+    """
+
+    def __init__(self, source, dump_format=None):
+        self.source = source
+        self.dump_format = dump_format
+
+    def __iter__(self):
+        if isinstance(self.source, str):
+            return iter_dump_links(self.source, self.dump_format)
+        return iter_dump_buffer(self.source, self.dump_format)
@@ -0,0 +1,99 @@
+# github_publisher.py
+# Publish banyak file output ke GitHub dalam SATU commit lewat Git Data API
+# (ref -> tree -> commit), pakai satu sesi Github yang dipakai ulang.
+import base64
+import hashlib
+import logging
+
+from github import Auth, Github, GithubException, InputGitTreeElement
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GITHUB_API_URL = "https://api.github.com"
+
+
+def git_blob_sha(content):
+    """SHA-1 of `content` as a git blob object (same value GitHub reports for the file)."""
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    digest = hashlib.sha1(b"blob %d\0" % len(data))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class GithubPublisher:
+    """
+    Writes several files to one branch in a single commit.
+    The authenticated client and the repository handle are created once and reused,
+    so keep one publisher per process (e.g. via st.cache_resource).
+    Files whose blob SHA already matches the branch head are skipped; if nothing changed,
+    no commit is made at all. `base_url` points the client at another API server (GitHub
+    Enterprise, or a local fake server in tests).
+    """
+
+    def __init__(self, token, repo_owner, repo_name, branch="main", base_url=DEFAULT_GITHUB_API_URL):
+        self.repo_full_name = f"{repo_owner}/{repo_name}"
+        self.branch = branch
+        self._github = Github(auth=Auth.Token(token), base_url=base_url)
+        self._repo = None
+
+    @property
+    def repo(self):
+        if self._repo is None:
+            self._repo = self._github.get_repo(self.repo_full_name)
+        return self._repo
+
+    def file_url(self, path):
+        return f"{self.repo.html_url}/blob/{self.branch}/{path}"
+
+    def read_file(self, path):
+        """
+        Returns the current content of `path` on the branch, or None if the file (or the branch) does
+        not exist. The file is read as a git blob (sha from the branch tree): the contents API leaves
+        the content out for files over 1 MB, which is exactly where incremental updates matter.
+        Other API errors are raised as GithubException.
+        """
+        try:
+            ref = self.repo.get_git_ref(f"heads/{self.branch}")
+            head_commit = self.repo.get_git_commit(ref.object.sha)
+            blob_sha = self._current_blob_shas(head_commit.tree.sha, {path}).get(path)
+            if blob_sha is None:
+                return None
+            blob = self.repo.get_git_blob(blob_sha)
+        except GithubException as e:
+            if e.status == 404:
+                return None
+            raise
+        data = base64.b64decode(blob.content) if blob.encoding == "base64" else blob.content.encode("utf-8")
+        return data.decode("utf-8")
+
+    def _current_blob_shas(self, tree_sha, paths):
+        tree = self.repo.get_git_tree(tree_sha, recursive=True)
+        return {element.path: element.sha for element in tree.tree if element.type == "blob" and element.path in paths}
+
+    def publish(self, files, message):
+        """
+        Commits `files` ({path: content}) to the branch in one commit.
+        Returns {"commit_sha", "updated", "skipped"}; commit_sha is None when every file was unchanged.
+        """
+        ref = self.repo.get_git_ref(f"heads/{self.branch}")
+        head_commit = self.repo.get_git_commit(ref.object.sha)
+        current_shas = self._current_blob_shas(head_commit.tree.sha, set(files))
+
+        elements = []
+        updated, skipped = [], []
+        for path, content in files.items():
+            if current_shas.get(path) == git_blob_sha(content):
+                skipped.append(path)
+                continue
+            elements.append(InputGitTreeElement(path, "100644", "blob", content=content))
+            updated.append(path)
+
+        if not elements:
+            logger.info(f"Semua file sudah sama dengan {self.branch}, nggak ada commit baru.")
+            return {"commit_sha": None, "updated": updated, "skipped": skipped}
+
+        tree = self.repo.create_git_tree(elements, base_tree=head_commit.tree)
+        commit = self.repo.create_git_commit(message, tree, [head_commit])
+        ref.edit(commit.sha)
+        logger.info(f"Commit {commit.sha[:7]} ke {self.repo_full_name}@{self.branch}: {', '.join(updated)}")
+        return {"commit_sha": commit.sha, "updated": updated, "skipped": skipped}
@@ -0,0 +1,140 @@
+# latency_probe.py
+# Probe TCP/TLS handshake ke server tiap node (asyncio, concurrency dibatasi) sebelum node
+# dimasukkan ke "Best Latency" / "Lock Region ID", biar urltest di HP nggak nge-probe ribuan server mati.
+import asyncio
+import collections
+import logging
+import ssl
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# "drop": node mati dibuang dari selector latency; "rank": semua node diurutkan dari RTT tercepat, yang mati di akhir
+LATENCY_MODES = ("drop", "rank")
+
+
+def probe_target(outbound):
+    """(server, port, sni) probed for an outbound; sni is None for plain TCP nodes."""
+    tls = outbound.get("tls")
+    sni = (tls.get("server_name") or outbound["server"]) if tls else None
+    return str(outbound["server"]), int(outbound["server_port"]), sni
+
+
+class LatencyProber:
+    """
+    Measures the TCP (and, for TLS nodes, TLS handshake) time to many servers concurrently.
+    At most `concurrency` probes run at once, each limited to `timeout` seconds; unreachable
+    servers get None. Results are cached per (server, port, sni) for `ttl` seconds (LRU bounded
+    by `max_entries`), so repeated conversions of the same subscription do not probe again.
+    Certificates are not verified: only the handshake time matters here.
+    """
+
+    def __init__(self, concurrency=256, timeout=3.0, ttl=600, max_entries=100000):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._results = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+        self._ssl_context.check_hostname = False
+        self._ssl_context.verify_mode = ssl.CERT_NONE
+
+    def _get_cached(self, target, now):
+        with self._lock:
+            entry = self._results.get(target)
+            if entry is None or now - entry[1] > self.ttl:
+                return False, None
+            self._results.move_to_end(target)
+            return True, entry[0]
+
+    def _store(self, target, rtt, now):
+        with self._lock:
+            self._results[target] = (rtt, now)
+            self._results.move_to_end(target)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    async def _probe_one(self, semaphore, target):
+        server, port, sni = target
+        async with semaphore:
+            start = time.perf_counter()
+            writer = None
+            try:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(server, port, ssl=self._ssl_context if sni else None,
+                                            server_hostname=sni),
+                    self.timeout,
+                )
+                return time.perf_counter() - start
+            except (OSError, asyncio.TimeoutError, ssl.SSLError, ValueError) as e:
+                logger.debug(f"Probe {server}:{port} gagal: {e!r}")
+                return None
+            finally:
+                if writer is not None:
+                    writer.close()
+
+    async def _probe_many(self, targets):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        return await asyncio.gather(*(self._probe_one(semaphore, target) for target in targets))
+
+    def probe(self, targets):
+        """
+        Returns {target: rtt_seconds or None} for (server, port, sni) targets.
+        Cached results younger than the TTL are reused; the rest are probed on a new event loop
+        (call it from synchronous code, not from inside a running loop).
+        """
+        return self._probe(targets)[0]
+
+    def _probe(self, targets):
+        now = time.monotonic()
+        results = {}
+        to_probe = []
+        for target in dict.fromkeys(targets):
+            hit, rtt = self._get_cached(target, now)
+            if hit:
+                results[target] = rtt
+            else:
+                to_probe.append(target)
+
+        if to_probe:
+            rtts = asyncio.run(self._probe_many(to_probe))
+            now = time.monotonic()
+            for target, rtt in zip(to_probe, rtts):
+                self._store(target, rtt, now)
+                results[target] = rtt
+        logger.info(f"Latency probe: {len(to_probe)} server di-probe, {len(results) - len(to_probe)} dari cache")
+        return results, len(to_probe)
+
+    def latency_tags(self, outbounds, mode="drop"):
+        """
+        Returns (tags, latency_stats): the outbound tags to put into the latency selectors, and
+        {mode, probed, cached, alive, dead}. With "drop" only reachable nodes are kept (in their
+        original order); with "rank" all nodes are ordered by RTT, unreachable ones last.
+        """
+        if mode not in LATENCY_MODES:
+            raise ValueError(f"Mode latency '{mode}' nggak dikenal, pilih salah satu dari {LATENCY_MODES}")
+        targets = [probe_target(outbound) for outbound in outbounds]
+        rtts, probed = self._probe(targets)
+        node_rtts = [(outbound["tag"], rtts[target]) for outbound, target in zip(outbounds, targets)]
+
+        alive = [(tag, rtt) for tag, rtt in node_rtts if rtt is not None]
+        if mode == "drop":
+            tags = [tag for tag, _ in alive]
+        else:
+            tags = [tag for tag, _ in sorted(alive, key=lambda item: item[1])]
+            tags += [tag for tag, rtt in node_rtts if rtt is None]
+
+        latency_stats = {
+            "mode": mode,
+            "probed": probed,
+            "cached": len(rtts) - probed,
+            "alive": len(alive),
+            "dead": len(node_rtts) - len(alive),
+        }
+        return tags, latency_stats
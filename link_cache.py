@@ -0,0 +1,154 @@
+# link_cache.py
+# Cache hasil parse link (VMess/VLESS/Trojan) supaya subscription yang sama
+# nggak perlu di-decode ulang setiap kali dikonversi.
+import collections
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+
+from outbound_records import json_default, outbound_from_dict
+
+logger = logging.getLogger(__name__)
+
+# Penanda "tidak ada di cache" (beda dengan None, karena link gagal parse juga di-cache)
+MISSING = object()
+
+
+class ParsedLinkCache:
+    """
+    Size-bounded LRU cache of parsed, untagged outbounds keyed by link content.
+    Optionally backed by an SQLite file so entries survive process restarts. The disk store is tagged
+    with `version` (pass singbox_converter.CONVERTER_VERSION); when it was written by another version,
+    its entries are dropped on open, so parser changes never serve stale outbounds or stale failures.
+
+    Cached outbounds are returned as shallow copies: the top-level record (where the
+    counter-dependent tag lives) is fresh, sub-records like tls/transport are shared
+    and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries=100000, disk_path=None, disk_batch_size=1000, version=None):
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.version = version
+        self.disk_batch_size = disk_batch_size
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._pending_disk_writes = []
+        self._lock = threading.Lock()
+        self._db = None
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS parsed_links (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value TEXT)")
+            self._check_version()
+            self._db.commit()
+            logger.info(f"Parsed link cache disk store dibuka: {disk_path}")
+
+    def _check_version(self):
+        # Hasil parse versi converter lain (termasuk link yang dulu gagal) nggak boleh dipakai lagi
+        row = self._db.execute("SELECT value FROM cache_meta WHERE name = 'version'").fetchone()
+        stored_version = row[0] if row is not None else None
+        if stored_version == self.version:
+            return
+        if row is not None or self._db.execute("SELECT 1 FROM parsed_links LIMIT 1").fetchone() is not None:
+            logger.info(f"Parsed link cache dari versi {stored_version} (sekarang {self.version}), isinya dibuang.")
+        self._db.execute("DELETE FROM parsed_links")
+        self._db.execute("INSERT OR REPLACE INTO cache_meta (name, value) VALUES ('version', ?)", (self.version,))
+
+    @staticmethod
+    def _disk_key(link_str):
+        return hashlib.sha256(link_str.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _copy(parsed):
+        if parsed is None:
+            return None
+        outbound, original_tag_name = parsed
+        return outbound.copy(), original_tag_name
+
+    def get(self, link_str):
+        """Returns the cached parse result (possibly None for a known-bad link) or MISSING."""
+        with self._lock:
+            parsed = self._entries.get(link_str, MISSING)
+            if parsed is not MISSING:
+                self._entries.move_to_end(link_str)
+                self.hits += 1
+                return self._copy(parsed)
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value FROM parsed_links WHERE key = ?", (self._disk_key(link_str),)
+                ).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    parsed = (outbound_from_dict(value[0]), value[1]) if value is not None else None
+                    self._store(link_str, parsed)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return self._copy(parsed)
+
+            self.misses += 1
+            return MISSING
+
+    def put(self, link_str, parsed):
+        """Stores a parse result (the outbound is copied, so later tagging does not leak into the cache)."""
+        parsed = self._copy(parsed)
+        with self._lock:
+            self._store(link_str, parsed)
+            if self._db is not None:
+                self._pending_disk_writes.append((self._disk_key(link_str), json.dumps(parsed, default=json_default)))
+                if len(self._pending_disk_writes) >= self.disk_batch_size:
+                    self._flush_locked()
+
+    def _store(self, link_str, parsed):
+        self._entries[link_str] = parsed
+        self._entries.move_to_end(link_str)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _flush_locked(self):
+        if self._db is None or not self._pending_disk_writes:
+            return
+        self._db.executemany(
+            "INSERT OR REPLACE INTO parsed_links (key, value) VALUES (?, ?)", self._pending_disk_writes
+        )
+        self._db.commit()
+        self._pending_disk_writes = []
+
+    def flush(self):
+        """Writes pending entries to the disk store, if any."""
+        with self._lock:
+            self._flush_locked()
+
+    def clear(self):
+        """Drops all entries (memory and disk) and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._pending_disk_writes = []
+            if self._db is not None:
+                self._db.execute("DELETE FROM parsed_links")
+                self._db.commit()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
@@ -0,0 +1,256 @@
+# outbound_records.py
+# Representasi ringkas (__slots__) untuk outbound hasil konversi.
+# Satu node = satu objek kecil, bukan dict bertingkat (tls/utls/transport),
+# baru diubah jadi dict/JSON pas serialisasi.
+from collections.abc import Mapping
+
+
+class OutboundRecord(Mapping):
+    """
+    Base class of the compact outbound records.
+    Records are read-only Mappings with the same keys (and key order) as the Sing-Box JSON,
+    so code that reads outbounds like dicts keeps working. Use to_dict() / to_json_value()
+    to get the plain JSON structure.
+    """
+    __slots__ = ()
+
+    def _items(self):
+        raise NotImplementedError
+
+    def __getitem__(self, key):
+        for item_key, value in self._items():
+            if item_key == key:
+                return value
+        raise KeyError(key)
+
+    def __iter__(self):
+        return (key for key, _ in self._items())
+
+    def __len__(self):
+        return sum(1 for _ in self._items())
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self):
+        return {key: to_json_value(value) for key, value in self._items()}
+
+    def connection_key(self):
+        """
+        Canonical connection tuple used for deduplication: everything that decides where and how
+        the node connects (protocol, server, port, credential, transport, SNI), but not its name.
+        """
+        return (self.type, str(self.server).lower(), self.server_port) + self._credential_key() + \
+            (self.tls.server_name if self.tls is not None else None,) + \
+            ((self.transport.type,) + tuple(getattr(self.transport, slot) for slot in type(self.transport).__slots__)
+             if self.transport is not None else ("tcp",))
+
+    def _credential_key(self):
+        return ()
+
+    def copy(self):
+        """Shallow copy: a new top-level record sharing the (read-only) sub-records."""
+        clone = object.__new__(type(self))
+        for slot in type(self).__slots__:
+            setattr(clone, slot, getattr(self, slot))
+        return clone
+
+
+def to_json_value(value):
+    """Recursively turns records (also inside dicts/lists) into plain JSON values."""
+    if isinstance(value, OutboundRecord):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {k: to_json_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_json_value(v) for v in value]
+    return value
+
+
+def json_default(value):
+    """`default` hook for json/orjson: serializes records, rejects everything else."""
+    if isinstance(value, OutboundRecord):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class TlsSettings(OutboundRecord):
+    __slots__ = ("server_name", "fingerprint", "alpn")
+
+    def __init__(self, server_name, fingerprint=None, alpn=None):
+        self.server_name = server_name
+        self.fingerprint = fingerprint or None
+        self.alpn = alpn or None
+
+    def _items(self):
+        yield "enabled", True
+        yield "server_name", self.server_name
+        yield "insecure", False
+        yield "disable_sni", False
+        if self.fingerprint:
+            yield "utls", {"enabled": True, "fingerprint": self.fingerprint}
+        if self.alpn:
+            yield "alpn", self.alpn
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("server_name"), (data.get("utls") or {}).get("fingerprint"), data.get("alpn"))
+
+
+class WsTransport(OutboundRecord):
+    __slots__ = ("path", "host")
+    type = "ws"
+
+    def __init__(self, path, host):
+        self.path = path
+        self.host = host
+
+    def _items(self):
+        yield "type", "ws"
+        yield "path", self.path
+        yield "headers", {"Host": self.host}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("path"), (data.get("headers") or {}).get("Host"))
+
+
+class GrpcTransport(OutboundRecord):
+    __slots__ = ("service_name",)
+    type = "grpc"
+
+    def __init__(self, service_name):
+        self.service_name = service_name
+
+    def _items(self):
+        yield "type", "grpc"
+        yield "grpc_service_name", self.service_name
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("grpc_service_name"))
+
+
+TRANSPORT_RECORDS = {"ws": WsTransport, "grpc": GrpcTransport}
+
+
+def _sub_records_from_dict(data):
+    tls = TlsSettings.from_dict(data["tls"]) if data.get("tls") else None
+    transport = None
+    if data.get("transport"):
+        transport = TRANSPORT_RECORDS[data["transport"]["type"]].from_dict(data["transport"])
+    return tls, transport
+
+
+class VmessOutbound(OutboundRecord):
+    __slots__ = ("tag", "server", "server_port", "uuid", "security", "alter_id", "network", "tls", "transport")
+    type = "vmess"
+
+    def __init__(self, tag, server, server_port, uuid, security, alter_id, network, tls=None, transport=None):
+        self.tag = tag
+        self.server = server
+        self.server_port = server_port
+        self.uuid = uuid
+        self.security = security
+        self.alter_id = alter_id
+        self.network = network
+        self.tls = tls
+        self.transport = transport
+
+    def _items(self):
+        yield "tag", self.tag
+        yield "type", "vmess"
+        yield "server", self.server
+        yield "server_port", self.server_port
+        yield "uuid", self.uuid
+        yield "security", self.security
+        yield "alterId", self.alter_id
+        yield "network", self.network
+        if self.tls is not None:
+            yield "tls", self.tls
+        if self.transport is not None:
+            yield "transport", self.transport
+
+    def _credential_key(self):
+        return (self.uuid, self.security, self.alter_id)
+
+    @classmethod
+    def from_dict(cls, data):
+        tls, transport = _sub_records_from_dict(data)
+        return cls(data.get("tag"), data.get("server"), data.get("server_port"), data.get("uuid"),
+                   data.get("security"), data.get("alterId"), data.get("network"), tls, transport)
+
+
+class VlessOutbound(OutboundRecord):
+    __slots__ = ("tag", "server", "server_port", "uuid", "network", "tls", "transport")
+    type = "vless"
+
+    def __init__(self, tag, server, server_port, uuid, network, tls=None, transport=None):
+        self.tag = tag
+        self.server = server
+        self.server_port = server_port
+        self.uuid = uuid
+        self.network = network
+        self.tls = tls
+        self.transport = transport
+
+    def _items(self):
+        yield "tag", self.tag
+        yield "type", "vless"
+        yield "server", self.server
+        yield "server_port", self.server_port
+        yield "uuid", self.uuid
+        yield "network", self.network
+        if self.tls is not None:
+            yield "tls", self.tls
+        if self.transport is not None:
+            yield "transport", self.transport
+
+    def _credential_key(self):
+        return (self.uuid,)
+
+    @classmethod
+    def from_dict(cls, data):
+        tls, transport = _sub_records_from_dict(data)
+        return cls(data.get("tag"), data.get("server"), data.get("server_port"), data.get("uuid"),
+                   data.get("network"), tls, transport)
+
+
+class TrojanOutbound(OutboundRecord):
+    __slots__ = ("tag", "server", "server_port", "password", "tls", "transport")
+    type = "trojan"
+
+    def __init__(self, tag, server, server_port, password, tls=None, transport=None):
+        self.tag = tag
+        self.server = server
+        self.server_port = server_port
+        self.password = password
+        self.tls = tls
+        self.transport = transport
+
+    def _items(self):
+        yield "tag", self.tag
+        yield "type", "trojan"
+        yield "server", self.server
+        yield "server_port", self.server_port
+        yield "password", self.password
+        if self.tls is not None:
+            yield "tls", self.tls
+        if self.transport is not None:
+            yield "transport", self.transport
+
+    def _credential_key(self):
+        return (self.password,)
+
+    @classmethod
+    def from_dict(cls, data):
+        tls, transport = _sub_records_from_dict(data)
+        return cls(data.get("tag"), data.get("server"), data.get("server_port"), data.get("password"), tls, transport)
+
+
+OUTBOUND_RECORDS = {"vmess": VmessOutbound, "vless": VlessOutbound, "trojan": TrojanOutbound}
+
+
+def outbound_from_dict(data):
+    """Rebuilds a record from a dict produced by to_dict() (e.g. from the on-disk link cache)."""
+    return OUTBOUND_RECORDS[data["type"]].from_dict(data)
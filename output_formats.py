@@ -0,0 +1,257 @@
+# output_formats.py
+# Emitter format output selain Sing-Box (Clash/Mihomo YAML, Xray JSON) dari record node yang sama
+# (outbound_records.py). Link cukup di-parse sekali, lalu semua format dibuat dari hasil itu.
+import logging
+
+import yaml
+
+from config_serializer import dumps
+from pipeline_stats import PipelineStats
+from singbox_converter import (ConversionCancelled, add_conversion_stats, as_singbox_template, cancelled_result,
+                               convert_link_source, probe_latency, render_singbox_config)
+
+logger = logging.getLogger(__name__)
+
+URLTEST_URL = "https://www.gstatic.com/generate_204"
+
+# Dumper C (libyaml) kalau ada, jauh lebih cepat buat ribuan proxy
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+# --- Clash / Mihomo ---
+
+def clash_proxy(outbound):
+    """Clash/Mihomo proxy entry for a converted outbound record."""
+    proxy = {"name": outbound.tag, "type": outbound.type, "server": outbound.server, "port": outbound.server_port}
+    if outbound.type == "vmess":
+        proxy.update({"uuid": outbound.uuid, "alterId": outbound.alter_id, "cipher": outbound.security})
+    elif outbound.type == "vless":
+        proxy["uuid"] = outbound.uuid
+    else:
+        proxy["password"] = outbound.password
+    proxy["udp"] = True
+
+    tls = outbound.tls
+    if tls is not None:
+        if outbound.type != "trojan":  # Trojan di Clash selalu TLS
+            proxy["tls"] = True
+        proxy["sni" if outbound.type == "trojan" else "servername"] = tls.server_name
+        proxy["skip-cert-verify"] = False
+        if tls.fingerprint:
+            proxy["client-fingerprint"] = tls.fingerprint
+        if tls.alpn:
+            proxy["alpn"] = list(tls.alpn)
+
+    transport = outbound.transport
+    if transport is not None:
+        proxy["network"] = transport.type
+        if transport.type == "ws":
+            proxy["ws-opts"] = {"path": transport.path, "headers": {"Host": transport.host}}
+        else:
+            proxy["grpc-opts"] = {"grpc-service-name": transport.service_name}
+    return proxy
+
+
+def build_clash_config(outbounds, latency_tags=None):
+    """Clash/Mihomo config dict: proxies + Internet / Best Latency / Lock Region ID groups, everything via Internet."""
+    node_names = [outbound.tag for outbound in outbounds]
+    latency_names = node_names if latency_tags is None else list(latency_tags)
+    return {
+        "mixed-port": 7890,
+        "allow-lan": False,
+        "mode": "rule",
+        "log-level": "info",
+        "proxies": [clash_proxy(outbound) for outbound in outbounds],
+        "proxy-groups": [
+            {"name": "Internet", "type": "select", "proxies": ["Best Latency", "Lock Region ID"] + node_names + ["DIRECT"]},
+            # Grup kosong nggak valid di Clash, jadi fallback ke DIRECT
+            {"name": "Best Latency", "type": "url-test", "proxies": latency_names or ["DIRECT"],
+             "url": URLTEST_URL, "interval": 30},
+            {"name": "Lock Region ID", "type": "select", "proxies": latency_names or ["DIRECT"]},
+        ],
+        "rules": ["MATCH,Internet"],
+    }
+
+
+def emit_clash_config(outbounds, latency_tags=None, output_style="pretty"):
+    """
+    Clash/Mihomo YAML in the usual subscription layout: scalars as block YAML, every proxy and
+    proxy group as one flow mapping per line. JSON objects are valid YAML flow mappings, so those
+    lines go through the JSON serializer, which is far faster than a YAML dumper for thousands of proxies.
+    `output_style` is accepted for a uniform emitter signature; the layout is the same for both.
+    """
+    lines = []
+    for key, value in build_clash_config(outbounds, latency_tags).items():
+        if isinstance(value, list) and value and isinstance(value[0], dict):
+            lines.append(f"{key}:")
+            lines.extend(f"  - {dumps(item, 'compact')}" for item in value)
+        else:
+            lines.append(yaml.dump({key: value}, Dumper=_YAML_DUMPER, allow_unicode=True,
+                                   default_flow_style=False).rstrip("\n"))
+    return "\n".join(lines) + "\n"
+
+
+# --- Xray ---
+
+# Selector balancer & observatory Xray nyocokin tag pakai prefix: "... #4" juga kena "... #47" dan "... #471".
+# Tag node di output Xray diakhiri terminator ini, jadi "... #4|" bukan prefix dari "... #47|".
+# Terminator di dalam remark diganti XRAY_TAG_TERMINATOR_ESCAPE, jadi "|" cuma muncul di akhir tag
+XRAY_TAG_TERMINATOR = "|"
+XRAY_TAG_TERMINATOR_ESCAPE = "¦"
+
+
+def xray_tag(tag):
+    """
+    Tag of a node in the Xray output: the Sing-Box tag with XRAY_TAG_TERMINATOR replaced inside it,
+    plus XRAY_TAG_TERMINATOR at the end. Distinct node tags are then never a prefix of each other.
+    """
+    return tag.replace(XRAY_TAG_TERMINATOR, XRAY_TAG_TERMINATOR_ESCAPE) + XRAY_TAG_TERMINATOR
+
+
+def check_xray_selector(selected_tags, outbound_tags):
+    """
+    Raises ValueError if a tag in `selected_tags` is a prefix of an outbound tag that is not selected,
+    i.e. an Xray selector on it would also pick that outbound (e.g. a node dropped by the latency probe).
+    With xray_tag this cannot happen for node tags; the check guards the other outbounds of the config.
+    """
+    selected = set(selected_tags)
+    ordered = sorted(set(outbound_tags))
+    # Tag yang diawali A ada persis setelah A kalau di-sort, jadi cukup jalan maju selama prefix-nya masih cocok
+    for index, tag in enumerate(ordered):
+        if tag not in selected:
+            continue
+        next_index = index + 1
+        while next_index < len(ordered) and ordered[next_index].startswith(tag):
+            if ordered[next_index] not in selected:
+                raise ValueError(f"Tag Xray '{tag}' adalah prefix dari '{ordered[next_index]}', "
+                                 f"selector-nya bakal ikut milih outbound itu")
+            next_index += 1
+
+
+def xray_outbound(outbound):
+    """Xray outbound object for a converted outbound record (tagged with xray_tag)."""
+    if outbound.type == "trojan":
+        settings = {"servers": [{"address": outbound.server, "port": outbound.server_port, "password": outbound.password}]}
+    else:
+        if outbound.type == "vmess":
+            user = {"id": outbound.uuid, "alterId": outbound.alter_id, "security": outbound.security}
+        else:
+            user = {"id": outbound.uuid, "encryption": "none"}
+        settings = {"vnext": [{"address": outbound.server, "port": outbound.server_port, "users": [user]}]}
+
+    transport = outbound.transport
+    stream_settings = {"network": transport.type if transport is not None else "tcp"}
+    tls = outbound.tls
+    if tls is not None:
+        tls_settings = {"serverName": tls.server_name, "allowInsecure": False}
+        if tls.fingerprint:
+            tls_settings["fingerprint"] = tls.fingerprint
+        if tls.alpn:
+            tls_settings["alpn"] = list(tls.alpn)
+        stream_settings.update({"security": "tls", "tlsSettings": tls_settings})
+    else:
+        stream_settings["security"] = "none"
+    if transport is not None:
+        if transport.type == "ws":
+            stream_settings["wsSettings"] = {"path": transport.path, "headers": {"Host": transport.host}}
+        else:
+            stream_settings["grpcSettings"] = {"serviceName": transport.service_name}
+
+    return {"tag": xray_tag(outbound.tag), "protocol": outbound.type, "settings": settings, "streamSettings": stream_settings}
+
+
+def build_xray_config(outbounds, latency_tags=None):
+    """
+    Xray config dict: local socks/http inbounds, one outbound per node plus direct/block, and a
+    leastPing balancer ("Best Latency", fed by the observatory) that all traffic is routed to.
+    Xray balancer selectors match tags by prefix, so node tags get XRAY_TAG_TERMINATOR and the
+    selection is checked with check_xray_selector (ValueError if it would still pick another outbound).
+    """
+    tags = [outbound.tag for outbound in outbounds] if latency_tags is None else latency_tags
+    latency_names = [xray_tag(tag) for tag in tags]
+    config = {
+        "log": {"loglevel": "warning"},
+        "inbounds": [
+            {"tag": "socks-in", "listen": "127.0.0.1", "port": 10808, "protocol": "socks",
+             "settings": {"udp": True}, "sniffing": {"enabled": True, "destOverride": ["http", "tls"]}},
+            {"tag": "http-in", "listen": "127.0.0.1", "port": 10809, "protocol": "http"},
+        ],
+        "outbounds": [xray_outbound(outbound) for outbound in outbounds] + [
+            {"tag": "direct", "protocol": "freedom"},
+            {"tag": "block", "protocol": "blackhole"},
+        ],
+        "routing": {"domainStrategy": "AsIs", "rules": []},
+    }
+    check_xray_selector(latency_names, [outbound["tag"] for outbound in config["outbounds"]])
+    if latency_names:
+        config["routing"]["balancers"] = [
+            {"tag": "Best Latency", "selector": latency_names, "strategy": {"type": "leastPing"}}
+        ]
+        config["routing"]["rules"].append({"type": "field", "network": "tcp,udp", "balancerTag": "Best Latency"})
+        config["observatory"] = {"subjectSelector": latency_names, "probeURL": URLTEST_URL, "probeInterval": "30s"}
+    else:
+        config["routing"]["rules"].append({"type": "field", "network": "tcp,udp", "outboundTag": "direct"})
+    return config
+
+
+def emit_xray_config(outbounds, latency_tags=None, output_style="pretty"):
+    return dumps(build_xray_config(outbounds, latency_tags), output_style)
+
+
+# Format selain Sing-Box: nama -> emitter(outbounds, latency_tags, output_style)
+OUTPUT_EMITTERS = {
+    "clash": emit_clash_config,
+    "xray": emit_xray_config,
+}
+
+OUTPUT_FORMATS = ("sing-box",) + tuple(OUTPUT_EMITTERS)
+
+
+def process_multi_format_config(link_source, template_content=None, output_options=None, formats=OUTPUT_FORMATS,
+                                workers=None, cache=None, output_style="pretty", dedupe=None, prober=None,
+                                latency_mode="drop", group_by_region=False, compact_rules=False, progress=None,
+                                stable_order=False):
+    """
+    Parses the links of `link_source` once and emits every format in `formats` ("sing-box",
+    "clash", "xray") from the same converted nodes. `template_content` is only needed for "sing-box".
+    Other options work as in process_singbox_config_stream; latency filtering applies to the
+    Best Latency / Lock Region ID groups of every format. `group_by_region` and `compact_rules` apply
+    to the Sing-Box output.
+    Returns the usual result dict with "outputs" ({format: content}); "config_content" is the
+    output of the first format.
+    """
+    stats = PipelineStats()
+    try:
+        unknown = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+        if unknown or not formats:
+            raise ValueError(f"Format output nggak dikenal: {unknown or formats}, pilih dari {OUTPUT_FORMATS}")
+        template = as_singbox_template(template_content, stats) if "sing-box" in formats else None
+
+        converted_outbounds, dedupe_stats = convert_link_source(link_source, stats, workers=workers, cache=cache, dedupe=dedupe,
+                                                                progress=progress, stable_order=stable_order)
+        latency_tags, latency_stats = probe_latency(converted_outbounds, prober, latency_mode, stats)
+
+        outputs = {}
+        for fmt in formats:
+            if fmt == "sing-box":
+                outputs[fmt] = render_singbox_config(template, converted_outbounds, stats, latency_tags, output_style,
+                                                     group_by_region, compact_rules)
+                continue
+            with stats.stage(f"emit:{fmt}"):
+                outputs[fmt] = OUTPUT_EMITTERS[fmt](converted_outbounds, latency_tags, output_style)
+            stats.add(f"emit:{fmt}", 0, len(outputs[fmt]))
+
+        result = {
+            "status": "success",
+            "message": f"Config {', '.join(formats)} sudah dibuat dari {len(converted_outbounds)} node.",
+            "config_content": outputs[formats[0]],
+            "outputs": outputs,
+            "stats": stats.to_dict(),
+        }
+        return add_conversion_stats(result, cache, dedupe_stats, latency_stats, stats.failures)
+
+    except ConversionCancelled:
+        return cancelled_result(stats)
+    except Exception as e:
+        logger.error(f"Error during multi-format conversion: {e}", exc_info=True)
+        return {"status": "error", "message": f"Terjadi error yang nggak terduga saat konversi: {e}", "stats": stats.to_dict()}
@@ -0,0 +1,71 @@
+# pipeline_stats.py
+# Instrumentasi ringan untuk pipeline konversi: waktu + jumlah item per stage,
+# plus jumlah link gagal per protokol dan alasan.
+import collections
+import contextlib
+import time
+
+
+def summarize_failures(failures):
+    """Failure counts ({(protocol, reason): count}) as a list of {"protocol", "reason", "count"}, most common first."""
+    return [
+        {"protocol": protocol, "reason": reason, "count": count}
+        for (protocol, reason), count in collections.Counter(failures).most_common()
+    ]
+
+
+class PipelineStats:
+    """
+    Collects wall time and item counts per pipeline stage, and failure counts by (protocol, reason).
+    Stages keep the order in which they were first recorded.
+    """
+
+    def __init__(self):
+        self._stages = {}
+        self.failures = collections.Counter()
+        self._started = time.perf_counter()
+
+    def add(self, name, seconds, items=0):
+        stage = self._stages.setdefault(name, [0.0, 0])
+        stage[0] += seconds
+        stage[1] += items
+
+    @contextlib.contextmanager
+    def stage(self, name, items=0):
+        """Times a block; the item count can be passed up front or added later with add(name, 0, n)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, items)
+
+    def timed_iter(self, iterable, name):
+        """
+        Wraps an iterable and records the time spent producing its items, plus how many it produced.
+        The time includes any lazy upstream work, so wrap the innermost stage only.
+        """
+        iterator = iter(iterable)
+        stage = self._stages.setdefault(name, [0.0, 0])
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                stage[0] += time.perf_counter() - start
+                return
+            stage[0] += time.perf_counter() - start
+            stage[1] += 1
+            yield item
+
+    def record_failure(self, protocol, reason, count=1):
+        self.failures[(protocol, reason)] += count
+
+    def to_dict(self):
+        return {
+            "total_seconds": round(time.perf_counter() - self._started, 6),
+            "stages": [
+                {"name": name, "seconds": round(seconds, 6), "items": items}
+                for name, (seconds, items) in self._stages.items()
+            ],
+            "failures": summarize_failures(self.failures),
+        }
@@ -0,0 +1,146 @@
+# result_cache.py
+# Cache hasil konversi end-to-end: kalau link (sudah dinormalisasi), template, versi converter dan
+# opsinya sama persis, config_content yang lama langsung dibalikin tanpa parse/rewrite/serialisasi ulang.
+# Key-nya hash isi (content-addressed), jadi template atau link yang berubah otomatis dapat key baru.
+import collections
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def result_cache_key(links, template_hash, converter_version, options):
+    """
+    SHA-256 key of a conversion: the normalized links (in order, since order decides the tags),
+    the template content hash, the converter version and the output-affecting `options` (a JSON-able dict).
+    """
+    digest = hashlib.sha256()
+    header = json.dumps({"converter": converter_version, "template": template_hash, "options": options}, sort_keys=True)
+    digest.update(header.encode("utf-8"))
+    for link in links:
+        digest.update(b"\n")
+        digest.update(link.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ConversionResultCache:
+    """
+    LRU cache of generated configs keyed by result_cache_key, bounded by the total size of the
+    cached content (`max_bytes`) and the number of entries. Optionally backed by an SQLite file
+    (at most `max_disk_entries` rows, oldest dropped first) so results survive restarts.
+    Values are {"config_content", "message"} dicts and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, max_entries=100, disk_path=None, max_disk_entries=1000):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS conversion_results "
+                             "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)")
+            self._db.commit()
+            logger.info(f"Result cache disk store dibuka: {disk_path}")
+
+    @staticmethod
+    def _entry_size(value):
+        return len(value["config_content"]) + len(value.get("message", ""))
+
+    def get(self, key):
+        """Returns the cached value for `key`, or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM conversion_results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._store(key, value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key, config_content, message=""):
+        value = {"config_content": config_content, "message": message}
+        with self._lock:
+            self._store(key, value)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO conversion_results (key, value, created) VALUES (?, ?, ?)",
+                                 (key, json.dumps(value), time.time()))
+                self._db.execute("DELETE FROM conversion_results WHERE key NOT IN "
+                                 "(SELECT key FROM conversion_results ORDER BY created DESC LIMIT ?)", (self.max_disk_entries,))
+                self._db.commit()
+
+    def _store(self, key, value):
+        size = self._entry_size(value)
+        if size > self.max_bytes:
+            logger.debug(f"Hasil {size} bytes lebih gede dari batas cache memori, nggak disimpan di memori")
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= self._entry_size(previous)
+        self._entries[key] = value
+        self._size += size
+        while self._size > self.max_bytes or len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= self._entry_size(evicted)
+
+    def invalidate(self, key):
+        """Drops one entry (memory and disk); returns True if it was cached."""
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is not None:
+                self._size -= self._entry_size(value)
+            deleted = 0
+            if self._db is not None:
+                deleted = self._db.execute("DELETE FROM conversion_results WHERE key = ?", (key,)).rowcount
+                self._db.commit()
+            return value is not None or deleted > 0
+
+    def clear(self):
+        """Drops all entries (memory and disk) and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM conversion_results")
+                self._db.commit()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "size": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,312 @@
+# route_rules.py
+# Pemadatan route.rules Sing-Box sebelum config dikirim ke HP: port di-sort + dedupe dan dilipat
+# jadi interval, rule yang ketutup rule sebelumnya dibuang, rule dengan outbound + jenis matcher
+# yang sama digabung. Keputusan routing tiap koneksi harus tetap sama persis
+# (dicek di benchmarks/bench_route_rules.py).
+#
+# Semantik rule default Sing-Box yang dipakai di sini: field dalam satu grup di-OR
+# (domain/domain_suffix/.../geoip/ip_cidr, port/port_range, source_*), antar grup di-AND,
+# dan di dalam satu field nilainya di-OR. Rule yang nggak dipahami (logical, invert, action
+# selain route, field lain) dibiarkan apa adanya dan nggak pernah dibuang.
+import logging
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_FIELDS = ("domain", "domain_suffix", "domain_keyword", "domain_regex", "geosite", "geoip", "ip_cidr")
+SOURCE_ADDRESS_FIELDS = ("source_geoip", "source_ip_cidr")
+PORT_FIELDS = ("port", "port_range")
+SOURCE_PORT_FIELDS = ("source_port", "source_port_range")
+# Field matcher lain: masing-masing satu grup, nilainya di-OR
+LIST_FIELDS = ("inbound", "ip_version", "network", "auth_user", "protocol", "process_name", "process_path",
+               "package_name", "user", "user_id", "clash_mode", "wifi_ssid", "wifi_bssid")
+
+_ADDRESS_GROUPS = {"address": ADDRESS_FIELDS, "source_address": SOURCE_ADDRESS_FIELDS}
+_PORT_GROUPS = {"port": PORT_FIELDS, "source_port": SOURCE_PORT_FIELDS}
+_FIELD_GROUPS = {field: group for group, fields in {**_ADDRESS_GROUPS, **_PORT_GROUPS}.items() for field in fields}
+_FIELD_GROUPS.update({field: field for field in LIST_FIELDS})
+
+MAX_PORT = 65535
+# Run port berurutan sepanjang ini atau lebih dilipat jadi port_range; port lepas tetap di "port"
+# karena Sing-Box nge-lookup "port" lewat hash set, sedangkan port_range dicek satu per satu
+MIN_RANGE_LENGTH = 3
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def _parse_port_range(text):
+    start, sep, end = str(text).partition(":")
+    if not sep:
+        raise ValueError(f"port_range nggak valid: {text}")
+    return int(start) if start else 0, int(end) if end else MAX_PORT
+
+
+def merge_intervals(intervals):
+    """Sorted, non-overlapping (start, end) intervals covering the same ports; adjacent ones are joined."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return tuple(merged)
+
+
+def _port_intervals(rule, point_field, range_field):
+    intervals = [(int(port), int(port)) for port in _as_list(rule.get(point_field, []))]
+    intervals.extend(_parse_port_range(text) for text in _as_list(rule.get(range_field, [])))
+    return merge_intervals(intervals)
+
+
+def _intervals_contain(outer, inner):
+    # Dua-duanya sudah di-merge, jadi tiap interval inner harus masuk utuh ke satu interval outer
+    return all(any(start <= inner_start and inner_end <= end for start, end in outer) for inner_start, inner_end in inner)
+
+
+def _intervals_disjoint(first, second):
+    return not any(start <= other_end and other_start <= end for start, end in first for other_start, other_end in second)
+
+
+def _subtract_intervals(intervals, removed):
+    result = []
+    for start, end in intervals:
+        for removed_start, removed_end in removed:
+            if removed_end < start or removed_start > end:
+                continue
+            if removed_start > start:
+                result.append((start, removed_start - 1))
+            start = removed_end + 1
+            if start > end:
+                break
+        if start <= end:
+            result.append((start, end))
+    return tuple(result)
+
+
+def _rule_matchers(rule):
+    """
+    {group: matcher} of a default route rule, or None if the rule is not analysed (logical rules,
+    invert, non-route actions, unknown fields, malformed ports). Port groups map to merged intervals,
+    address groups to {field: frozenset}, the other fields to a frozenset.
+    """
+    if rule.get("type", "default") != "default" or rule.get("invert") or rule.get("action", "route") != "route":
+        return None
+    if "outbound" not in rule:
+        return None
+    matchers = {}
+    for key in rule:
+        if key in ("outbound", "type", "invert", "action"):
+            continue
+        group = _FIELD_GROUPS.get(key)
+        if group is None:
+            return None
+        if group in matchers:
+            continue
+        try:
+            if group in _PORT_GROUPS:
+                matchers[group] = _port_intervals(rule, *_PORT_GROUPS[group])
+            elif group in _ADDRESS_GROUPS:
+                matchers[group] = {field: frozenset(_as_list(rule[field])) for field in _ADDRESS_GROUPS[group] if field in rule}
+            else:
+                matchers[group] = frozenset(_as_list(rule[key]))
+        except (TypeError, ValueError):
+            return None
+    return matchers
+
+
+def _group_covers(group, outer, inner):
+    if group in _PORT_GROUPS:
+        return _intervals_contain(outer, inner)
+    if group in _ADDRESS_GROUPS:
+        return all(field in outer and values <= outer[field] for field, values in inner.items())
+    return inner <= outer
+
+
+def _covers(earlier, later, except_group=None):
+    """True if every connection matching `later` also matches `earlier` (ignoring `except_group`)."""
+    return all(group in later and _group_covers(group, matcher, later[group])
+               for group, matcher in earlier.items() if group != except_group)
+
+
+def _disjoint(first, second):
+    """True if no connection can match both rules (some port/list group shares no value)."""
+    for group, matcher in first.items():
+        if group not in second or group in _ADDRESS_GROUPS:
+            continue
+        if group in _PORT_GROUPS:
+            if _intervals_disjoint(matcher, second[group]):
+                return True
+        elif not matcher & second[group]:
+            return True
+    return False
+
+
+def _merge_matchers(group, first, second):
+    if group in _PORT_GROUPS:
+        return merge_intervals(first + second)
+    if group in _ADDRESS_GROUPS:
+        return {field: first.get(field, frozenset()) | second.get(field, frozenset()) for field in first.keys() | second.keys()}
+    return first | second
+
+
+class _Rule:
+    __slots__ = ("source", "matchers")
+
+    def __init__(self, source):
+        self.source = source
+        self.matchers = _rule_matchers(source)
+
+    @property
+    def final_outbound(self):
+        # Outbound yang menghentikan pencocokan rule (None buat rule yang nggak dianalisis)
+        return self.source["outbound"] if self.matchers is not None else None
+
+    @property
+    def outcome(self):
+        return {key: value for key, value in self.source.items() if key not in _FIELD_GROUPS}
+
+
+def _count_entries(rule):
+    return sum(len(_as_list(value)) for key, value in rule.items() if key in _FIELD_GROUPS)
+
+
+def _interval_entries(intervals):
+    """Number of port + port_range entries the intervals are rendered as."""
+    return sum(1 if end - start + 1 >= MIN_RANGE_LENGTH else end - start + 1 for start, end in intervals)
+
+
+def _render_ports(rule, intervals, point_field, range_field):
+    points = []
+    ranges = []
+    for start, end in intervals:
+        if end - start + 1 >= MIN_RANGE_LENGTH:
+            ranges.append(f"{start}:{end}")
+        else:
+            points.extend(range(start, end + 1))
+    rendered = {}
+    if points:
+        scalar = len(points) == 1 and point_field in rule and not isinstance(rule[point_field], list)
+        rendered[point_field] = points[0] if scalar else points
+    if ranges:
+        rendered[range_field] = ranges
+    return rendered
+
+
+def _render_values(original, values):
+    # Urutan asli dipertahankan (duplikat dibuang), nilai hasil merge ditambah di belakang
+    ordered = list(dict.fromkeys(_as_list(original) if original is not None else []))
+    ordered.extend(sorted((value for value in values if value not in set(ordered)), key=str))
+    if len(ordered) == 1 and original is not None and not isinstance(original, list):
+        return ordered[0]
+    return ordered
+
+
+def _render_rule(rule):
+    if rule.matchers is None:
+        return rule.source
+    source = rule.source
+    rendered = {}
+    emitted_groups = set()
+    for key, value in source.items():
+        group = _FIELD_GROUPS.get(key)
+        if group is None:
+            rendered[key] = value
+            continue
+        if group in emitted_groups:
+            continue
+        emitted_groups.add(group)
+        if group in _PORT_GROUPS:
+            rendered.update(_render_ports(source, rule.matchers[group], *_PORT_GROUPS[group]))
+        elif group in _ADDRESS_GROUPS:
+            for field in _ADDRESS_GROUPS[group]:
+                if field in rule.matchers[group]:
+                    rendered[field] = _render_values(source.get(field), rule.matchers[group][field])
+        else:
+            rendered[key] = _render_values(value, rule.matchers[group])
+    return rendered
+
+
+def _try_merge(target, rule):
+    """Merges `rule` into the earlier `target` if both have the same outbound and matcher groups and differ in one group only."""
+    if target.matchers is None or target.outcome != rule.outcome or target.matchers.keys() != rule.matchers.keys():
+        return False
+    differing = [group for group in rule.matchers if target.matchers[group] != rule.matchers[group]]
+    if len(differing) != 1:
+        return False
+    group = differing[0]
+    if group in _ADDRESS_GROUPS and target.matchers[group].keys() != rule.matchers[group].keys():
+        return False
+    target.matchers = {**target.matchers, group: _merge_matchers(group, target.matchers[group], rule.matchers[group])}
+    return True
+
+
+def _shadow(kept, rule):
+    """Removes from `rule` the ports earlier rules already catch; True if nothing of `rule` is left to match."""
+    for earlier in kept:
+        if earlier.matchers is None:
+            continue
+        if _covers(earlier.matchers, rule.matchers):
+            return True
+        for group in _PORT_GROUPS:
+            if group in earlier.matchers and group in rule.matchers and _covers(earlier.matchers, rule.matchers, group):
+                remaining = _subtract_intervals(rule.matchers[group], earlier.matchers[group])
+                if not remaining:
+                    return True
+                # Lubang di tengah range bikin range-nya pecah; cuma dipakai kalau entry-nya nggak nambah
+                if _interval_entries(remaining) <= _interval_entries(rule.matchers[group]):
+                    rule.matchers = {**rule.matchers, group: remaining}
+    return False
+
+
+def _merge_into_earlier(kept, rule):
+    """
+    Merges `rule` into the nearest compatible earlier rule. Moving it up past a rule is only allowed if
+    that rule routes to the same outbound or can never match the same connection.
+    """
+    for earlier in reversed(kept):
+        if _try_merge(earlier, rule):
+            return True
+        same_route = earlier.final_outbound is not None and earlier.final_outbound == rule.final_outbound
+        if not same_route and (earlier.matchers is None or not _disjoint(earlier.matchers, rule.matchers)):
+            return False
+    return False
+
+
+def compact_route_rules(rules):
+    """
+    Returns (compacted_rules, compaction_stats) for a Sing-Box route.rules list; the input is not modified.
+    Every connection is routed exactly as by the original list:
+      - ports are sorted and deduplicated, port + port_range folded into a minimal interval set
+        (runs of MIN_RANGE_LENGTH+ ports become ranges, overlaps with ranges disappear);
+      - rules fully shadowed by an earlier rule are dropped, and ports an earlier rule with the same
+        (or wider) other conditions already catches are removed from later rules;
+      - a rule is merged into an earlier rule with the same outbound and fields that differs in one
+        matcher group only, if no rule in between with another outbound can match the same connection.
+    compaction_stats: {rules_before, rules_after, shadowed, merged, entries_before, entries_after}.
+    """
+    kept = []
+    shadowed = merged = 0
+    for source in rules:
+        rule = _Rule(source)
+        if rule.matchers is not None:
+            if _shadow(kept, rule):
+                shadowed += 1
+                continue
+            if _merge_into_earlier(kept, rule):
+                merged += 1
+                continue
+        kept.append(rule)
+
+    compacted = [_render_rule(rule) for rule in kept]
+    compaction_stats = {
+        "rules_before": len(rules),
+        "rules_after": len(compacted),
+        "shadowed": shadowed,
+        "merged": merged,
+        "entries_before": sum(_count_entries(rule) for rule in rules),
+        "entries_after": sum(_count_entries(rule) for rule in compacted),
+    }
+    logger.debug(f"route.rules dipadatkan: {compaction_stats}")
+    return compacted, compaction_stats
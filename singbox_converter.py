@@ -1,10 +1,28 @@
 import json
 import os
 import urllib.parse
-import base64
+import binascii
+import collections
+import hashlib
+import concurrent.futures
 import re
 import logging
 import sys
+import threading
+import time
+
+from config_serializer import PrerenderedConfig, dumps
+from config_shards import shard_names, split_by_count, split_by_weight, validate_shard_options
+from link_cache import MISSING
+from pipeline_stats import PipelineStats, summarize_failures
+from result_cache import result_cache_key
+from route_rules import compact_route_rules
+from outbound_records import json_default, GrpcTransport, TlsSettings, TrojanOutbound, VlessOutbound, VmessOutbound, WsTransport
+
+try:
+    import orjson
+except ImportError:  # orjson opsional, fallback ke json bawaan
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
@@ -17,93 +35,416 @@ EXCLUDED_SELECTOR_TAGS = [
     "Option P0rn"
 ]
 
-# Mapping kode negara ke simbol bendera Unicode
-COUNTRY_EMOJIS = {
-    "US": "🇺🇸", "SG": "🇸🇬", "ID": "🇮🇩", "JP": "🇯🇵", "DE": "🇩🇪",
-    "FR": "🇫🇷", "UK": "🇬🇧", "CA": "🇨🇦", "AU": "🇦🇺", "NL": "🇳🇱",
-    "KR": "🇰🇷", "HK": "🇭🇰", "TW": "🇹🇼", "IN": "🇮🇳", "BR": "🇧🇷",
-    "RU": "🇷🇺", "SE": "🇸🇪", "FI": "🇫🇮", "CH": "🇨🇭", "AR": "🇦🇷",
-    # Tambahkan lebih banyak jika diperlukan
-}
+# Urutan selector/urltest yang ditaruh paling atas di outbounds
+INITIAL_SELECTOR_TAGS = [
+    "Internet",
+    "Best Latency",
+    "Lock Region ID",
+    "WhatsApp",
+    "GAMESMAX(ML/FF/AOV)",
+    "Route Port Game",
+    "Option ADs",
+    "Option P0rn"
+]
+
+# Selector yang isinya diganti total dengan semua akun hasil konversi
+NODE_SELECTOR_TAGS = ["Internet", "Best Latency", "Lock Region ID"]
+
+# Selector yang isinya bisa disaring/diurutkan hasil latency probe (lihat latency_probe.py)
+LATENCY_SELECTOR_TAGS = ["Best Latency", "Lock Region ID"]
+
+# Mode region (group_by_region): kode region buat node yang negaranya nggak kedeteksi
+OTHER_REGION_CODE = "Other"
+
+# Setting urltest per region kalau template nggak punya urltest "Best Latency"
+DEFAULT_URLTEST_SETTINGS = {"url": "https://www.gstatic.com/generate_204", "interval": "30s"}
+
+# Versi output converter, bagian dari key cache hasil (result_cache.py) dan penanda versi cache parse di disk (link_cache.py).
+# Naikkan setiap kali perubahan kode bikin config yang dihasilkan beda, biar hasil lama di cache nggak dipakai lagi.
+CONVERTER_VERSION = "2026.10.2"
+
+# Outbounds bawaan yang selalu ada di akhir
+DEFAULT_OUTBOUND_TAGS = ["direct", "bypass", "block", "dns-out"]
+
+# Tipe outbound yang dihasilkan converter
+CONVERTED_OUTBOUND_TYPES = ("vmess", "vless", "trojan")
+
+# Kebijakan nama yang dipertahankan saat node duplikat digabung (lihat dedupe_parsed_outbounds)
+DEDUPE_POLICIES = ("first", "last", "shortest", "longest")
+
+# Semua kode ISO 3166-1 alpha-2 (+ EU); bendera dihitung dari huruf kodenya, bukan dari tabel emoji
+ISO_COUNTRY_CODES = frozenset("""
+    AD AE AF AG AI AL AM AO AQ AR AS AT AU AW AX AZ BA BB BD BE BF BG BH BI BJ BL BM BN BO BQ BR BS
+    BT BV BW BY BZ CA CC CD CF CG CH CI CK CL CM CN CO CR CU CV CW CX CY CZ DE DJ DK DM DO DZ EC EE
+    EG EH ER ES ET EU FI FJ FK FM FO FR GA GB GD GE GF GG GH GI GL GM GN GP GQ GR GS GT GU GW GY HK
+    HM HN HR HT HU ID IE IL IM IN IO IQ IR IS IT JE JM JO JP KE KG KH KI KM KN KP KR KW KY KZ LA LB
+    LC LI LK LR LS LT LU LV LY MA MC MD ME MF MG MH MK ML MM MN MO MP MQ MR MS MT MU MV MW MX MY MZ
+    NA NC NE NF NG NI NL NO NP NR NU NZ OM PA PE PF PG PH PK PL PM PN PR PS PT PW PY QA RE RO RS RU
+    RW SA SB SC SD SE SG SH SI SJ SK SL SM SN SO SR SS ST SV SX SY SZ TC TD TF TG TH TJ TK TL TM TN
+    TO TR TT TV TW TZ UA UG UM US UY UZ VA VC VE VG VI VN VU WF WS YE YT ZA ZM ZW
+""".split())
+
+# Kode yang sering dipakai di nama node tapi bukan kode ISO
+COUNTRY_CODE_ALIASES = {"UK": "GB"}
+
+FALLBACK_EMOJI = "🌎"
+
+# Jarak antara huruf A-Z dan Regional Indicator Symbol 🇦-🇿 (dua indikator = satu bendera)
+_REGIONAL_INDICATOR_OFFSET = 0x1F1E6 - ord("A")
+
+# Konvensi kode negara di awal nama (setelah bendera opsional): "US - Nama", "(AE) Nama", "[SG] Nama"
+_COUNTRY_PREFIX_PATTERNS = (
+    r'([A-Za-z]{2})\s*-',
+    r'\(([A-Za-z]{2})\)',
+    r'\[([A-Za-z]{2})\]',
+)
+
+# Satu regex precompiled: group 1 = bendera emoji yang sudah ada (misal "🇦🇪 (AE) Oracle"), sisanya kode teks
+_NAME_PREFIX_RE = re.compile(
+    r'\s*([\U0001F1E6-\U0001F1FF]{2})?\s*(?:' + '|'.join(_COUNTRY_PREFIX_PATTERNS) + r')?\s*'
+)
+
+# Bagian dalam kurung siku, misal [VLESS-TLS]
+_BRACKET_RE = re.compile(r'\s*\[.*?\]\s*')
+
+_GENERIC_NAME_PREFIXES = ("vmess", "vless", "trojan", "node")
+
+def template_content_hash(template_content):
+    """SHA-256 of a template (raw string, or the content hash of a SingboxTemplate)."""
+    if isinstance(template_content, SingboxTemplate):
+        return template_content.content_hash
+    return hashlib.sha256(template_content.encode("utf-8")).hexdigest()
+
+
+class SingboxTemplate:
+    """
+    A Sing-Box template parsed and indexed once, then reused for every conversion.
+    The template is split into the initial selectors, the extra template outbounds and the
+    static sections (dns, route, inbounds, ...). Conversions only copy the selectors they
+    rewrite and splice the converted outbounds in between; everything else is shared,
+    so the parsed template must be treated as read-only.
+    """
+
+    def __init__(self, template_content, path=None, mtime=None):
+        logger.debug(f"Received template_content (first 200 chars): {template_content[:200]}")
+        self.path = path
+        self.mtime = mtime
+        self.content_hash = template_content_hash(template_content)
+        self.config_data = json.loads(template_content)
+        logger.debug(f"Successfully parsed config_data keys: {self.config_data.keys()}")
+
+        template_outbounds = self.config_data["outbounds"]
+        self.outbound_map = {o["tag"]: o for o in template_outbounds if "tag" in o}
+
+        # Selector/urltest awal sesuai urutan, placeholder default kalau tidak ada di template
+        self.initial_selectors = []
+        for tag_name in INITIAL_SELECTOR_TAGS:
+            if tag_name in self.outbound_map:
+                self.initial_selectors.append(self.outbound_map[tag_name])
+                continue
+            if tag_name == "Internet":
+                self.initial_selectors.append({
+                    "tag": "Internet",
+                    "type": "selector",
+                    "outbounds": ["Best Latency", "direct"] # Default awal
+                })
+            elif tag_name == "Best Latency":
+                self.initial_selectors.append({
+                    "type": "urltest",
+                    "tag": "Best Latency",
+                    "outbounds": [], # Akan diisi dengan akun konversi + direct
+                    "url": "https://www.gstatic.com/generate_204",
+                    "interval": "30s"
+                })
+            elif tag_name == "Lock Region ID":
+                self.initial_selectors.append({
+                    "type": "selector",
+                    "tag": "Lock Region ID",
+                    "outbounds": []
+                })
+            elif tag_name in EXCLUDED_SELECTOR_TAGS:
+                # Untuk tag yang dikecualikan, jika tidak di template, tambahkan dengan outbounds default
+                self.initial_selectors.append({
+                    "type": "selector",
+                    "tag": tag_name,
+                    "outbounds": ["direct", "Internet", "Best Latency", "Lock Region ID"] # Default umum
+                })
+            logger.warning(f"Selector '{tag_name}' tidak ditemukan di template. Menambahkan placeholder default.")
+
+        # Outbounds lain dari template yang tidak termasuk selector awal maupun outbounds default
+        seen_tags = {o["tag"] for o in self.initial_selectors if "tag" in o}
+        self.extra_outbounds = []
+        for outbound in template_outbounds:
+            tag = outbound.get("tag")
+            if tag not in seen_tags and tag not in DEFAULT_OUTBOUND_TAGS:
+                self.extra_outbounds.append(outbound)
+                seen_tags.add(tag)
+
+        # Default fixed outbounds, selalu di bagian paling akhir
+        self.default_outbounds = [
+            {"type": "direct", "tag": "direct"},
+            {"type": "direct", "tag": "bypass"},
+            {"type": "block", "tag": "block"},
+            {"type": "dns", "tag": "dns-out"},
+        ]
+
+        # Bagian statis (dns, route, inbounds, experimental, ...) dengan urutan key aslinya,
+        # di-render ke JSON cukup sekali per style output
+        self.static_sections = {k: v for k, v in self.config_data.items() if k != "outbounds"}
+        self.renderer = PrerenderedConfig(self.static_sections)
+        self._compacted = None  # (route, renderer, compaction_stats), dihitung sekali pas pertama diminta
+
+    @classmethod
+    def from_file(cls, path):
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(f.read(), path=path, mtime=mtime)
+
+    @staticmethod
+    def _copy_outbound(outbound):
+        # Selector/urltest di-copy karena daftar "outbounds"-nya bisa diganti; sisanya dipakai bersama
+        return dict(outbound) if outbound.get("type") in ("selector", "urltest") else outbound
+
+    def build_outbounds(self, converted_outbounds, group_outbounds=()):
+        """
+        Returns the final outbounds list: initial selectors, generated groups (e.g. region urltests),
+        converted nodes, extra template outbounds, defaults.
+        """
+        converted_tags = {o["tag"] for o in converted_outbounds if "tag" in o}
+        final_outbounds = [dict(o) for o in self.initial_selectors]
+        final_outbounds.extend(group_outbounds)
+        final_outbounds.extend(converted_outbounds)
+        final_outbounds.extend(
+            self._copy_outbound(o) for o in self.extra_outbounds if o.get("tag") not in converted_tags
+        )
+        final_outbounds.extend(dict(o) for o in self.default_outbounds if o["tag"] not in converted_tags)
+        return final_outbounds
+
+    def compacted_route(self):
+        """
+        Returns (route, compaction_stats): the template's route section with route.rules compacted
+        (route_rules.compact_route_rules). Computed and pre-rendered once per template.
+        """
+        if self._compacted is None:
+            route = self.config_data.get("route")
+            if isinstance(route, dict) and isinstance(route.get("rules"), list):
+                rules, compaction_stats = compact_route_rules(route["rules"])
+                route = {**route, "rules": rules}
+            else:
+                compaction_stats = None
+            self._compacted = (route, PrerenderedConfig({**self.static_sections, "route": route}), compaction_stats)
+        return self._compacted[0], self._compacted[2]
+
+    def build_config_data(self, converted_outbounds, group_outbounds=(), compact_rules=False):
+        """
+        Returns a new config dict sharing the static sections, with freshly spliced outbounds.
+        With `compact_rules`, the route section is the compacted one (see compacted_route).
+        """
+        config_data = dict(self.config_data)
+        config_data["outbounds"] = self.build_outbounds(converted_outbounds, group_outbounds)
+        if compact_rules and "route" in config_data:
+            config_data["route"] = self.compacted_route()[0]
+        return config_data
+
+    def urltest_settings(self):
+        """url/interval (and tolerance, if set) of the template's "Best Latency" urltest, for generated urltests."""
+        best_latency = self.outbound_map.get("Best Latency")
+        if not best_latency or best_latency.get("type") != "urltest":
+            return dict(DEFAULT_URLTEST_SETTINGS)
+        return {key: best_latency[key] for key in ("url", "interval", "tolerance") if key in best_latency}
+
+    def serialize(self, config_data, style="pretty"):
+        """
+        Serializes a config built by build_config_data. Unchanged static sections come from the
+        pre-rendered cache. "pretty" output is identical to json.dumps(config_data, indent=2).
+        """
+        renderer = self.renderer
+        if self._compacted is not None and config_data.get("route") is self._compacted[0]:
+            renderer = self._compacted[1]
+        return renderer.render(config_data, style)
+
+
+_template_cache = {}
+_template_cache_lock = threading.Lock()
+
+
+def load_singbox_template(path):
+    """
+    Returns the SingboxTemplate for `path`, parsing it only once per process.
+    The template is reloaded automatically when the file's mtime changes.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    with _template_cache_lock:
+        cached = _template_cache.get(path)
+        if cached is not None and cached.mtime == mtime:
+            return cached
+    template = SingboxTemplate.from_file(path)
+    with _template_cache_lock:
+        _template_cache[path] = template
+    logger.info(f"Template Sing-Box dimuat: {path}")
+    return template
+
 
 def get_emoji_from_country_code(code):
-    # Mengembalikan emoji negara atau globe berwarna jika kode tidak ditemukan
-    return COUNTRY_EMOJIS.get(code.upper(), "🌎")
+    # Mengembalikan emoji negara (dihitung dari kodenya) atau globe berwarna jika kode tidak dikenal
+    code = code.upper()
+    code = COUNTRY_CODE_ALIASES.get(code, code)
+    if code not in ISO_COUNTRY_CODES:
+        return FALLBACK_EMOJI
+    return chr(ord(code[0]) + _REGIONAL_INDICATOR_OFFSET) + chr(ord(code[1]) + _REGIONAL_INDICATOR_OFFSET)
+
+def _country_code_from_flag(flag):
+    return "".join(chr(ord(indicator) - _REGIONAL_INDICATOR_OFFSET) for indicator in flag)
+
+def region_of_tag(tag):
+    """Country code of a formatted tag (read back from its leading flag), or OTHER_REGION_CODE."""
+    if len(tag) >= 2 and all(0x1F1E6 <= ord(indicator) <= 0x1F1FF for indicator in tag[:2]):
+        return _country_code_from_flag(tag[:2])
+    return OTHER_REGION_CODE
+
+def region_group_tag(region_code):
+    """Tag of the per-region urltest, e.g. "🇺🇸 US" or "🌎 Other"."""
+    return f"{get_emoji_from_country_code(region_code) if region_code != OTHER_REGION_CODE else FALLBACK_EMOJI} {region_code}"
+
+def _record_failure(failures, protocol, reason):
+    if failures is not None:
+        failures[(protocol, reason)] += 1
+
 
-def parse_vmess_link(vmess_link):
+def link_protocol(link_str):
+    """Returns the scheme of a link ("vmess", "vless", ...) or "unknown"."""
+    scheme, sep, _ = link_str.partition("://")
+    return scheme.lower() if sep and scheme.isalnum() else "unknown"
+
+
+# Alfabet base64 URL-safe (-_) diterjemahkan ke standar (+/) dalam satu pass di level bytes
+_URLSAFE_TO_STANDARD_B64 = bytes.maketrans(b"-_", b"+/")
+
+
+def decode_vmess_payload(payload):
+    """
+    Decodes a VMess payload (the base64 part after "vmess://", standard or URL-safe alphabet,
+    padding optional) into its JSON config dict. The JSON is parsed from the decoded bytes with
+    orjson when installed. Raises ValueError (binascii.Error, JSONDecodeError, ...) on bad input.
+    """
+    data = payload.encode("ascii").translate(_URLSAFE_TO_STANDARD_B64)
+    data = binascii.a2b_base64(data.ljust(len(data) + -len(data) % 4, b"="))
+    if orjson is not None:
+        try:
+            config = orjson.loads(data)
+        except orjson.JSONDecodeError:
+            config = json.loads(data)  # Mis. integer di luar 64-bit; json bawaan yang kasih error final
+    else:
+        config = json.loads(data)
+    if not isinstance(config, dict):
+        raise ValueError(f"Payload VMess bukan JSON object: {type(config).__name__}")
+    return config
+
+
+def decode_vmess_batch(vmess_links):
+    """
+    Decodes many VMess links (or bare payloads) in one call, without per-link logging.
+    Returns (configs, errors): `configs` is aligned with the input (None where decoding failed),
+    `errors` is a list of {"index", "reason", "error", "link"} dicts, reason being the exception
+    type name as in the "vmess" failure counts.
+    """
+    configs = []
+    errors = []
+    for index, link in enumerate(vmess_links):
+        try:
+            configs.append(decode_vmess_payload(link[8:] if link.startswith("vmess://") else link))
+        except ValueError as e:
+            configs.append(None)
+            errors.append({"index": index, "reason": type(e).__name__, "error": str(e), "link": link[:50]})
+    return configs, errors
+
+
+def parse_vmess_link(vmess_link, failures=None):
     """
     Parses a VMess link (assuming base64 encoded JSON config).
     Returns a dictionary of VMess config, or None if parsing fails.
+    If a `failures` Counter is given, failures are counted by ("vmess", reason).
     """
     try:
         if not vmess_link or not vmess_link.startswith("vmess://"):
             logger.debug(f"VMess link invalid format or empty: {vmess_link[:50]}...")
+            _record_failure(failures, "vmess", "invalid_format")
             return None
-        
-        encoded_data = vmess_link[len("vmess://"):]
-        # Base64 decode with padding correction
-        missing_padding = len(encoded_data) % 4
-        if missing_padding:
-            encoded_data += '=' * (4 - missing_padding)
-
-        decoded_data = base64.b64decode(encoded_data).decode('utf-8')
-        config = json.loads(decoded_data)
+
+        config = decode_vmess_payload(vmess_link[len("vmess://"):])
         logger.debug(f"Successfully parsed VMess link: {config.get('ps', 'NoName')}")
         return config
     except Exception as e:
         logger.error(f"Error parsing VMess link (base64/JSON issue) for {vmess_link[:50]}...: {e}")
+        _record_failure(failures, "vmess", type(e).__name__)
         return None
 
-def convert_link_to_singbox_outbound(link_str, node_counter):
+def _transport_from_params(params):
+    """Builds the transport sub-record from VLESS/Trojan query params (None for plain TCP)."""
+    transport_type = params.get("type", ["tcp"])[0]
+    if transport_type == "ws":
+        return WsTransport(params.get("path", ["/"])[0], params.get("host", [""])[0])
+    if transport_type == "grpc":
+        return GrpcTransport(params.get("serviceName", [""])[0])
+    return None
+
+
+def _tls_from_params(params, server):
+    return TlsSettings(
+        params.get("sni", [server])[0],
+        fingerprint=params["fp"][0] if params.get("fp") else None,
+        alpn=params["alpn"][0].split(',') if params.get("alpn") else None,
+    )
+
+
+def _vmess_outbound_from_config(vmess_config):
+    """Builds the (outbound, original_tag_name) parse result from a decoded VMess JSON config."""
+    original_tag_name = vmess_config.get("ps")
+    tls = None
+    if vmess_config.get("tls", "") == "tls":
+        tls = TlsSettings(
+            vmess_config.get("host", vmess_config.get("add")),
+            fingerprint=vmess_config.get("fp"),
+            alpn=vmess_config["alpn"].split(',') if vmess_config.get("alpn") else None,
+        )
+
+    transport_type = vmess_config.get("net", "tcp")
+    transport = None
+    if transport_type == "ws":
+        transport = WsTransport(vmess_config.get("path", "/"), vmess_config.get("host", ""))
+    elif transport_type == "grpc":
+        transport = GrpcTransport(vmess_config.get("path", ""))
+
+    outbound = VmessOutbound(
+        tag=original_tag_name,
+        server=vmess_config.get("add"),
+        server_port=int(vmess_config.get("port")),
+        uuid=vmess_config.get("id"),
+        security=vmess_config.get("scy", "auto"),
+        alter_id=int(vmess_config.get("aid", 0)),
+        network=transport_type,
+        tls=tls,
+        transport=transport,
+    )
+    return outbound, original_tag_name
+
+
+def parse_link_to_singbox_outbound(link_str, failures=None):
     """
-    Converts a VMess, VLESS, or Trojan link string to a Sing-Box outbound configuration.
-    Returns a dictionary of Sing-Box outbound config, or None if conversion fails.
-    Adds a unique and formatted tag based on country emoji, ISP, and counter.
+    Parses a VMess, VLESS, or Trojan link string into an untagged Sing-Box outbound record
+    (see outbound_records.py). Returns a tuple (outbound, original_tag_name), or None if parsing fails.
+    original_tag_name is None for VMess links without a "ps" name; the caller
+    then falls back to a counter-based name (see convert_link_to_singbox_outbound).
+    If a `failures` Counter is given, failures are counted by (protocol, reason).
     """
     outbound = None
     original_tag_name = "Node"
-    country_code = ""
 
     if link_str.startswith("vmess://"):
-        vmess_config = parse_vmess_link(link_str)
+        vmess_config = parse_vmess_link(link_str, failures)
         if not vmess_config:
             return None
-        
-        original_tag_name = vmess_config.get("ps", f"VMess_Node_{node_counter}")
-        outbound = {
-            "tag": original_tag_name, 
-            "type": "vmess",
-            "server": vmess_config.get("add"),
-            "server_port": int(vmess_config.get("port")),
-            "uuid": vmess_config.get("id"),
-            "security": vmess_config.get("scy", "auto"),
-            "alterId": int(vmess_config.get("aid", 0)),
-            "network": vmess_config.get("net", "tcp"),
-        }
-        if vmess_config.get("tls", "") == "tls":
-            outbound["tls"] = {
-                "enabled": True,
-                "server_name": vmess_config.get("host", vmess_config.get("add")),
-                "insecure": False,
-                "disable_sni": False
-            }
-            if vmess_config.get("fp"):
-                outbound["tls"]["utls"] = {"enabled": True, "fingerprint": vmess_config["fp"]}
-            if vmess_config.get("alpn"):
-                outbound["tls"]["alpn"] = vmess_config["alpn"].split(',')
-
-        transport_type = vmess_config.get("net", "tcp")
-        transport_settings = {}
-        if transport_type == "ws":
-            transport_settings = {
-                "type": "ws",
-                "path": vmess_config.get("path", "/"),
-                "headers": {"Host": vmess_config.get("host", "")}
-            }
-        elif transport_type == "grpc":
-            transport_settings = {"type": "grpc", "grpc_service_name": vmess_config.get("path", "")}
-        if transport_settings:
-            outbound["transport"] = transport_settings
+        return _vmess_outbound_from_config(vmess_config)
     
     elif link_str.startswith("vless://"):
         try:
@@ -114,40 +455,21 @@ def convert_link_to_singbox_outbound(link_str, node_counter):
             params = urllib.parse.parse_qs(parsed_url.query)
             
             original_tag_name = urllib.parse.unquote(parsed_url.fragment) if parsed_url.fragment else f"VLESS_Node_{server}"
-            outbound = {
-                "tag": original_tag_name,
-                "type": "vless",
-                "server": server,
-                "server_port": int(port),
-                "uuid": uuid,
-                "network": params.get("type", ["tcp"])[0],
-            }
+            tls = None
             if "security" in params and params["security"][0] == "tls":
-                outbound["tls"] = {
-                    "enabled": True,
-                    "server_name": params.get("sni", [server])[0],
-                    "insecure": False,
-                    "disable_sni": False
-                }
-                if params.get("fp"):
-                    outbound["tls"]["utls"] = {"enabled": True, "fingerprint": params["fp"][0]}
-                if params.get("alpn"):
-                    outbound["tls"]["alpn"] = params["alpn"][0].split(',')
-
-            transport_type = params.get("type", ["tcp"])[0]
-            transport_settings = {}
-            if transport_type == "ws":
-                transport_settings = {
-                    "type": "ws",
-                    "path": params.get("path", ["/"])[0],
-                    "headers": {"Host": params.get("host", [""])[0]}
-                }
-            elif transport_type == "grpc":
-                transport_settings = {"type": "grpc", "grpc_service_name": params.get("serviceName", [""])[0]}
-            if transport_settings:
-                outbound["transport"] = transport_settings
+                tls = _tls_from_params(params, server)
+            outbound = VlessOutbound(
+                tag=original_tag_name,
+                server=server,
+                server_port=int(port),
+                uuid=uuid,
+                network=params.get("type", ["tcp"])[0],
+                tls=tls,
+                transport=_transport_from_params(params),
+            )
         except Exception as e:
             logger.error(f"Error parsing VLESS link for {link_str[:50]}...: {e}")
+            _record_failure(failures, "vless", type(e).__name__)
             return None
     
     elif link_str.startswith("trojan://"):
@@ -158,265 +480,1066 @@ def convert_link_to_singbox_outbound(link_str, node_counter):
             params = urllib.parse.parse_qs(parsed_url.query)
             
             original_tag_name = urllib.parse.unquote(parsed_url.fragment) if parsed_url.fragment else f"Trojan_Node_{server}"
-            outbound = {
-                "tag": original_tag_name,
-                "type": "trojan",
-                "server": server,
-                "server_port": int(port),
-                "password": password,
-            }
+            tls = None
             if "security" in params and params["security"][0] == "tls" or "sni" in params:
-                outbound["tls"] = {
-                    "enabled": True,
-                    "server_name": params.get("sni", [server])[0],
-                    "insecure": False,
-                    "disable_sni": False
-                }
-                if params.get("fp"):
-                    outbound["tls"]["utls"] = {"enabled": True, "fingerprint": params["fp"][0]}
-                if params.get("alpn"):
-                    outbound["tls"]["alpn"] = params["alpn"][0].split(',')
-
-            transport_type = params.get("type", ["tcp"])[0]
-            transport_settings = {}
-            if transport_type == "ws":
-                transport_settings = {
-                    "type": "ws",
-                    "path": params.get("path", ["/"])[0],
-                    "headers": {"Host": params.get("host", [""])[0]}
-                }
-            elif transport_type == "grpc":
-                transport_settings = {"type": "grpc", "grpc_service_name": params.get("serviceName", [""])[0]}
-            if transport_settings:
-                outbound["transport"] = transport_settings
+                tls = _tls_from_params(params, server)
+            outbound = TrojanOutbound(
+                tag=original_tag_name,
+                server=server,
+                server_port=int(port),
+                password=password,
+                tls=tls,
+                transport=_transport_from_params(params),
+            )
         except Exception as e:
             logger.error(f"Error parsing Trojan link for {link_str[:50]}...: {e}")
+            _record_failure(failures, "trojan", type(e).__name__)
             return None
 
     else:
         logger.warning(f"Unsupported link type for conversion: {link_str[:50]}...")
+        _record_failure(failures, link_protocol(link_str), "unsupported_protocol")
+        return None
+
+    return outbound, original_tag_name
+
+
+def format_singbox_tag(original_tag_name, node_counter):
+    """
+    Builds the final outbound tag: country flag + ISP/original name + running number.
+    """
+    # Logika pembentukan tag baru: simbol bendera + nama ISP/nama asli + nomor urut
+    display_name = original_tag_name
+    country_code = ""
+
+    # Bendera yang sudah ada di depan nama dipakai sebagai kode negara; kode teks (US - / (AE) / [SG]) menang
+    match_prefix = _NAME_PREFIX_RE.match(display_name)
+    last_group = match_prefix.lastindex
+    if last_group:
+        if last_group > 1:
+            country_code = match_prefix.group(last_group).upper()
+        else:
+            country_code = _country_code_from_flag(match_prefix.group(1))
+        display_name = display_name[match_prefix.end():]
+
+    # Hapus bagian dalam kurung siku jika ada (misal [VLESS-TLS])
+    if "[" in display_name:
+        display_name = _BRACKET_RE.sub('', display_name)
+    display_name = display_name.strip()
+
+    # Cek apakah nama display_name sudah cukup informatif, kalau tidak, pakai original_tag_name utuh
+    # Atau jika setelah dibersihkan jadi kosong, pakai nama aslinya (tanpa bendera, biar nggak dobel)
+    if not display_name or display_name.lower().startswith(_GENERIC_NAME_PREFIXES):
+        fallback_name = original_tag_name[match_prefix.end(1):] if match_prefix.start(1) >= 0 else original_tag_name
+        display_name = fallback_name.replace('_', ' ').strip() or country_code # Ganti underscore jadi spasi
+
+    emoji = get_emoji_from_country_code(country_code)
+    
+    return f"{emoji} {display_name} #{node_counter}".strip()
+
+
+def tag_parsed_outbound(parsed, node_counter):
+    """
+    Applies the counter-dependent tag to a result of parse_link_to_singbox_outbound.
+    """
+    outbound, original_tag_name = parsed
+    if original_tag_name is None:
+        original_tag_name = f"VMess_Node_{node_counter}"
+    outbound.tag = format_singbox_tag(original_tag_name, node_counter)
+    logger.debug(f"Converted link to Sing-Box outbound with formatted tag: {outbound.tag}")
+    return outbound
+
+
+def convert_link_to_singbox_outbound(link_str, node_counter):
+    """
+    Converts a VMess, VLESS, or Trojan link string to a Sing-Box outbound configuration.
+    Returns a tagged outbound record (outbound_records.py), or None if conversion fails.
+    Adds a unique and formatted tag based on country emoji, ISP, and counter.
+    The record is a read-only Mapping with the keys and key order of the Sing-Box JSON, not a dict:
+    item assignment raises TypeError. Callers that need to modify the outbound should work on
+    record.to_dict() (a plain dict copy) instead.
+    """
+    parsed = parse_link_to_singbox_outbound(link_str)
+    if not parsed:
         return None
+    return tag_parsed_outbound(parsed, node_counter)
+
+
+def parse_links_batch(links, failures=None):
+    """
+    Parses a list of links like parse_link_to_singbox_outbound, keeping their order, but decodes all
+    VMess payloads in one decode_vmess_batch call: VMess decode errors are counted in `failures`
+    and logged as one summary line instead of one log line per link.
+    """
+    vmess_configs, vmess_errors = decode_vmess_batch([link for link in links if link.startswith("vmess://")])
+    if vmess_errors:
+        for error in vmess_errors:
+            _record_failure(failures, "vmess", error["reason"])
+        logger.warning(f"{len(vmess_errors)} link VMess gagal di-decode, contoh: {vmess_errors[0]}")
+
+    vmess_configs = iter(vmess_configs)
+    results = []
+    for link in links:
+        if link.startswith("vmess://"):
+            vmess_config = next(vmess_configs)
+            results.append(_vmess_outbound_from_config(vmess_config) if vmess_config else None)
+        else:
+            results.append(parse_link_to_singbox_outbound(link, failures))
+    return results
+
+
+def _parse_link_chunk(links):
+    """Worker process entry point: parses a chunk of links, keeping their order."""
+    failures = collections.Counter()
+    return parse_links_batch(links, failures), failures
+
+
+def _iter_chunks(links, chunk_size):
+    chunk = []
+    for link in links:
+        chunk.append(link)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_parsed_links_parallel(links, workers=None, chunk_size=500, cache=None, stats=None):
+    """
+    Like iter_parsed_links, but parses links in a process pool.
+    Links are consumed lazily in chunks; only a bounded number of chunks is in flight at once.
+    Results are yielded in the original input order, so node_counter tags stay deterministic.
+    With a cache, only cache misses are sent to the workers.
+    With a PipelineStats, the time spent waiting for workers is recorded as "parse (parallel)".
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 2
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        chunk_iter = _iter_chunks(links, chunk_size)
+        while True:
+            while len(pending) < max_in_flight:
+                chunk = next(chunk_iter, None)
+                if chunk is None:
+                    break
+                cached = [cache.get(link) if cache is not None else MISSING for link in chunk]
+                if stats is not None:
+                    for link, parsed in zip(chunk, cached):
+                        if parsed is None:
+                            stats.record_failure(link_protocol(link), "cached_failure")
+                misses = [link for link, parsed in zip(chunk, cached) if parsed is MISSING]
+                future = executor.submit(_parse_link_chunk, misses) if misses else None
+                pending.append((chunk, cached, future))
+            if not pending:
+                break
+            chunk, cached, future = pending.popleft()
+            wait_start = time.perf_counter()
+            parsed_misses, failures = future.result() if future is not None else ([], collections.Counter())
+            parsed_misses = iter(parsed_misses)
+            if stats is not None:
+                stats.add("parse (parallel)", time.perf_counter() - wait_start, len(chunk))
+                for (protocol, reason), count in failures.items():
+                    stats.record_failure(protocol, reason, count)
+            for link, parsed in zip(chunk, cached):
+                if parsed is MISSING:
+                    parsed = next(parsed_misses)
+                    if cache is not None:
+                        cache.put(link, parsed)
+                if parsed:
+                    yield parsed
+
+
+def iter_singbox_outbounds_parallel(links, workers=None, chunk_size=500, start_counter=1, cache=None):
+    """
+    Like iter_singbox_outbounds, but parses links in a process pool (see iter_parsed_links_parallel).
+    """
+    return tag_parsed_outbounds(
+        iter_parsed_links_parallel(links, workers=workers, chunk_size=chunk_size, cache=cache), start_counter
+    )
+
+
+class ConversionCancelled(Exception):
+    """Raised from a `progress` callback to stop a running conversion; the result then has status "cancelled"."""
+
+
+def iter_with_progress(links, progress):
+    """Passes `links` through, calling progress(count) after every link (the callback may raise ConversionCancelled)."""
+    count = 0
+    for link in links:
+        count += 1
+        progress(count)
+        yield link
+
+
+def cancelled_result(stats=None):
+    """Result dict of a conversion stopped by ConversionCancelled."""
+    logger.info("Konversi dibatalkan.")
+    result = {"status": "cancelled", "message": "Konversi dibatalkan."}
+    if stats is not None:
+        result["stats"] = stats.to_dict()
+    return result
+
+
+def _iter_string_links(text):
+    # Potong per baris langsung dari string aslinya; io.StringIO nyalin seluruh input (ASCII jadi UCS-4, 4x lipat)
+    start, end = 0, len(text)
+    while start < end:
+        newline = text.find("\n", start)
+        if newline == -1:
+            newline = end
+        link = text[start:newline].strip()
+        if link:
+            yield link
+        start = newline + 1
+
+
+def iter_links(link_source):
+    """
+    Yields stripped, non-empty link lines from a string, an open (text or binary) file,
+    or any iterable of lines. Lines are read lazily, so the raw input is never held in memory at once;
+    a string is sliced line by line without copying it.
+    """
+    if isinstance(link_source, str):
+        yield from _iter_string_links(link_source)
+        return
+    for line in link_source:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        link = line.strip()
+        if link:
+            yield link
+
+
+def iter_parsed_links(links, cache=None, stats=None, chunk_size=500):
+    """
+    Lazily parses links into untagged (outbound, original_tag_name) results, skipping links that fail.
+    Links are read in chunks of `chunk_size`; within a chunk the cache misses of each protocol go through
+    one parse_links_batch call, so VMess payloads are decoded in one batch with one summary error line.
+    Failed links are not logged one by one: they are counted per protocol/reason in stats.failures.
+    An optional ParsedLinkCache skips re-parsing links that were seen before.
+    An optional PipelineStats records parse time per protocol ("parse:<protocol>") and failures.
+    """
+    failures = stats.failures if stats is not None else None
+    for chunk in _iter_chunks(links, chunk_size):
+        by_protocol = {}
+        for index, link in enumerate(chunk):
+            by_protocol.setdefault(link_protocol(link), []).append(index)
+
+        results = [None] * len(chunk)
+        for protocol, indexes in by_protocol.items():
+            start = time.perf_counter()
+            misses = []
+            for index in indexes:
+                parsed = cache.get(chunk[index]) if cache is not None else MISSING
+                if parsed is MISSING:
+                    misses.append(index)
+                elif parsed is None:
+                    _record_failure(failures, protocol, "cached_failure")
+                results[index] = parsed
+            if misses:
+                for index, parsed in zip(misses, parse_links_batch([chunk[index] for index in misses], failures)):
+                    if cache is not None:
+                        cache.put(chunk[index], parsed)
+                    results[index] = parsed
+            if stats is not None:
+                stats.add(f"parse:{protocol}", time.perf_counter() - start, len(indexes))
 
-    if outbound:
-        # Logika pembentukan tag baru: simbol bendera + nama ISP/nama asli + nomor urut
-        display_name = original_tag_name
-        country_code = ""
+        for parsed in results:
+            if parsed:
+                yield parsed
+
+
+def tag_parsed_outbounds(parsed_results, start_counter=1, stats=None):
+    """Tags parsed results with running numbers, in order. Tagging time is recorded as "tag_format"."""
+    node_counter = start_counter
+    for parsed in parsed_results:
+        if stats is not None:
+            start = time.perf_counter()
+            outbound = tag_parsed_outbound(parsed, node_counter)
+            stats.add("tag_format", time.perf_counter() - start, 1)
+        else:
+            outbound = tag_parsed_outbound(parsed, node_counter)
+        yield outbound
+        node_counter += 1
+
+
+def dedupe_parsed_outbounds(parsed_results, policy="first", stats=None):
+    """
+    Collapses parsed results that share the same connection (see OutboundRecord.connection_key),
+    e.g. the same server/port/uuid/transport scraped under different names.
+    Each surviving node stays at the position of its first occurrence; `policy` decides which
+    name it keeps: "first", "last", "shortest" or "longest". "first" streams, the others buffer
+    the parsed results. The number of collapsed duplicates is written to stats["collapsed"].
+    """
+    if policy not in DEDUPE_POLICIES:
+        raise ValueError(f"Dedupe policy nggak dikenal: {policy}")
+    if stats is None:
+        stats = {}
+    stats["policy"] = policy
+    stats["collapsed"] = 0
+
+    if policy == "first":
+        seen_keys = set()
+        for parsed in parsed_results:
+            key = parsed[0].connection_key()
+            if key in seen_keys:
+                stats["collapsed"] += 1
+                continue
+            seen_keys.add(key)
+            yield parsed
+        if stats["collapsed"]:
+            logger.info(f"Dedupe ({policy}): {stats['collapsed']} node duplikat digabung.")
+        return
+
+    kept = {}
+    for parsed in parsed_results:
+        key = parsed[0].connection_key()
+        current = kept.get(key)
+        if current is None:
+            kept[key] = parsed
+            continue
+        stats["collapsed"] += 1
+        current_name, new_name = current[1] or "", parsed[1] or ""
+        if (policy == "last"
+                or (policy == "shortest" and len(new_name) < len(current_name))
+                or (policy == "longest" and len(new_name) > len(current_name))):
+            kept[key] = (current[0], parsed[1])
+    if stats["collapsed"]:
+        logger.info(f"Dedupe ({policy}): {stats['collapsed']} node duplikat digabung.")
+    yield from kept.values()
+
+
+def _stable_order_key(parsed):
+    # connection_key campur None/int/str, jadi dibandingkan lewat repr-nya; nama asli buat tie-break
+    outbound, original_tag_name = parsed
+    return repr(outbound.connection_key()), original_tag_name or ""
+
+
+def sort_parsed_outbounds(parsed_results, stats=None):
+    """
+    Returns the parsed results sorted by connection (protocol, server, port, credential, transport)
+    and then by original name, so the node order and running numbers do not depend on the order of
+    the links in the subscription. Consecutive configs then differ only where nodes really changed,
+    which keeps git deltas and client-side diffs small. Added or removed nodes still shift the running
+    numbers after them; update_singbox_config keeps existing tags for that case.
+    Sorting time is recorded as "stable_order".
+    """
+    parsed_results = list(parsed_results)  # Parse di upstream (generator) jangan ikut kehitung waktu sort
+    start = time.perf_counter()
+    ordered = sorted(parsed_results, key=_stable_order_key)
+    if stats is not None:
+        stats.add("stable_order", time.perf_counter() - start, len(ordered))
+    return ordered
+
+
+def iter_singbox_outbounds(links, start_counter=1, cache=None):
+    """
+    Lazily converts links to Sing-Box outbounds, yielding each converted outbound as soon as it is ready.
+    The node counter only advances for links that were converted successfully.
+    An optional ParsedLinkCache skips re-parsing links that were seen before.
+    """
+    return tag_parsed_outbounds(iter_parsed_links(links, cache=cache), start_counter)
+
+
+def rewrite_selector_references(final_outbounds, converted_outbounds, latency_tags=None, region_tags=None):
+    """
+    Points the selector/urltest outbounds in `final_outbounds` at the converted outbounds
+    (except EXCLUDED_SELECTOR_TAGS). Selectors are updated in place; returns how many changed.
+    If `latency_tags` is given (from LatencyProber.latency_tags), LATENCY_SELECTOR_TAGS get those
+    tags instead of every converted outbound.
+    If `region_tags` is given (region mode, see build_region_groups), selectors point at those
+    region groups instead of the individual nodes; latency filtering already happened inside the groups.
+    """
+    # --- UPDATE REFERENSI UNTUK SELECTOR/URLTEST (DENGAN PENGECUALIAN) ---
+    # Pakai set/dict (ordered set) supaya pengecekan "sudah ada?" O(1),
+    # jadi biayanya linear terhadap jumlah node x jumlah selector.
+    all_outbound_tags = {o["tag"] for o in final_outbounds if "tag" in o}
+    logger.debug(f"All available outbound tags after reordering: {len(all_outbound_tags)} tags")
+
+    # Tag akun konversi (unik, urutan dipertahankan) cukup dihitung sekali untuk semua selector
+    converted_tags = list(dict.fromkeys(o["tag"] for o in converted_outbounds))
+    if region_tags is not None:
+        # Mode region: selector cuma berisi group per region, node-nya ada di dalam group itu
+        converted_tags = latency_tags = list(region_tags)
+
+    updated_ref_count = 0
+    # Akun hasil konversi bukan selector, jadi cukup cek selector/urltest dari template
+    for outbound_item in final_outbounds:
+        if outbound_item.get("type") not in ("selector", "urltest"):
+            continue
+        current_selector_tag = outbound_item.get("tag")
         
-        # Coba ekstrak kode negara (misal US, SG, ID) dari awal nama
-        match_country = re.match(r'^([A-Za-z]{2})\s*-\s*(.*)', display_name)
-        if match_country:
-            country_code = match_country.group(1).upper()
-            remaining_name = match_country.group(2).strip()
-            display_name = remaining_name
+        # Lewati jika ada di daftar pengecualian
+        if current_selector_tag in EXCLUDED_SELECTOR_TAGS:
+            logger.info(f"Melewati selector '{current_selector_tag}' karena ada di daftar pengecualian.")
+            continue 
+
+        # Tipe selector/urltest sudah dicek di atas, tinggal pastikan daftar outbounds-nya valid
+        if not isinstance(outbound_item.get("outbounds"), list):
+            logger.debug(f"Skipping malformed selector: {outbound_item.get('tag', 'No Tag')} (outbounds bukan list)")
+            continue
         
-        # Hapus bagian dalam kurung siku jika ada (misal [VLESS-TLS])
-        display_name = re.sub(r'\s*\[.*?\]\s*', '', display_name).strip()
+        original_nested_outbounds_list = outbound_item["outbounds"]
 
-        # Cek apakah nama display_name sudah cukup informatif, kalau tidak, pakai original_tag_name utuh
-        # Atau jika setelah dibersihkan jadi kosong, pakai nama aslinya
-        if not display_name or display_name.lower().startswith(("vmess", "vless", "trojan", "node")):
-            display_name = original_tag_name.replace('_', ' ').strip() # Ganti underscore jadi spasi
+        # Untuk "Internet", "Best Latency", "Lock Region ID", tambahkan semua akun VPN hasil konversi
+        if current_selector_tag in NODE_SELECTOR_TAGS:
+            # Tambahkan akun konversi terlebih dahulu (selector latency: cuma node yang lolos probe)
+            if latency_tags is not None and current_selector_tag in LATENCY_SELECTOR_TAGS:
+                nested_tag_set = dict.fromkeys(latency_tags)
+            else:
+                nested_tag_set = dict.fromkeys(converted_tags)
 
-        emoji = get_emoji_from_country_code(country_code)
-        
-        final_tag = f"{emoji} {display_name} #{node_counter}".strip()
-        outbound["tag"] = final_tag
-        logger.debug(f"Converted link to Sing-Box outbound with formatted tag: {outbound.get('tag')}")
-        return outbound
-    return None
+            # Lalu tambahkan "direct"
+            if "direct" in all_outbound_tags:
+                nested_tag_set.setdefault("direct")
 
+            new_nested_outbounds = list(nested_tag_set)
 
-def process_singbox_config(vmess_links_str, template_content, output_options=None):
+            # Untuk "Internet", pastikan "Best Latency" dan "Lock Region ID" ada di awal
+            if current_selector_tag == "Internet":
+                if "Best Latency" in all_outbound_tags and "Best Latency" not in nested_tag_set:
+                    new_nested_outbounds.insert(0, "Best Latency") # Prioritaskan Best Latency
+                    nested_tag_set["Best Latency"] = None
+                
+                # Cek posisi "Lock Region ID" agar tidak di depan Best Latency
+                if "Lock Region ID" in all_outbound_tags and "Lock Region ID" not in nested_tag_set:
+                    insert_index = 0
+                    if "Best Latency" in nested_tag_set:
+                        insert_index = new_nested_outbounds.index("Best Latency") + 1
+                    new_nested_outbounds.insert(insert_index, "Lock Region ID")
+            
+        else: # Untuk selector lain yang tidak dikecualikan dan bukan di atas
+            # Pertahankan outbounds asli yang masih valid
+            nested_tag_set = dict.fromkeys(
+                t for t in original_nested_outbounds_list if t in all_outbound_tags
+            )
+            
+            # Tambahkan akun konversi jika belum ada
+            for converted_tag in converted_tags:
+                nested_tag_set.setdefault(converted_tag)
+
+            # Tambahkan default tags jika belum ada di selector ini
+            for default_tag_check in DEFAULT_OUTBOUND_TAGS:
+                if default_tag_check in all_outbound_tags:
+                    nested_tag_set.setdefault(default_tag_check)
+
+            new_nested_outbounds = list(nested_tag_set)
+
+        # Hanya update jika ada perubahan
+        if new_nested_outbounds != original_nested_outbounds_list:
+            outbound_item["outbounds"] = new_nested_outbounds
+            updated_ref_count += 1
+            logger.debug(f"Updated selector '{current_selector_tag}'. New outbounds: {len(new_nested_outbounds)} tags")
+        else:
+            logger.debug(f"Selector '{current_selector_tag}' not updated (no changes).")
+
+    return updated_ref_count
+
+
+def process_singbox_config(vmess_links_str, template_content, output_options=None, workers=None, cache=None, output_style="pretty",
+                           dedupe=None, prober=None, latency_mode="drop", group_by_region=False, compact_rules=False,
+                           progress=None, result_cache=None, shard_by=None, shard_limit=None, stable_order=False):
     """
     Processes VMess/VLESS/Trojan links and integrates them into a Sing-Box configuration template.
     It puts converted outbounds based on the user's specified order.
     Excludes certain selector tags from being updated.
     """
+    return process_singbox_config_stream(vmess_links_str, template_content, output_options, workers=workers, cache=cache,
+                                         output_style=output_style, dedupe=dedupe, prober=prober, latency_mode=latency_mode,
+                                         group_by_region=group_by_region, compact_rules=compact_rules, progress=progress,
+                                         result_cache=result_cache, shard_by=shard_by, shard_limit=shard_limit,
+                                         stable_order=stable_order)
+
+
+def process_singbox_config_stream(link_source, template_content, output_options=None, workers=None, cache=None,
+                                  output_style="pretty", dedupe=None, prober=None, latency_mode="drop", group_by_region=False,
+                                  compact_rules=False, progress=None, result_cache=None, shard_by=None, shard_limit=None,
+                                  stable_order=False):
+    """
+    Streaming variant of process_singbox_config.
+    `link_source` can be a string, an open file (text or binary) or any iterable of lines,
+    e.g. a multi-hundred-MB subscription dump. Links are parsed and converted one by one,
+    so peak memory depends on the generated config rather than on the raw input.
+    If `workers` is greater than 1, links are parsed in a process pool of that size.
+    An optional ParsedLinkCache (link_cache.py) memoizes parsed links across calls;
+    its hit/miss counters are returned as "cache_stats".
+    `output_style` is "pretty" (indent 2, the default) or "compact" (see config_serializer.py).
+    `dedupe` is None (keep every node) or a DEDUPE_POLICIES name; duplicates are collapsed before
+    tags are assigned and the count is returned as "dedupe_stats".
+    With `stable_order`, nodes are sorted by connection before tags are assigned (sort_parsed_outbounds),
+    so a subscription that only reshuffles its links produces the same config.
+    An optional LatencyProber (latency_probe.py) probes every converted node; with `latency_mode`
+    "drop" unreachable nodes are left out of LATENCY_SELECTOR_TAGS, with "rank" those selectors are
+    ordered by RTT. Probe counts are returned as "latency_stats".
+    With `group_by_region`, nodes go into one urltest per detected country and Internet / Best Latency /
+    Lock Region ID list those region groups instead of every node (see build_region_groups).
+    With `compact_rules`, the template's route.rules are compacted without changing any routing
+    decision (see route_rules.py).
+    An optional `progress` callback is called with the number of links read after every link; if it
+    raises ConversionCancelled, the conversion stops and the result has status "cancelled".
+    An optional ConversionResultCache (result_cache.py) returns the config generated earlier for the same
+    links, template, CONVERTER_VERSION and options without converting again. The key is hashed in a
+    separate streaming pass over the links, so the cache needs a re-iterable `link_source` (a string, a
+    list or dump_reader.DumpLinks); one-shot streams such as stdin, open files or generators are converted
+    without it. It is also bypassed when a prober is given, since probe results change over time.
+    Its counters are returned as "result_cache_stats".
+    With `shard_by` ("count", "size" or "region", see config_shards.py), the nodes are split into several
+    complete configs with their own selectors (render_config_shards), returned as "shards"
+    ([{"name", "nodes", "bytes", "config_content"}]); `shard_limit` is the node count or byte budget per
+    shard. "config_content" is then the first shard, and the result cache is not used.
+    Per-stage wall time, item counts and failures by protocol/reason are returned as "stats"
+    (see pipeline_stats.py); when links failed, the failure counts are also returned as "failures".
+    """
+    stats = PipelineStats()
+    if shard_by is not None:
+        try:
+            validate_shard_options(shard_by, shard_limit)
+        except ValueError as e:
+            return {"status": "error", "message": str(e), "stats": stats.to_dict()}
     try:
-        logger.debug(f"Received template_content (first 200 chars): {template_content[:200]}")
-        
-        config_data = json.loads(template_content)
-        logger.debug(f"Successfully parsed config_data keys: {config_data.keys()}")
+        cache_key = None
+        if result_cache is not None and iter(link_source) is link_source:
+            # Stream sekali jalan (stdin, generator) nggak bisa di-hash tanpa ditampung semua di memori
+            logger.info("Link source cuma bisa dibaca sekali, cache hasil dilewati.")
+            result_cache = None
+        if result_cache is not None and prober is None and shard_by is None:
+            with stats.stage("result_cache_lookup"):
+                options = {"output_style": output_style, "dedupe": dedupe, "group_by_region": group_by_region,
+                           "compact_rules": compact_rules, "stable_order": stable_order}
+                cache_key = result_cache_key(iter_links(link_source), template_content_hash(template_content), CONVERTER_VERSION, options)
+                cached = result_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Hasil konversi diambil dari cache ({cache_key[:12]}).")
+                return {
+                    "status": "success",
+                    "message": f"{cached['message']} Diambil dari cache hasil (link, template & opsi sama persis), nggak dikonversi ulang.",
+                    "config_content": cached["config_content"],
+                    "stats": stats.to_dict(),
+                    "result_cache_stats": result_cache.stats(),
+                }
 
-        vmess_links = [link.strip() for link in vmess_links_str.split('\n') if link.strip()]
+        template = as_singbox_template(template_content, stats)
+        converted_outbounds, dedupe_stats = convert_link_source(link_source, stats, workers=workers, cache=cache, dedupe=dedupe,
+                                                                progress=progress, stable_order=stable_order)
+        latency_tags, latency_stats = probe_latency(converted_outbounds, prober, latency_mode, stats)
+        if shard_by is not None:
+            shards = render_config_shards(template, converted_outbounds, stats, latency_tags, output_style,
+                                          group_by_region, compact_rules, shard_by, shard_limit)
+            result = {
+                "status": "success",
+                "message": f"Konfigurasi Sing-Box baru sudah dibuat, dipecah jadi {len(shards)} shard.",
+                "config_content": shards[0]["config_content"],
+                "shards": shards,
+                "stats": stats.to_dict(),
+            }
+            return add_conversion_stats(result, cache, dedupe_stats, latency_stats, stats.failures)
 
-        converted_outbounds = []
-        node_counter = 1
-        for link in vmess_links:
-            outbound = convert_link_to_singbox_outbound(link, node_counter)
-            if outbound:
-                converted_outbounds.append(outbound)
-                node_counter += 1
-            else:
-                logger.warning(f"Failed to convert link: {link}")
+        new_config_content = render_singbox_config(template, converted_outbounds, stats, latency_tags, output_style,
+                                                   group_by_region, compact_rules)
+
+        result = {
+            "status": "success", 
+            "message": "Konfigurasi Sing-Box baru sudah dibuat.",
+            "config_content": new_config_content, 
+            "stats": stats.to_dict(),
+        }
+        result = add_conversion_stats(result, cache, dedupe_stats, latency_stats, stats.failures)
+        if cache_key is not None:
+            result_cache.put(cache_key, new_config_content, result["message"])
+            result["result_cache_stats"] = result_cache.stats()
+        return result
+
+    except ConversionCancelled:
+        return cancelled_result(stats)
+    except Exception as e:
+        logger.error(f"Error during Sing-Box conversion: {e}", exc_info=True)
+        return {"status": "error", "message": f"Terjadi error yang nggak terduga saat konversi Sing-Box: {e}", "stats": stats.to_dict()}
 
-        if not converted_outbounds:
-            logger.warning("Nggak ada link VPN valid yang dikonversi. Melanjutkan dengan outbounds template dan default.")
 
-        # Default fixed outbounds
-        direct_outbound = {"type": "direct", "tag": "direct"}
-        bypass_outbound = {"type": "direct", "tag": "bypass"}
-        block_outbound = {"type": "block", "tag": "block"}
-        dns_out_outbound = {"type": "dns", "tag": "dns-out"}
+def as_singbox_template(template_content, stats):
+    """Returns template_content as a SingboxTemplate, parsing it (timed as "template_parse") if it is a string."""
+    with stats.stage("template_parse"):
+        if isinstance(template_content, SingboxTemplate):
+            return template_content
+        template = SingboxTemplate(template_content)
+        stats.add("template_parse", 0, 1)
+        return template
 
-        existing_default_tags = ["direct", "bypass", "block", "dns-out"]
-        
-        template_outbound_map = {o["tag"]: o for o in config_data["outbounds"] if "tag" in o}
-
-        final_outbounds = []
-
-        desired_initial_selector_tags = [
-            "Internet",
-            "Best Latency",
-            "Lock Region ID",
-            "WhatsApp",
-            "GAMESMAX(ML/FF/AOV)",
-            "Route Port Game",
-            "Option ADs",
-            "Option P0rn"
-        ]
 
-        # Tambahkan selector/urltest awal sesuai urutan
-        for tag_name in desired_initial_selector_tags:
-            if tag_name in template_outbound_map:
-                final_outbounds.append(template_outbound_map[tag_name])
+def convert_link_source(link_source, stats, workers=None, cache=None, dedupe=None, progress=None, stable_order=False):
+    """
+    The parse half of the pipeline, shared by every output format: splits, parses (optionally in
+    `workers` processes and through `cache`), dedupes, optionally sorts (`stable_order`, see
+    sort_parsed_outbounds) and tags the links of `link_source`.
+    An optional `progress` callback gets the number of links read so far (see iter_with_progress).
+    Returns (converted_outbounds, dedupe_stats); dedupe_stats is None without `dedupe`.
+    """
+    links = iter_links(link_source)
+    if progress is not None:
+        links = iter_with_progress(links, progress)
+    links = stats.timed_iter(links, "link_split")
+    if workers and workers > 1:
+        parsed_results = iter_parsed_links_parallel(links, workers=workers, cache=cache, stats=stats)
+    else:
+        parsed_results = iter_parsed_links(links, cache=cache, stats=stats)
+    dedupe_stats = None
+    if dedupe:
+        dedupe_stats = {}
+        parsed_results = dedupe_parsed_outbounds(parsed_results, policy=dedupe, stats=dedupe_stats)
+    if stable_order:
+        parsed_results = sort_parsed_outbounds(parsed_results, stats=stats)
+    converted_outbounds = list(tag_parsed_outbounds(parsed_results, stats=stats))
+    if cache is not None:
+        cache.flush()
+
+    if not converted_outbounds:
+        logger.warning("Nggak ada link VPN valid yang dikonversi. Melanjutkan dengan outbounds template dan default.")
+    return converted_outbounds, dedupe_stats
+
+
+def probe_latency(converted_outbounds, prober, latency_mode, stats):
+    """Runs the optional latency probe; returns (latency_tags, latency_stats), both None without a prober."""
+    if prober is None or not converted_outbounds:
+        return None, None
+    with stats.stage("latency_probe", len(converted_outbounds)):
+        return prober.latency_tags(converted_outbounds, latency_mode)
+
+
+def build_region_index(tags):
+    """Groups tags by region_of_tag in one pass: {region_code: [tags]}, keeping the order of `tags` per region."""
+    index = {}
+    for tag in tags:
+        index.setdefault(region_of_tag(tag), []).append(tag)
+    return index
+
+
+def build_region_groups(template, converted_outbounds, latency_tags=None):
+    """
+    Region mode: one urltest per detected country over its nodes (in latency_tags order and
+    filtered by it, if given), with the template's urltest settings. Regions are sorted by code,
+    OTHER_REGION_CODE last. Returns the list of group outbounds; regions without nodes are left out.
+    """
+    tags = latency_tags if latency_tags is not None else [o["tag"] for o in converted_outbounds]
+    index = build_region_index(dict.fromkeys(tags))
+    settings = template.urltest_settings()
+    return [
+        {"type": "urltest", "tag": region_group_tag(region_code), "outbounds": index[region_code], **settings}
+        for region_code in sorted(index, key=lambda code: (code == OTHER_REGION_CODE, code))
+    ]
+
+
+def render_singbox_config(template, converted_outbounds, stats, latency_tags=None, output_style="pretty",
+                          group_by_region=False, compact_rules=False):
+    """
+    Builds the Sing-Box config around the converted outbounds and serializes it.
+    With `group_by_region`, nodes are grouped into per-country urltests (build_region_groups) and the
+    node selectors list those groups instead of every node.
+    With `compact_rules`, route.rules are compacted (route_rules.py); the rule count after compaction
+    is recorded as "route_compaction".
+    """
+    if compact_rules:
+        with stats.stage("route_compaction"):
+            _, compaction_stats = template.compacted_route()
+        if compaction_stats is not None:
+            stats.add("route_compaction", 0, compaction_stats["rules_after"])
+
+    region_groups = ()
+    region_tags = None
+    if group_by_region:
+        with stats.stage("region_index"):
+            region_groups = build_region_groups(template, converted_outbounds, latency_tags)
+            region_tags = [group["tag"] for group in region_groups]
+        stats.add("region_index", 0, len(region_groups))
+
+    with stats.stage("build_outbounds", len(converted_outbounds)):
+        config_data = template.build_config_data(converted_outbounds, region_groups, compact_rules)
+    final_outbounds = config_data["outbounds"]
+
+    with stats.stage("selector_rewrite"):
+        updated_ref_count = rewrite_selector_references(final_outbounds, converted_outbounds, latency_tags, region_tags)
+    stats.add("selector_rewrite", 0, updated_ref_count)
+
+    logger.info(f"{updated_ref_count} selector/urltest outbounds berhasil diperbarui referensinya.")
+
+    with stats.stage("serialization"):
+        new_config_content = template.serialize(config_data, output_style)
+    stats.add("serialization", 0, len(new_config_content))
+    return new_config_content
+
+
+def _shard_node_weights(template, converted_outbounds, output_style, group_by_region):
+    # Perkiraan bytes yang ditambah satu node ke config: outbound-nya sendiri + tag-nya di tiap selector
+    # yang nunjuk ke node (mode region: cuma di urltest region-nya)
+    if group_by_region:
+        references = 1
+    else:
+        references = sum(
+            1 for o in [*template.initial_selectors, *template.extra_outbounds]
+            if o.get("type") in ("selector", "urltest") and o.get("tag") not in EXCLUDED_SELECTOR_TAGS
+        )
+    separator, reference_overhead = (6, 10) if output_style == "pretty" else (1, 1)
+    return [
+        len(dumps(o, output_style, 2).encode("utf-8")) + separator
+        + references * (len(dumps(o["tag"], output_style).encode("utf-8")) + reference_overhead)
+        for o in converted_outbounds
+    ]
+
+
+def plan_config_shards(template, converted_outbounds, shard_by, shard_limit=None, output_style="pretty",
+                       group_by_region=False, base_bytes=0):
+    """
+    Splits the converted outbounds into shard chunks, in their original order.
+    Returns a list of (key, outbounds); key is the region code in "region" mode, else None.
+    "size" mode packs nodes by their estimated serialized size into `shard_limit` minus the
+    `base_bytes` of a config without nodes (render_config_shards re-checks the real size).
+    """
+    validate_shard_options(shard_by, shard_limit)
+    if shard_by == "count":
+        return [(None, chunk) for chunk in split_by_count(converted_outbounds, shard_limit)]
+    if shard_by == "size":
+        weights = _shard_node_weights(template, converted_outbounds, output_style, group_by_region)
+        budget = shard_limit - base_bytes
+        if budget <= 0:
+            logger.warning(f"Config tanpa node ({base_bytes} bytes) sudah lebih gede dari batas shard {shard_limit} bytes, "
+                           f"tiap shard isinya satu node.")
+            budget = 1
+        return [(None, chunk) for chunk in split_by_weight(converted_outbounds, weights, budget)]
+
+    by_region = {}
+    for outbound in converted_outbounds:
+        by_region.setdefault(region_of_tag(outbound["tag"]), []).append(outbound)
+    if not by_region:
+        return [(None, [])]
+    chunks = []
+    for region_code in sorted(by_region, key=lambda code: (code == OTHER_REGION_CODE, code)):
+        region_chunks = split_by_count(by_region[region_code], shard_limit) if shard_limit else [by_region[region_code]]
+        chunks.extend((region_code, chunk) for chunk in region_chunks)
+    return chunks
+
+
+def render_config_shards(template, converted_outbounds, stats, latency_tags=None, output_style="pretty",
+                         group_by_region=False, compact_rules=False, shard_by="count", shard_limit=None):
+    """
+    Split-output mode: renders one complete config per shard (see plan_config_shards) from a single
+    parsed node list. Every shard goes through render_singbox_config with only its own nodes, so its
+    selectors (and region groups / latency filtering) reference exactly the nodes it contains.
+    In "size" mode a shard that still ends up over `shard_limit` bytes is halved and rendered again.
+    Returns a list of {"name", "nodes", "bytes", "config_content"} dicts.
+    """
+    base_bytes = 0
+    if shard_by == "size":
+        base_bytes = len(render_singbox_config(template, [], PipelineStats(), None, output_style, group_by_region,
+                                               compact_rules).encode("utf-8"))
+    with stats.stage("shard_plan"):
+        pending = plan_config_shards(template, converted_outbounds, shard_by, shard_limit, output_style, group_by_region,
+                                     base_bytes)
+    stats.add("shard_plan", 0, len(pending))
+
+    rendered = []
+    pending.reverse()  # Dipakai sebagai stack, urutan shard tetap sama dengan urutan node
+    while pending:
+        key, outbounds = pending.pop()
+        shard_latency_tags = None
+        if latency_tags is not None:
+            shard_tags = {o["tag"] for o in outbounds}
+            shard_latency_tags = [tag for tag in latency_tags if tag in shard_tags]
+        config_content = render_singbox_config(template, outbounds, stats, shard_latency_tags, output_style,
+                                               group_by_region, compact_rules)
+        size = len(config_content.encode("utf-8"))
+        if shard_by == "size" and size > shard_limit and len(outbounds) > 1:
+            middle = len(outbounds) // 2
+            pending.append((key, outbounds[middle:]))
+            pending.append((key, outbounds[:middle]))
+            continue
+        rendered.append((key, {"nodes": len(outbounds), "bytes": size, "config_content": config_content}))
+
+    shards = []
+    for name, (_, shard) in zip(shard_names([key for key, _ in rendered]), rendered):
+        shards.append({"name": name, **shard})
+    logger.info(f"Config dipecah jadi {len(shards)} shard ({shard_by}, batas {shard_limit}).")
+    return shards
+
+
+def add_conversion_stats(result, cache=None, dedupe_stats=None, latency_stats=None, failures=None):
+    """
+    Adds cache/dedupe/latency stats to a success result and mentions them in its message.
+    `failures` ({(protocol, reason): count}, e.g. PipelineStats.failures) is returned as "failures"
+    ([{"protocol", "reason", "count"}]) when any link failed.
+    """
+    if cache is not None:
+        result["cache_stats"] = cache.stats()
+    if dedupe_stats is not None:
+        result["dedupe_stats"] = dedupe_stats
+        if dedupe_stats["collapsed"]:
+            result["message"] += f" {dedupe_stats['collapsed']} node duplikat digabung."
+    if latency_stats is not None:
+        result["latency_stats"] = latency_stats
+        if latency_stats["dead"] and latency_stats["mode"] == "drop":
+            result["message"] += f" {latency_stats['dead']} node nggak bisa dihubungi, di-skip dari {' & '.join(LATENCY_SELECTOR_TAGS)}."
+    if failures:
+        result["failures"] = summarize_failures(failures)
+        result["message"] += f" {sum(failures.values())} link gagal dikonversi."
+    return result
+
+_TAG_COUNTER_RE = re.compile(r' #(\d+)$')
+
+
+def _is_converted_outbound(outbound):
+    return outbound.get("type") in CONVERTED_OUTBOUND_TYPES and bool(_TAG_COUNTER_RE.search(outbound.get("tag", "")))
+
+
+# Node tanpa nama (VMess tanpa "ps") dapat nama fallback yang ikut counter: "🌎 VMess Node 3 #3"
+_UNNAMED_NODE_NAME_RE = re.compile(r'^' + re.escape(FALLBACK_EMOJI) + r' VMess Node \d+$')
+
+
+def _identity_name(tag):
+    # Tag tanpa nomor urut; None buat node tanpa nama, karena nama fallback-nya ikut berubah tiap nomor berubah
+    name = _TAG_COUNTER_RE.sub('', tag)
+    return None if _UNNAMED_NODE_NAME_RE.match(name) else name
+
+
+def _identity_settings(outbound):
+    return json.dumps({k: v for k, v in outbound.items() if k != "tag"}, sort_keys=True, default=json_default)
+
+
+def _node_identity(outbound):
+    """
+    Identity of a converted node in a generated config: its display name (tag without the running
+    number, None for unnamed nodes) plus the rest of its settings. Comparable with _parsed_identity.
+    """
+    return _identity_name(outbound["tag"]), _identity_settings(outbound)
+
+
+def _parsed_identity(parsed):
+    """
+    Identity of an untagged parse result (see _node_identity): the display name its remark is formatted
+    to, or None without a remark, plus its settings. Never depends on the node counter.
+    """
+    outbound, original_tag_name = parsed
+    name = None
+    if original_tag_name is not None:
+        name = _identity_name(format_singbox_tag(original_tag_name, 0))
+    return name, _identity_settings(outbound)
+
+
+def _converted_nodes(config):
+    return [o for o in config.get("outbounds", []) if _is_converted_outbound(o)]
+
+
+def _selector_outbounds(config):
+    return {o.get("tag"): o.get("outbounds") for o in config.get("outbounds", []) if o.get("type") in ("selector", "urltest")}
+
+
+def _has_region_groups(config):
+    # Config hasil mode region punya urltest per negara ("🇺🇸 US", "🌎 Other") di luar selector template
+    return any(o.get("type") == "urltest" and o.get("tag") not in INITIAL_SELECTOR_TAGS
+               and o.get("tag") == region_group_tag(o.get("tag", "").rsplit(" ", 1)[-1])
+               for o in config.get("outbounds", []))
+
+
+def _rebuild_with_changes(previous_config, previous_config_content, link_source, template_content, options):
+    """
+    Incremental fallback: a full rebuild with process_singbox_config_stream and `options`, with the
+    "changes" summary computed by comparing node identities with the previous config (if any).
+    """
+    result = process_singbox_config_stream(link_source, template_content, **options)
+    if result["status"] != "success":
+        return result
+
+    previous_nodes = collections.defaultdict(collections.deque)
+    for outbound in _converted_nodes(previous_config or {}):
+        previous_nodes[_node_identity(outbound)].append(outbound["tag"])
+    new_config = json.loads(result["config_content"])
+    added_tags = []
+    unchanged = 0
+    for outbound in _converted_nodes(new_config):
+        matches = previous_nodes.get(_node_identity(outbound))
+        if matches:
+            matches.popleft()
+            unchanged += 1
+        else:
+            added_tags.append(outbound["tag"])
+
+    previous_selectors = _selector_outbounds(previous_config or {})
+    result["changes"] = {
+        "changed": result["config_content"] != previous_config_content,
+        "added": added_tags,
+        "removed": [tag for tags in previous_nodes.values() for tag in tags],
+        "unchanged": unchanged,
+        "selectors_updated": sum(previous_selectors.get(tag) != outbounds
+                                 for tag, outbounds in _selector_outbounds(new_config).items()),
+    }
+    if not result["changes"]["changed"]:
+        result["message"] = "Nggak ada perubahan, config Sing-Box tetap sama."
+    return result
+
+
+def update_singbox_config(previous_config_content, link_source, template_content=None, cache=None, progress=None,
+                          workers=None, output_style="pretty", dedupe=None, prober=None, latency_mode="drop",
+                          group_by_region=False, compact_rules=False, stable_order=False):
+    """
+    Incrementally updates a previously generated Sing-Box config with a new link list.
+    Nodes that are still present keep their existing tags and positions, removed nodes are
+    dropped from outbounds and selectors, new nodes are appended with fresh running numbers.
+    Only selectors that reference changed nodes are touched.
+
+    Returns the same result dict as process_singbox_config plus a "changes" summary:
+    {"changed", "added", "removed", "unchanged", "selectors_updated"}. When nothing changed,
+    config_content is the previous content as-is, so callers can skip writing/committing it.
+    If there is no usable previous config, falls back to a full rebuild from template_content.
+    `progress`, `workers`, `output_style` and `dedupe` work as in process_singbox_config_stream;
+    with `stable_order` the new nodes are numbered in connection order. `compact_rules` compacts the
+    route.rules of the previous config (route_rules.py). A `prober` needs every node probed and the
+    latency selectors rebuilt, so with a prober the config is rebuilt in full from template_content
+    (the changes are then computed against the previous nodes). The same goes for `group_by_region`
+    and for a previous config that was generated in region mode: node selectors there list region
+    urltests instead of nodes, so patching them node by node would be wrong.
+    """
+    try:
+        previous_config = json.loads(previous_config_content) if previous_config_content else None
+    except ValueError:
+        logger.warning("Config sebelumnya bukan JSON valid, melakukan rebuild penuh.")
+        previous_config = None
+
+    rebuild_options = {"cache": cache, "progress": progress, "workers": workers, "output_style": output_style,
+                       "dedupe": dedupe, "prober": prober, "latency_mode": latency_mode, "group_by_region": group_by_region,
+                       "compact_rules": compact_rules, "stable_order": stable_order}
+    if not previous_config or not isinstance(previous_config.get("outbounds"), list):
+        if template_content is None:
+            return {"status": "error", "message": "Config sebelumnya nggak valid dan template nggak dikasih."}
+        return _rebuild_with_changes(None, previous_config_content, link_source, template_content, rebuild_options)
+    if prober is not None:
+        if template_content is None:
+            return {"status": "error", "message": "Probe latency di mode incremental butuh template buat rebuild penuh."}
+        logger.info("Probe latency aktif: mode incremental pakai rebuild penuh.")
+        return _rebuild_with_changes(previous_config, previous_config_content, link_source, template_content, rebuild_options)
+    if group_by_region or _has_region_groups(previous_config):
+        if template_content is None:
+            return {"status": "error", "message": "Mode region di mode incremental butuh template buat rebuild penuh."}
+        logger.info("Mode region: mode incremental pakai rebuild penuh.")
+        return _rebuild_with_changes(previous_config, previous_config_content, link_source, template_content, rebuild_options)
+
+    stats = PipelineStats()
+    try:
+        outbounds = previous_config["outbounds"]
+
+        # Index node lama berdasarkan identitasnya (bisa ada duplikat, jadi simpan list)
+        previous_nodes = collections.defaultdict(collections.deque)
+        max_counter = 0
+        for outbound in outbounds:
+            if _is_converted_outbound(outbound):
+                previous_nodes[_node_identity(outbound)].append(outbound)
+                max_counter = max(max_counter, int(_TAG_COUNTER_RE.search(outbound["tag"]).group(1)))
+
+        kept_tags = set()
+        added_outbounds = []
+        node_counter = max_counter + 1
+        links = iter_links(link_source)
+        if progress is not None:
+            links = iter_with_progress(links, progress)
+        if workers and workers > 1:
+            parsed_results = iter_parsed_links_parallel(links, workers=workers, cache=cache, stats=stats)
+        else:
+            parsed_results = iter_parsed_links(links, cache=cache, stats=stats)
+        if dedupe:
+            parsed_results = dedupe_parsed_outbounds(parsed_results, policy=dedupe)
+        if stable_order:
+            parsed_results = sort_parsed_outbounds(parsed_results)
+        for parsed in parsed_results:
+            # Identitas dari hasil parse yang belum diberi tag, jadi nggak tergantung nomor urut
+            matches = previous_nodes.get(_parsed_identity(parsed))
+            if matches:
+                kept_tags.add(matches.popleft()["tag"])
             else:
-                # Jika selector tidak ada di template, tambahkan placeholder default
-                if tag_name == "Internet":
-                    final_outbounds.append({
-                        "tag": "Internet",
-                        "type": "selector",
-                        "outbounds": ["Best Latency", "direct"] # Default awal
-                    })
-                elif tag_name == "Best Latency":
-                     final_outbounds.append({
-                        "type": "urltest",
-                        "tag": "Best Latency",
-                        "outbounds": [], # Akan diisi dengan akun konversi + direct
-                        "url": "https://www.gstatic.com/generate_204",
-                        "interval": "30s"
-                    })
-                elif tag_name == "Lock Region ID":
-                     final_outbounds.append({
-                        "type": "selector",
-                        "tag": "Lock Region ID",
-                        "outbounds": []
-                    })
-                elif tag_name in EXCLUDED_SELECTOR_TAGS:
-                    # Untuk tag yang dikecualikan, jika tidak di template, tambahkan dengan outbounds default
-                    final_outbounds.append({
-                        "type": "selector",
-                        "tag": tag_name,
-                        "outbounds": ["direct", "Internet", "Best Latency", "Lock Region ID"] # Default umum
-                    })
-                logger.warning(f"Selector '{tag_name}' tidak ditemukan di template. Menambahkan placeholder default.")
-
-        # Tambahkan akun hasil konversi
-        final_outbounds.extend(converted_outbounds)
+                added_outbounds.append(tag_parsed_outbound(parsed, node_counter))
+                node_counter += 1
+        if cache is not None:
+            cache.flush()
 
-        # Tambahkan outbounds lain dari template yang tidak termasuk dalam kategori di atas
-        # dan belum ditambahkan ke final_outbounds.
-        current_final_outbound_tags = {o["tag"] for o in final_outbounds if "tag" in o}
-        
-        for outbound in config_data["outbounds"]:
-            tag = outbound.get("tag")
-            if tag not in current_final_outbound_tags and tag not in existing_default_tags:
-                final_outbounds.append(outbound)
-                current_final_outbound_tags.add(tag) 
-
-        # Tambahkan outbounds default di bagian paling akhir, pastikan tidak duplikat
-        if direct_outbound["tag"] not in current_final_outbound_tags: final_outbounds.append(direct_outbound)
-        if bypass_outbound["tag"] not in current_final_outbound_tags: final_outbounds.append(bypass_outbound)
-        if block_outbound["tag"] not in current_final_outbound_tags: final_outbounds.append(block_outbound)
-        if dns_out_outbound["tag"] not in current_final_outbound_tags: final_outbounds.append(dns_out_outbound)
-        
-        config_data["outbounds"] = final_outbounds
+        removed_tags = [o["tag"] for nodes in previous_nodes.values() for o in nodes]
+        added_tags = [o["tag"] for o in added_outbounds]
+        changes = {
+            "changed": bool(added_tags or removed_tags),
+            "added": added_tags,
+            "removed": removed_tags,
+            "unchanged": len(kept_tags),
+            "selectors_updated": 0,
+        }
 
-        # --- UPDATE REFERENSI UNTUK SELECTOR/URLTEST (DENGAN PENGECUALIAN) ---
-        all_outbound_tags = [o["tag"] for o in final_outbounds if "tag" in o]
-        logger.debug(f"All available outbound tags after reordering: {all_outbound_tags}")
+        # Patch daftar outbounds: buang node yang hilang, sisipkan node baru setelah node terakhir
+        removed_tag_set = set(removed_tags)
+        new_outbounds = []
+        insert_index = None
+        for outbound in outbounds:
+            if outbound.get("tag") in removed_tag_set and _is_converted_outbound(outbound):
+                continue
+            new_outbounds.append(outbound)
+            if outbound.get("tag") in kept_tags or outbound.get("tag") in INITIAL_SELECTOR_TAGS:
+                insert_index = len(new_outbounds)
+        if insert_index is None:
+            insert_index = 0
+        new_outbounds[insert_index:insert_index] = added_outbounds
+        previous_config["outbounds"] = new_outbounds
 
-        updated_ref_count = 0
-        for outbound_item in config_data["outbounds"]:
+        # Patch selector/urltest yang tidak dikecualikan
+        for outbound_item in new_outbounds:
             current_selector_tag = outbound_item.get("tag")
-            
-            # Lewati jika ada di daftar pengecualian
             if current_selector_tag in EXCLUDED_SELECTOR_TAGS:
-                logger.info(f"Melewati selector '{current_selector_tag}' karena ada di daftar pengecualian.")
-                continue 
+                continue
+            if outbound_item.get("type") not in ("selector", "urltest") or not isinstance(outbound_item.get("outbounds"), list):
+                continue
 
-            if (outbound_item.get("type") == "selector" or \
-                outbound_item.get("type") == "urltest") and \
-                "outbounds" in outbound_item and \
-                isinstance(outbound_item["outbounds"], list):
-                
-                original_nested_outbounds_list = list(outbound_item["outbounds"])
-                
-                new_nested_outbounds = []
-
-                # Untuk "Internet", "Best Latency", "Lock Region ID", tambahkan semua akun VPN hasil konversi
-                if current_selector_tag in ["Internet", "Best Latency", "Lock Region ID"]:
-                    # Tambahkan akun konversi terlebih dahulu
-                    for converted_o in converted_outbounds:
-                        if converted_o["tag"] not in new_nested_outbounds:
-                            new_nested_outbounds.append(converted_o["tag"])
-                    
-                    # Lalu tambahkan "direct"
-                    if "direct" not in new_nested_outbounds and "direct" in all_outbound_tags:
-                        new_nested_outbounds.append("direct")
-
-                    # Untuk "Internet", pastikan "Best Latency" dan "Lock Region ID" ada di awal
-                    if current_selector_tag == "Internet":
-                        if "Best Latency" in all_outbound_tags and "Best Latency" not in new_nested_outbounds:
-                            new_nested_outbounds.insert(0, "Best Latency") # Prioritaskan Best Latency
-                        
-                        # Cek posisi "Lock Region ID" agar tidak di depan Best Latency
-                        if "Lock Region ID" in all_outbound_tags and "Lock Region ID" not in new_nested_outbounds:
-                            insert_index = 0
-                            if "Best Latency" in new_nested_outbounds:
-                                insert_index = new_nested_outbounds.index("Best Latency") + 1
-                            new_nested_outbounds.insert(insert_index, "Lock Region ID")
-                    
-                else: # Untuk selector lain yang tidak dikecualikan dan bukan di atas
-                    # Pertahankan outbounds asli yang masih valid
-                    for original_tag_in_selector in original_nested_outbounds_list:
-                        if original_tag_in_selector in all_outbound_tags and original_tag_in_selector not in new_nested_outbounds:
-                            new_nested_outbounds.append(original_tag_in_selector)
-                    
-                    # Tambahkan akun konversi jika belum ada
-                    for converted_o in converted_outbounds:
-                        if converted_o["tag"] not in new_nested_outbounds:
-                            new_nested_outbounds.append(converted_o["tag"])
-
-                    # Tambahkan default tags jika belum ada di selector ini
-                    for default_tag_check in ["direct", "bypass", "block", "dns-out"]:
-                        if default_tag_check not in new_nested_outbounds and default_tag_check in all_outbound_tags:
-                            new_nested_outbounds.append(default_tag_check)
-
-                # Hanya update jika ada perubahan
-                if new_nested_outbounds != original_nested_outbounds_list:
-                    outbound_item["outbounds"] = new_nested_outbounds
-                    updated_ref_count += 1
-                    logger.debug(f"Updated selector '{current_selector_tag}'. New outbounds: {new_nested_outbounds}")
-                else:
-                    logger.debug(f"Selector '{current_selector_tag}' not updated (no changes).")
-            else:
-                logger.debug(f"Skipping non-selector item or malformed selector: {outbound_item.get('tag', 'No Tag')} (Type: {type(outbound_item.get('type'))})")
+            original_nested_outbounds_list = outbound_item["outbounds"]
+            new_nested_outbounds = [t for t in original_nested_outbounds_list if t not in removed_tag_set]
 
+            # Node baru ditaruh setelah node lama terakhir, atau sebelum outbounds default kalau belum ada node
+            position = None
+            for index, tag in enumerate(new_nested_outbounds):
+                if tag in kept_tags:
+                    position = index + 1
+            if position is None:
+                position = next((i for i, t in enumerate(new_nested_outbounds) if t in DEFAULT_OUTBOUND_TAGS), len(new_nested_outbounds))
+            new_nested_outbounds[position:position] = added_tags
 
-        logger.info(f"{updated_ref_count} selector/urltest outbounds berhasil diperbarui referensinya.")
+            if new_nested_outbounds != original_nested_outbounds_list:
+                outbound_item["outbounds"] = new_nested_outbounds
+                changes["selectors_updated"] += 1
 
-        new_config_content = json.dumps(config_data, indent=2)
-        
-        return {
-            "status": "success", 
-            "message": "Konfigurasi Sing-Box baru sudah dibuat.",
-            "config_content": new_config_content, 
+        route = previous_config.get("route")
+        if compact_rules and isinstance(route, dict) and isinstance(route.get("rules"), list):
+            previous_config["route"] = {**route, "rules": compact_route_rules(route["rules"])[0]}
+
+        # Node sama tapi style output / route rules bisa beda dari config lama, jadi hasil render-nya yang dibandingin
+        new_config_content = dumps(previous_config, output_style)
+        if new_config_content == previous_config_content:
+            result = {
+                "status": "success",
+                "message": "Nggak ada perubahan node, config Sing-Box tetap sama.",
+                "config_content": previous_config_content,
+                "changes": changes,
+                "stats": stats.to_dict(),
+            }
+            return add_conversion_stats(result, failures=stats.failures)
+        changes["changed"] = True
+
+        logger.info(f"Update incremental: {len(added_tags)} node baru, {len(removed_tags)} node dihapus, "
+                    f"{changes['selectors_updated']} selector diperbarui.")
+        result = {
+            "status": "success",
+            "message": f"Config Sing-Box diperbarui: {len(added_tags)} node baru, {len(removed_tags)} node dihapus.",
+            "config_content": new_config_content,
+            "changes": changes,
+            "stats": stats.to_dict(),
         }
+        return add_conversion_stats(result, failures=stats.failures)
 
+    except ConversionCancelled:
+        return cancelled_result(stats)
     except Exception as e:
-        logger.error(f"Error during Sing-Box conversion: {e}", exc_info=True)
-        return {"status": "error", "message": f"Terjadi error yang nggak terduga saat konversi Sing-Box: {e}"}
+        logger.error(f"Error during incremental Sing-Box update: {e}", exc_info=True)
+        return {"status": "error", "message": f"Terjadi error yang nggak terduga saat update Sing-Box: {e}"}
+
 
 if __name__ == '__main__':
     print("Mek, file ini adalah modul logika Sing-Box. Jalankan 'app.py' untuk UI-nya ya.")
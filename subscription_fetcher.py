@@ -0,0 +1,216 @@
+# subscription_fetcher.py
+# Ambil banyak URL subscription sekaligus (asyncio + aiohttp, satu connection pool per batch),
+# decode body base64/plain, lalu alirkan link-nya langsung ke converter.
+#
+# Contoh:
+#   fetcher = SubscriptionFetcher(per_host_limit=4, timeout=20)
+#   reports = []
+#   process_singbox_config_stream(fetcher.iter_links(urls, reports), template)
+import asyncio
+import base64
+import binascii
+import collections
+import logging
+import queue
+import re
+import threading
+import time
+import urllib.parse
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = "v2rayN/6.0"  # Banyak provider cuma balikin list link ke UA client yang dikenal
+
+# Body subscription yang isinya satu blok base64 (standar atau URL-safe, boleh terpotong per baris)
+_BASE64_BODY_RE = re.compile(rb'[A-Za-z0-9+/_=-]+')
+
+_DONE = object()
+
+
+def _decode_base64(data):
+    # Normalisasi alfabet URL-safe ke standar dan padding yang hilang
+    data = data.rstrip(b"=").replace(b"-", b"+").replace(b"_", b"/")
+    try:
+        return base64.b64decode(data + b"=" * (-len(data) % 4), validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def decode_subscription_body(body):
+    """
+    Returns the stripped, non-empty link lines of a subscription body (bytes).
+    Bodies that are a single base64 blob (standard or URL-safe alphabet, padding optional,
+    possibly wrapped over several lines) are decoded first; anything else is read as a plain list.
+    """
+    compact = b"".join(body.split())
+    if compact and _BASE64_BODY_RE.fullmatch(compact):
+        decoded = _decode_base64(compact)
+        if decoded and b"://" in decoded:
+            body = decoded
+    text = body.decode("utf-8", errors="replace")
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+class SubscriptionFetcher:
+    """
+    Fetches many subscription URLs concurrently over one pooled aiohttp session per batch.
+    Requests are capped globally (`max_connections`) and per host (`per_host_limit`); the `timeout`
+    (seconds) only starts once a request got both its host slot and a global connection slot, so URLs
+    queued behind slow hosts do not time out while waiting. Bodies larger than `max_body_bytes` are rejected.
+
+    ETag / Last-Modified validators of successful responses are remembered (LRU, `max_cached` URLs)
+    together with the decoded links, so the next fetch of the same URL sends a conditional request
+    and a 304 reuses the cached links. Keep one fetcher per process to benefit from that.
+    A failing URL never fails the batch: it yields no links and its report carries the error.
+    """
+
+    def __init__(self, max_connections=32, per_host_limit=4, timeout=20, max_body_bytes=64 * 1024 * 1024,
+                 max_cached=1000, user_agent=DEFAULT_USER_AGENT):
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.max_body_bytes = max_body_bytes
+        self.max_cached = max_cached
+        self.user_agent = user_agent
+        self._validators = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, url):
+        with self._lock:
+            entry = self._validators.get(url)
+            if entry is not None:
+                self._validators.move_to_end(url)
+            return entry
+
+    def _remember(self, url, etag, last_modified, links):
+        with self._lock:
+            if not etag and not last_modified:
+                self._validators.pop(url, None)
+                return
+            self._validators[url] = {"etag": etag, "last_modified": last_modified, "links": links}
+            self._validators.move_to_end(url)
+            while len(self._validators) > self.max_cached:
+                self._validators.popitem(last=False)
+
+    def clear(self):
+        """Forgets all ETag/Last-Modified validators (the next fetch is unconditional)."""
+        with self._lock:
+            self._validators.clear()
+
+    def _session(self):
+        # Satu pool koneksi buat seluruh batch; koneksi keep-alive ke host yang sama dipakai ulang
+        connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.per_host_limit)
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"User-Agent": self.user_agent},
+        )
+
+    async def _read_body(self, response):
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                raise ValueError(f"Body lebih dari {self.max_body_bytes} bytes")
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def _fetch_limited(self, session, host_slots, connection_slots, url):
+        host = urllib.parse.urlsplit(url).netloc.lower()
+        slot = host_slots.get(host)
+        if slot is None:
+            slot = host_slots[host] = asyncio.Semaphore(self.per_host_limit)
+        # Slot global diambil di sini, bukan nunggu di antrian connector: timeout session (total) baru jalan
+        # setelah request beneran bisa dikirim, jadi waktu antri nggak ikut kehitung
+        async with slot, connection_slots:
+            return await self._fetch_one(session, url)
+
+    async def _fetch_one(self, session, url):
+        start = time.perf_counter()
+        report = {"url": url, "status": "error", "http_status": None, "links": 0, "seconds": 0.0, "error": None}
+        links = []
+        cached = self._cached(url)
+        headers = {}
+        if cached is not None:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            async with session.get(url, headers=headers) as response:
+                report["http_status"] = response.status
+                if response.status == 304 and cached is not None:
+                    links = cached["links"]
+                    report["status"] = "not_modified"
+                else:
+                    response.raise_for_status()
+                    links = decode_subscription_body(await self._read_body(response))
+                    self._remember(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), links)
+                    report["status"] = "ok"
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            report["error"] = str(e) or type(e).__name__
+            logger.warning(f"Gagal ambil subscription {url}: {report['error']}")
+
+        report["links"] = len(links)
+        report["seconds"] = round(time.perf_counter() - start, 6)
+        return links, report
+
+    def iter_links(self, urls, reports=None):
+        """
+        Synchronous generator over the links of all URLs, in URL order, for use as a converter link source.
+        Fetching runs on an event loop in a background thread, so the links of the first URL are
+        yielded as soon as it arrives while the others are still downloading.
+        Per-URL reports ({url, status, http_status, links, seconds, error}) are appended to `reports`.
+        """
+        urls = list(urls)
+        results = queue.Queue()
+
+        async def fetch_into_queue():
+            host_slots = {}
+            connection_slots = asyncio.Semaphore(self.max_connections)
+            async with self._session() as session:
+                async def fetch_indexed(index, url):
+                    results.put((index, await self._fetch_limited(session, host_slots, connection_slots, url)))
+                await asyncio.gather(*(fetch_indexed(index, url) for index, url in enumerate(urls)))
+
+        def run():
+            try:
+                asyncio.run(fetch_into_queue())
+            except BaseException as e:
+                results.put((_DONE, e))
+            else:
+                results.put((_DONE, None))
+
+        if not urls:
+            return
+        threading.Thread(target=run, name="subscription-fetcher", daemon=True).start()
+
+        pending = {}
+        next_index = 0
+        while next_index < len(urls):
+            index, payload = results.get()
+            if index is _DONE:
+                if payload is not None:
+                    raise payload
+                break
+            pending[index] = payload
+            while next_index in pending:
+                links, report = pending.pop(next_index)
+                if reports is not None:
+                    reports.append(report)
+                yield from links
+                next_index += 1
+
+
+def parse_subscription_urls(text):
+    """Returns the http(s) URLs in `text` (one per line; blank lines and '#' comments are ignored)."""
+    urls = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#") and line.lower().startswith(("http://", "https://")):
+            urls.append(line)
+    return urls